@@ -0,0 +1,50 @@
+# bench_batch_fetch.py
+# Compares the per-ID and batched channel/video stats paths against a local mock API.
+# Usage: python bench_batch_fetch.py [channels] [videos_per_channel] [latency_ms]
+
+import os
+import sys
+import time
+from fake_youtube_server import FakeYouTubeServer
+
+
+def run(fake, label, fn):
+    fake.reset_counts()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} requests={fake.total_requests:<6} wall={elapsed:.3f}s")
+    return fake.total_requests, elapsed
+
+
+if __name__ == "__main__":
+    n_channels = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    videos_per_channel = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    latency = (float(sys.argv[3]) if len(sys.argv) > 3 else 2.0) / 1000
+
+    fake = FakeYouTubeServer(latency=latency).start()
+    os.environ["YOUTUBE_API_BASE_URL"] = fake.base_url
+    # Every call has to reach the server for the request counts to mean anything
+    os.environ["RESPONSE_CACHE"] = "off"
+    import youtube_data_fetcher as yf
+
+    channel_ids = [f"UC{i:022d}" for i in range(n_channels)]
+    video_ids = [f"v{i:010d}" for i in range(n_channels * videos_per_channel)]
+
+    print(f"{n_channels} channels x {videos_per_channel} videos, {latency * 1000:.1f} ms simulated latency")
+
+    def per_id():
+        for channel_id in channel_ids:
+            yf.get_channel_stats(channel_id)
+        for video_id in video_ids:
+            yf.get_video_details(video_id)
+
+    def batched():
+        yf.get_channel_stats_batch(channel_ids)
+        yf.get_video_details_batch(video_ids)
+
+    per_id_requests, per_id_time = run(fake, "per-id", per_id)
+    batch_requests, batch_time = run(fake, "batched", batched)
+    print(f"speedup: {per_id_time / batch_time:.1f}x, requests saved: {per_id_requests - batch_requests}")
+
+    fake.stop()
@@ -0,0 +1,64 @@
+# bench_forecast.py
+# Subscriber forecasting over N synthetic channels: serial fits vs the process pool vs a
+# warm cache (no new data), using forecast_service.run_batch.
+# Usage: python bench_forecast.py [channels] [days] [workers]
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Point storage and the forecast cache at a scratch directory before importing them
+scratch = tempfile.mkdtemp(prefix="bench_forecast_")
+os.environ["DATA_DIR"] = os.path.join(scratch, "data")
+os.environ["FORECAST_DIR"] = os.path.join(scratch, "forecasts")
+
+import forecast_service
+from storage import get_storage
+
+
+def synthetic_series(channels, days, seed=42):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(end="2025-06-30", periods=days, freq="D").strftime("%Y-%m-%d")
+    frames = []
+    for i in range(channels):
+        # Noisy linear growth with a weekly bump
+        start = rng.integers(1_000, 5_000_000)
+        growth = rng.uniform(10, 5_000)
+        weekly = growth * 0.3 * np.sin(2 * np.pi * np.arange(days) / 7)
+        subscribers = start + growth * np.arange(days) + weekly + rng.normal(0, growth, days)
+        frames.append(pd.DataFrame({
+            "date": dates,
+            "channel_id": f"UCbench{i:04d}",
+            "channel_name": f"Bench Channel {i}",
+            "subscribers": subscribers.astype("int64"),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+def timed(label, fn, n):
+    start = time.perf_counter()
+    fitted, reused = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {elapsed:8.2f}s  {n / elapsed:8.2f} channels/s  ({fitted} fitted, {reused} cached)")
+
+
+if __name__ == "__main__":
+    channels = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 365
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count()
+
+    series = synthetic_series(channels, days)
+    get_storage().write("subs_timeseries", series)
+    channel_ids = series["channel_id"].unique()
+    print(f"{channels} channels x {days} days, {workers} workers")
+
+    try:
+        timed("serial", lambda: forecast_service.run_batch(channel_ids, workers=1), channels)
+        shutil.rmtree(forecast_service.FORECAST_DIR)
+        timed("parallel", lambda: forecast_service.run_batch(channel_ids, workers=workers), channels)
+        timed("cached", lambda: forecast_service.run_batch(channel_ids, workers=workers), channels)
+    finally:
+        shutil.rmtree(scratch)
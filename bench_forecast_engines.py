@@ -0,0 +1,73 @@
+# bench_forecast_engines.py
+# Prophet vs the vectorized smoothing engine on synthetic subscriber growth curves:
+# holdout accuracy (MAPE, interval coverage) and wall-clock, plus smoothing at catalog scale.
+# Usage: python bench_forecast_engines.py [channels] [days] [catalog_channels]
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+from forecast_service import FORECAST_PERIODS, fit_prophet_many, fit_smoothing_many
+
+
+def growth_curves(channels, days, seed=7):
+    # Linear, saturating (logistic) and accelerating channels with noise and the odd viral jump
+    rng = np.random.default_rng(seed)
+    ds = pd.date_range(end="2025-06-30", periods=days, freq="D")
+    t = np.arange(days, dtype=float)
+    series = {}
+    for i in range(channels):
+        start = rng.uniform(1e3, 2e6)
+        rate = rng.uniform(20, 4000)
+        shape = i % 3
+        if shape == 0:
+            curve = start + rate * t
+        elif shape == 1:
+            cap = rate * days * rng.uniform(0.8, 1.5)
+            curve = start + cap / (1 + np.exp(-(t - days * rng.uniform(0.3, 0.7)) / (days / 10)))
+        else:
+            curve = start + rate * t * (1 + t / days)
+        if rng.random() < 0.2:
+            curve = curve + (t > rng.integers(days // 2, days)) * rate * rng.uniform(5, 30)
+        y = curve + rng.normal(0, rate * 0.5, days)
+        series[f"UCsynth{i:05d}"] = pd.DataFrame({"ds": ds, "y": np.round(y)})
+    return series
+
+def score(results, holdout):
+    # Mean absolute percentage error and 80% interval coverage over the held-out days
+    errors, covered = [], []
+    for channel_id, actual in holdout.items():
+        forecast = results[channel_id][0].tail(len(actual))
+        y = actual["y"].to_numpy()
+        errors.append(np.mean(np.abs(forecast["yhat"].to_numpy() - y) / np.abs(y)))
+        covered.append(np.mean((y >= forecast["yhat_lower"].to_numpy()) & (y <= forecast["yhat_upper"].to_numpy())))
+    return 100 * np.mean(errors), 100 * np.mean(covered)
+
+def run(label, fit, train, holdout):
+    start = time.perf_counter()
+    results = fit(train, FORECAST_PERIODS, workers=1)
+    elapsed = time.perf_counter() - start
+    mape, coverage = score(results, holdout)
+    print(f"{label:<10} {elapsed:8.2f}s  {len(train) / elapsed:10.1f} channels/s  "
+          f"MAPE {mape:6.2f}%  coverage {coverage:5.1f}%")
+
+
+if __name__ == "__main__":
+    channels = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 365
+    catalog = int(sys.argv[3]) if len(sys.argv) > 3 else 5000
+
+    series = growth_curves(channels, days + FORECAST_PERIODS)
+    train = {channel_id: s.iloc[:-FORECAST_PERIODS] for channel_id, s in series.items()}
+    holdout = {channel_id: s.iloc[-FORECAST_PERIODS:] for channel_id, s in series.items()}
+    print(f"{channels} channels, {days} days of history, {FORECAST_PERIODS}-day holdout")
+
+    run("prophet", fit_prophet_many, train, holdout)
+    run("smoothing", fit_smoothing_many, train, holdout)
+
+    # Smoothing alone at catalog scale, where Prophet would take hours
+    series = growth_curves(catalog, days)
+    start = time.perf_counter()
+    fit_smoothing_many(series, FORECAST_PERIODS)
+    elapsed = time.perf_counter() - start
+    print(f"smoothing  {elapsed:8.2f}s  {catalog / elapsed:10.1f} channels/s  ({catalog} channels)")
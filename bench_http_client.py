@@ -0,0 +1,46 @@
+# bench_http_client.py
+# Bare requests.get per call vs the shared pooled client (keep-alive, gzip, fields= projection).
+# Usage: python bench_http_client.py [videos] [latency_ms]
+
+import sys
+import time
+import requests
+from fake_youtube_server import FakeYouTubeServer
+from youtube_client import YouTubeClient, ClientStats
+
+
+def bare_get(stats, base_url, endpoint, **params):
+    # What the fetchers did before: new connection, no compression, full resources
+    response = requests.get(f"{base_url}/{endpoint}", params=params, headers={"Accept-Encoding": "identity"})
+    content = response.content
+    stats.record(endpoint, response.raw.tell() or len(content), len(content))
+    return response.json()
+
+def workload(get, video_ids):
+    for video_id in video_ids:
+        get("videos", part="snippet,statistics", id=video_id)
+        get("commentThreads", part="snippet", videoId=video_id, maxResults=100, textFormat="plainText")
+
+def report(label, stats, elapsed):
+    summary = stats.summary()
+    print(f"{label:<14} requests={summary['requests']:<6} wire={summary['wire_bytes'] / 1e6:8.2f} MB "
+          f"decoded={summary['decoded_bytes'] / 1e6:8.2f} MB wall={elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    n_videos = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 0.0) / 1000
+    video_ids = [f"v{i:010d}" for i in range(n_videos)]
+
+    with FakeYouTubeServer(comments_per_video=100, latency=latency) as fake:
+        bare_stats = ClientStats()
+        start = time.perf_counter()
+        workload(lambda endpoint, **params: bare_get(bare_stats, fake.base_url, endpoint, key="test", **params),
+                 video_ids)
+        report("bare requests", bare_stats, time.perf_counter() - start)
+
+        client = YouTubeClient(api_key="test", base_url=fake.base_url, cache=False)
+        start = time.perf_counter()
+        workload(client.get, video_ids)
+        report("shared client", client.stats, time.perf_counter() - start)
+        client.close()
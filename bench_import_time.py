@@ -0,0 +1,80 @@
+# bench_import_time.py
+# Import-time budget for the entry points and shared modules. Each module is imported in
+# a fresh interpreter under `python -X importtime` with outbound connections refused, so
+# a module that touches the network at import fails outright. Prints each module's
+# cumulative import time with its slowest direct imports and exits 1 when a module is
+# over budget.
+# Usage: python bench_import_time.py [module ...]
+
+import os
+import sys
+import subprocess
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODULES = [
+    "dashboard_app", "dashboard_cache", "subscriber_forecasting", "pipeline", "youtube_data_fetcher",
+    "comment_sentiment_fetcher", "catalog_crawler", "model_data_preparation", "forecast_service",
+    "engagement_model", "prediction_service", "sentiment_scoring", "sentiment_analyzer", "async_ingestion",
+    "youtube_client", "response_cache", "storage", "warehouse", "feature_store", "metrics", "comment_store",
+    "video_watcher", "watch_feed",
+]
+BUDGET_MS = 1000
+# Training and serving the model is scikit-learn's job, and importing it is most of their cost
+BUDGETS_MS = {"engagement_model": 2500, "prediction_service": 3000}
+SHOW_IMPORTS = 3
+
+GUARD = (
+    "import sys, socket\n"
+    "def refuse(*args, **kwargs):\n"
+    "    raise OSError('network access at import time')\n"
+    "socket.socket.connect = socket.socket.connect_ex = refuse\n"
+    f"sys.path.insert(0, {HERE!r})\n"
+)
+
+
+def import_profile(module):
+    # (cumulative ms, [(direct import, cumulative ms), ...]) from the importtime report
+    with tempfile.TemporaryDirectory() as scratch:
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", GUARD + f"import {module}"],
+                                capture_output=True, text=True, cwd=scratch,
+                                env={**os.environ, "METRICS": "0", "RESPONSE_CACHE": "off"})
+    if result.returncode:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+    # Children are reported before their parent, one more level of indentation each
+    children = []
+    for line in result.stderr.splitlines():
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        cumulative = int(fields[1]) / 1000
+        if depth == 0:
+            if name.strip() == module:
+                return cumulative, sorted(children, key=lambda child: -child[1])
+            children = []
+        elif depth == 1:
+            children.append((name.strip(), cumulative))
+    raise RuntimeError(f"no importtime entry for {module}")
+
+def main(argv=None):
+    modules = (sys.argv[1:] if argv is None else argv) or MODULES
+    over = []
+    for module in modules:
+        total, children = import_profile(module)
+        budget = BUDGETS_MS.get(module, BUDGET_MS)
+        flag = "  OVER BUDGET" if total > budget else ""
+        if flag:
+            over.append(module)
+        slowest = ", ".join(f"{name} {ms:.0f}" for name, ms in children[:SHOW_IMPORTS])
+        print(f"{module:<28}{total:>7.0f} ms / {budget:<5} {slowest}{flag}")
+    if over:
+        print(f"{len(over)} module(s) over their import budget: {', '.join(over)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
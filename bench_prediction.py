@@ -0,0 +1,86 @@
+# bench_prediction.py
+# p50/p99 latency of prediction_service for single-record and 10k-row batch calls,
+# cold (cache cleared) and cached, in-process and over the local HTTP endpoint.
+# Usage: python bench_prediction.py [random_forest|hist_gradient_boosting] [iterations]
+
+import os
+import sys
+import time
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+import requests
+import joblib
+from engagement_model import final_estimator, CANDIDATES
+from feature_store import FEATURE_COLUMNS, DAY_COLUMNS
+import prediction_service
+
+BATCH_ROWS = 10000
+
+
+def synthetic_features(n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "Video ID": [f"v{i:08d}" for i in range(n)],
+        "Title Length": rng.integers(10, 100, n),
+        "Tag Count": rng.integers(0, 30, n),
+        "Sentiment Score": rng.uniform(-1, 1, n),
+        "Publish Hour": rng.integers(0, 24, n),
+    })
+    day = rng.integers(0, len(DAY_COLUMNS) + 1, n)
+    for i, column in enumerate(DAY_COLUMNS):
+        df[column] = day == i
+    df["Views"] = (df["Title Length"] * 50 + df["Sentiment Score"] * 2000 + rng.normal(0, 500, n)).clip(0)
+    return df
+
+def percentiles(label, fn, iterations, rows=1, before=None):
+    latencies = []
+    for i in range(iterations):
+        if before:
+            before()
+        start = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - start)
+    ms = np.array(latencies) * 1000
+    print(f"{label:<26} p50 {np.percentile(ms, 50):9.3f} ms   p99 {np.percentile(ms, 99):9.3f} ms"
+          f"   {rows * iterations / sum(latencies):12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    name = sys.argv[1] if len(sys.argv) > 1 else "random_forest"
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    # Train a model on synthetic features into a scratch directory
+    scratch = tempfile.mkdtemp(prefix="bench_prediction_")
+    prediction_service.MODEL_PATH = os.path.join(scratch, "engagement_model.pkl")
+    prediction_service.MODEL_INFO_PATH = os.path.join(scratch, "engagement_model.json")
+    data = synthetic_features(50000)
+    model = final_estimator(name, {key: values[0] for key, values in CANDIDATES[name][1].items()})
+    model.fit(data[FEATURE_COLUMNS], data["Views"])
+    joblib.dump(model, prediction_service.MODEL_PATH)
+
+    start = time.perf_counter()
+    prediction_service.get_model()
+    print(f"{name}: model load (mmap) {1000 * (time.perf_counter() - start):.1f} ms")
+
+    records = data.drop(columns="Views").to_dict("records")
+    batch = data.drop(columns="Views").iloc[:BATCH_ROWS]
+    clear = prediction_service.clear_cache
+    percentiles("single, cold", lambda i: prediction_service.predict([records[i]]), iterations, before=clear)
+    percentiles("single, cached", lambda i: prediction_service.predict([records[0]]), iterations)
+    batch_iterations = max(iterations // 20, 5)
+    percentiles("10k batch, cold", lambda i: prediction_service.predict_frame(batch), batch_iterations,
+                BATCH_ROWS, before=clear)
+    percentiles("10k batch, cached", lambda i: prediction_service.predict_frame(batch), batch_iterations, BATCH_ROWS)
+
+    server = prediction_service.make_server(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/predict"
+    session = requests.Session()
+    batch_records = records[:BATCH_ROWS]
+    percentiles("HTTP single, cold", lambda i: session.post(url, json={"records": [records[i]]}).json(),
+                iterations, before=clear)
+    percentiles("HTTP 10k batch, cold", lambda i: session.post(url, json={"records": batch_records}).json(),
+                batch_iterations, BATCH_ROWS, before=clear)
+    server.shutdown()
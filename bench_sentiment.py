@@ -0,0 +1,55 @@
+# bench_sentiment.py
+# Per-comment polarity_scores calls vs score_batch (dedup + LRU cache) vs multi-process.
+# Usage: python bench_sentiment.py [comments] [workers]
+
+import sys
+import time
+import random
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+import sentiment_scoring
+
+WORDS = ("the video this was so really great good bad awful love hate boring amazing thanks "
+         "for sharing explanation audio music editing tutorial code python lol wow not very "
+         "helpful confusing clear best worst ever channel subscribed learned much").split()
+# Short stock comments repeat a lot on real channels
+STOCK = ["First!", "Great video!", "Thanks for sharing", "Love this channel ❤️", "lol", "Who's here in 2025?"]
+
+
+def synthetic_comments(n, seed=42, stock_share=0.2):
+    rng = random.Random(seed)
+    comments = []
+    for _ in range(n):
+        if rng.random() < stock_share:
+            comments.append(rng.choice(STOCK))
+        else:
+            # Comment lengths skew short with a long tail
+            length = min(int(rng.expovariate(1 / 12)) + 1, 120)
+            comments.append(" ".join(rng.choices(WORDS, k=length)))
+    return comments
+
+def timed(label, fn, n):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<16} {elapsed:8.2f}s  {n / elapsed:12,.0f} comments/s")
+    return result
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    comments = synthetic_comments(n)
+    print(f"{n:,} synthetic comments, {len(set(comments)):,} distinct")
+
+    sentiment_scoring.ensure_lexicon()
+    sia = SentimentIntensityAnalyzer()
+    per_comment = timed("per-comment", lambda: [sia.polarity_scores(c) for c in comments], n)
+
+    sentiment_scoring.clear_cache()
+    batch = timed("score_batch", lambda: sentiment_scoring.score_batch(comments), n)
+
+    sentiment_scoring.clear_cache()
+    parallel = timed("multi-process", lambda: sentiment_scoring.score_batch_parallel(comments, workers), n)
+
+    assert abs(batch["compound"] - parallel["compound"]).max() < 1e-6
+    assert abs(batch["compound"][:1000] - [s["compound"] for s in per_comment[:1000]]).max() < 1e-4
@@ -0,0 +1,214 @@
+# bench_suite.py
+# End-to-end benchmarks on seeded synthetic data (synthetic_data.py) and the local fake API
+# server: ingestion, sentiment scoring, feature prep, model training, forecasting and
+# dashboard data loading, each at 1x/10x/100x scale. Every benchmark reports the median and
+# minimum of `repeat` runs; the median is compared against bench_baseline.json and any
+# benchmark slower than the baseline by more than the tolerance is flagged as a
+# regression (exit status 1). Baselines are per machine: refresh them with --save-baseline
+# after an intended change or on new hardware.
+# Usage: python bench_suite.py [--scales 1 10 100] [--only sentiment training] [--repeat 3]
+#                              [--tolerance 0.25] [--save-baseline]
+
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+from contextlib import redirect_stdout
+
+# Point every store at a scratch directory, and take the response cache and metrics
+# export out of the measurements, before importing project modules
+scratch = tempfile.mkdtemp(prefix="bench_suite_")
+os.environ["DATA_DIR"] = os.path.join(scratch, "data")
+os.environ["WAREHOUSE_PATH"] = os.path.join(scratch, "warehouse.db")
+os.environ["FORECAST_DIR"] = os.path.join(scratch, "forecasts")
+os.environ["RESPONSE_CACHE"] = "off"
+os.environ["METRICS"] = "0"
+
+import pandas as pd
+import synthetic_data
+from fake_youtube_server import FakeYouTubeServer
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+# Runs shorter than this are treated as warm-up and discarded before timing starts
+WARMUP_BELOW = 1.0
+
+# Work per benchmark at scale 1; every size is multiplied by the scale
+SIZES = {
+    "ingestion": {"channels": 5, "videos_per_channel": 5, "max_comments": 50},
+    "sentiment": {"comments": 2000},
+    "features": {"channels": 5, "videos_per_channel": 200},
+    "training": {"channels": 5, "videos_per_channel": 200},
+    "forecasting": {"channels": 10, "days": 365},
+    "dashboard": {"channels": 5},
+}
+
+
+# Each benchmark does its setup and returns (timed callable, rows processed per call)
+
+def bench_ingestion(scale):
+    from async_ingestion import run_ingestion
+    size = SIZES["ingestion"]
+    fake = FakeYouTubeServer(videos_per_channel=size["videos_per_channel"],
+                             comments_per_video=size["max_comments"],
+                             comment_text=synthetic_data.comment_text).start()
+    channel_ids = list(synthetic_data.channels(size["channels"] * scale)["Channel ID"])
+
+    def run():
+        with redirect_stdout(io.StringIO()):
+            run_ingestion(channel_ids, size["videos_per_channel"], size["max_comments"],
+                          base_url=fake.base_url, api_key="bench", cache=False)
+    return run, len(channel_ids) * size["videos_per_channel"] * size["max_comments"]
+
+def bench_sentiment(scale):
+    from sentiment_scoring import score_batch, clear_cache
+    texts = synthetic_data.comment_texts(SIZES["sentiment"]["comments"] * scale)
+    score_batch(texts[:10])
+
+    def run():
+        clear_cache()
+        score_batch(texts)
+    return run, len(texts)
+
+def synthetic_videos(name, scale):
+    size = SIZES[name]
+    return synthetic_data.videos(synthetic_data.channels(size["channels"] * scale), size["videos_per_channel"])
+
+def bench_features(scale):
+    from feature_store import compute_features
+    videos = synthetic_videos("features", scale)
+    return lambda: compute_features(videos), len(videos)
+
+def bench_training(scale):
+    from feature_store import compute_features, FEATURE_COLUMNS
+    from engagement_model import final_estimator
+    videos = synthetic_videos("training", scale)
+    X = compute_features(videos)[FEATURE_COLUMNS]
+    y = videos["Views"]
+    params = {"max_iter": 200, "learning_rate": 0.1, "max_leaf_nodes": 31}
+    return lambda: final_estimator("hist_gradient_boosting", params).fit(X, y), len(X)
+
+def bench_forecasting(scale):
+    # The vectorized smoothing engine; Prophet takes seconds per channel, which is
+    # bench_forecast_engines.py's business
+    from smoothing_forecast import forecast_many
+    size = SIZES["forecasting"]
+    history = synthetic_data.subscriber_history(synthetic_data.channels(size["channels"] * scale), size["days"])
+    series = {channel_id: pd.DataFrame({"ds": group["date"], "y": group["subscribers"]})
+              for channel_id, group in history.groupby("channel_id", sort=False)}
+    return lambda: forecast_many(series, 30), len(history)
+
+def bench_dashboard(scale):
+    # Every uncached query one dashboard view makes, for each channel in the warehouse
+    import warehouse
+    with redirect_stdout(io.StringIO()):
+        synthetic_data.populate(SIZES["dashboard"]["channels"] * scale // synthetic_data.SCALE_UNIT["channels"])
+    channel_ids = list(warehouse.list_channels()["Channel ID"])
+
+    def run():
+        for channel_id in channel_ids:
+            warehouse.channel_metrics(channel_id)
+            warehouse.channel_videos(channel_id)
+            warehouse.weekly_aggregates(channel_id)
+            warehouse.sentiment_label_counts(channel_id)
+            warehouse.comments_with_label(channel_id, "Negative", limit=10)
+            for by in ("positive", "negative"):
+                warehouse.top_comments(channel_id, by=by, k=5)
+    return run, len(channel_ids)
+
+BENCHMARKS = {
+    "ingestion": bench_ingestion,
+    "sentiment": bench_sentiment,
+    "features": bench_features,
+    "training": bench_training,
+    "forecasting": bench_forecasting,
+    "dashboard": bench_dashboard,
+}
+
+
+def measure(run, repeat):
+    # A cheap first run only warms caches and imports; an expensive one counts as a sample
+    start = time.perf_counter()
+    run()
+    first = time.perf_counter() - start
+    samples = [] if first < WARMUP_BELOW else [first]
+    while len(samples) < repeat:
+        start = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def machine():
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(), "cpus": os.cpu_count(),
+            "pandas": pd.__version__}
+
+def load_baseline():
+    if not os.path.exists(BASELINE_PATH):
+        return {"machine": None, "results": {}}
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and compare with the baseline.")
+    parser.add_argument("--scales", nargs="+", type=int, default=[1, 10, 100])
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="flag medians more than this fraction slower than the baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline()
+    if baseline["machine"] and baseline["machine"] != machine():
+        print(f"Note: baseline was recorded on a different machine ({baseline['machine']['platform']}, "
+              f"{baseline['machine']['cpus']} CPUs); expect noise")
+
+    results = {}
+    regressions = []
+    print(f"{'benchmark':<18}{'rows':>9}{'median s':>11}{'min s':>10}{'rows/s':>12}{'baseline':>10}{'change':>9}")
+    for scale in args.scales:
+        for name, bench in BENCHMARKS.items():
+            if args.only and name not in args.only:
+                continue
+            key = f"{name}@{scale}x"
+            run, rows = bench(scale)
+            samples = measure(run, args.repeat)
+            median = statistics.median(samples)
+            results[key] = {"rows": rows, "median": round(median, 4), "min": round(min(samples), 4),
+                            "samples": [round(s, 4) for s in samples]}
+
+            previous = baseline["results"].get(key)
+            if previous and previous["rows"] == rows:
+                change = median / previous["median"] - 1
+                flag = "  REGRESSION" if change > args.tolerance else ""
+                if flag:
+                    regressions.append(key)
+                compared = f"{previous['median']:>10.3f}{change:>+9.0%}{flag}"
+            else:
+                compared = f"{'-':>10}{'-':>9}"
+            print(f"{key:<18}{rows:>9,}{median:>11.3f}{min(samples):>10.3f}{rows / median:>12,.0f}{compared}")
+
+    if args.save_baseline:
+        baseline = {"machine": machine(), "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "results": {**baseline["results"], **results}}
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {BASELINE_PATH}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        status = main()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    sys.exit(status)
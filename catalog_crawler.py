@@ -0,0 +1,90 @@
+# catalog_crawler.py
+# Full upload catalog per channel from its uploads playlist (1 quota unit per 50 videos,
+# against 100 units per search call, which also stops after a few hundred results).
+# The catalog is kept in the "channel_catalog" table; later runs page the playlist from
+# the newest upload only until they reach a video already in it.
+
+import asyncio
+import argparse
+import pandas as pd
+from async_ingestion import YouTubeIngestor
+from storage import get_storage
+from channel_registry import CHANNELS_FILE, tracked_channel_ids
+
+TABLE = "channel_catalog"
+
+
+def known_videos(channel_ids):
+    # {channel_id: set of video IDs already in the catalog}
+    known = {channel_id: set() for channel_id in channel_ids}
+    try:
+        stored = get_storage().read(TABLE, columns=["Channel ID", "Video ID"], filters={"Channel ID": channel_ids})
+    except FileNotFoundError:
+        return known
+    for channel_id, video_ids in stored.groupby("Channel ID")["Video ID"]:
+        known[channel_id] = set(video_ids)
+    return known
+
+def catalog(channel_ids=None):
+    filters = {"Channel ID": list(channel_ids)} if channel_ids is not None else None
+    try:
+        df = get_storage().read(TABLE, filters=filters)
+    except FileNotFoundError:
+        return pd.DataFrame(columns=["Channel ID", "Video ID", "Video Title", "Upload Date", "Published At"])
+    return df.drop_duplicates(["Channel ID", "Video ID"], keep="last").reset_index(drop=True)
+
+async def crawl_channels(ingestor, channel_ids, known):
+    # {channel_id: [new uploads, newest first]}; a channel whose crawl fails is left out so
+    # a partial listing never makes older uploads look known
+    channel_stats = await ingestor.channel_stats(channel_ids)
+    found_channels = [channel_id for channel_id in channel_ids if channel_id in channel_stats]
+    results = await asyncio.gather(*[
+        ingestor.playlist_videos(channel_stats[channel_id]["Uploads Playlist"] or "UU" + channel_id[2:],
+                                 known_ids=known.get(channel_id))
+        for channel_id in found_channels
+    ], return_exceptions=True)
+
+    new_videos = {}
+    for channel_id, result in zip(found_channels, results):
+        if isinstance(result, Exception):
+            print(f"   Could not crawl {channel_id}: {result!r}")
+        else:
+            new_videos[channel_id] = result
+    return new_videos
+
+def crawl(channel_ids, full=False, **ingestor_kwargs):
+    # Appends every upload not yet in the catalog; full=True re-lists every channel
+    storage = get_storage()
+    if full:
+        storage.delete(TABLE)
+    known = known_videos(channel_ids)
+
+    async def _run():
+        async with YouTubeIngestor(**ingestor_kwargs) as ingestor:
+            new_videos = await crawl_channels(ingestor, channel_ids, known)
+            stats = ingestor.stats.summary()
+            print(f"API requests: {stats['requests']}, quota units used: {dict(ingestor.bucket.used)}")
+            return new_videos
+    new_videos = asyncio.run(_run())
+
+    rows = [{"Channel ID": channel_id, **video} for channel_id, videos in new_videos.items() for video in videos]
+    if rows:
+        # Oldest first so the table reads in upload order
+        storage.write(TABLE, pd.DataFrame(rows[::-1]), mode="append")
+    for channel_id, videos in new_videos.items():
+        print(f"{channel_id}: {len(videos)} new uploads, {len(known[channel_id]) + len(videos)} in catalog")
+    return new_videos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Enumerate every upload of each tracked channel.")
+    parser.add_argument("channel_ids", nargs="*", help=f"defaults to the IDs in {CHANNELS_FILE}")
+    parser.add_argument("--full", action="store_true", help="drop the catalog and list every upload again")
+    args = parser.parse_args(argv)
+
+    crawl(args.channel_ids or tracked_channel_ids(), full=args.full)
+    get_storage().compact(TABLE)
+
+
+if __name__ == "__main__":
+    main()
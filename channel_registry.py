@@ -0,0 +1,219 @@
+# channel_registry.py
+# The tracked channels, read from channels.txt (CHANNELS_FILE; a .csv with channel_id,
+# priority and interval columns works for long lists). One channel per line, optionally
+# followed by a refresh priority (higher first) and interval:
+#   UCYO_jab_esuFRV4b17AJtAw  priority=5 interval=6h   # 3Blue1Brown
+# Channels are spread over N workers with a consistent-hash ring, so changing N moves only
+# about 1/N of them, and every refresh is claimed with a lease in a shared SQLite file
+# (REGISTRY_PATH), renewed while the worker is still fetching. Workers on one box never
+# fetch the same channel at the same time, and a channel is only due again after its
+# interval. The file uses SQLite's rollback journal rather than WAL, whose shared memory
+# only works on one host; boxes sharing it need a filesystem with working POSIX locks
+# (many network filesystems don't have them, and SQLite can't detect that).
+#   python channel_registry.py [--shards N]    show each channel's shard and refresh state
+
+import os
+import csv
+import time
+import bisect
+import socket
+import sqlite3
+import hashlib
+import argparse
+import threading
+from functools import lru_cache
+from contextlib import closing, contextmanager
+
+CHANNELS_FILE = os.getenv("CHANNELS_FILE", "channels.txt")
+REGISTRY_PATH = os.getenv("REGISTRY_PATH", "registry.db")
+DEFAULT_PRIORITY = 0
+DEFAULT_INTERVAL = os.getenv("REFRESH_INTERVAL", "24h")
+# A claim not marked done within this long is assumed dead and can be taken over
+LEASE_SECONDS = int(os.getenv("REGISTRY_LEASE_SECONDS", 3600))
+# Points per shard on the hash ring; more points, more even shards
+VNODES = 64
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS refreshes (
+    channel_id TEXT PRIMARY KEY,
+    refreshed_at REAL,
+    lease_owner TEXT,
+    lease_expires REAL
+);
+"""
+
+
+def parse_interval(text):
+    # "90m", "6h", "2d" or plain seconds
+    text = str(text).strip()
+    if text[-1:] in UNITS:
+        return float(text[:-1]) * UNITS[text[-1]]
+    return float(text)
+
+def channel_entry(channel_id, priority=None, interval=None):
+    return {"channel_id": channel_id,
+            "priority": int(priority) if priority not in (None, "") else DEFAULT_PRIORITY,
+            "interval": parse_interval(interval if interval not in (None, "") else DEFAULT_INTERVAL)}
+
+def load_channels(path=CHANNELS_FILE):
+    # [{"channel_id", "priority", "interval" (seconds)}] in file order; a repeated ID keeps its last line
+    channels = {}
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                channels[row["channel_id"]] = channel_entry(row["channel_id"], row.get("priority"), row.get("interval"))
+        else:
+            for line in f:
+                fields = line.split("#")[0].split()
+                if not fields:
+                    continue
+                options = dict(field.split("=", 1) for field in fields[1:])
+                channels[fields[0]] = channel_entry(fields[0], options.get("priority"), options.get("interval"))
+    return list(channels.values())
+
+def tracked_channel_ids(path=CHANNELS_FILE):
+    return [channel["channel_id"] for channel in load_channels(path)]
+
+
+def hash_point(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+@lru_cache(maxsize=None)
+def ring(shards):
+    points = sorted((hash_point(f"shard-{shard}#{v}"), shard) for shard in range(shards) for v in range(VNODES))
+    return [point for point, _ in points], [shard for _, shard in points]
+
+def shard_for(channel_id, shards):
+    # The shard owning the first ring point at or after the channel's hash
+    if shards <= 1:
+        return 0
+    points, owners = ring(shards)
+    return owners[bisect.bisect_left(points, hash_point(channel_id)) % len(points)]
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class ChannelRegistry:
+    def __init__(self, path=REGISTRY_PATH, owner=None):
+        self.path = path
+        self.owner = owner or worker_name()
+
+    def connect(self):
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE. Rollback
+        # journal, which also switches back a file an older version left in WAL mode
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def refreshes(self, conn):
+        return {row[0]: row[1:] for row in conn.execute(
+            "SELECT channel_id, refreshed_at, lease_owner, lease_expires FROM refreshes")}
+
+    def claim(self, channels, shard=0, shards=1, force=False, limit=None, lease=LEASE_SECONDS):
+        # Leases this shard's due channels (highest priority, then longest overdue, first) and
+        # returns their IDs; force ignores refresh intervals but never another worker's lease
+        now = time.time()
+        with closing(self.connect()) as conn:
+            # Taken before reading, so two workers can't both see a channel as free
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                state = self.refreshes(conn)
+                due = []
+                for channel in channels:
+                    channel_id = channel["channel_id"]
+                    if shard_for(channel_id, shards) != shard:
+                        continue
+                    refreshed_at, _, lease_expires = state.get(channel_id, (None, None, None))
+                    if lease_expires is not None and lease_expires > now:
+                        continue
+                    if not force and refreshed_at is not None and now - refreshed_at < channel["interval"]:
+                        continue
+                    overdue = now - refreshed_at - channel["interval"] if refreshed_at is not None else float("inf")
+                    due.append((-channel["priority"], -overdue, channel_id))
+                claimed = [channel_id for _, _, channel_id in sorted(due)[:limit]]
+                conn.executemany(
+                    "INSERT INTO refreshes (channel_id, lease_owner, lease_expires) VALUES (?, ?, ?) "
+                    "ON CONFLICT (channel_id) DO UPDATE SET lease_owner = excluded.lease_owner, "
+                    "lease_expires = excluded.lease_expires",
+                    [(channel_id, self.owner, now + lease) for channel_id in claimed])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return claimed
+
+    def mark_refreshed(self, channel_ids):
+        # Records a successful refresh and gives up the lease
+        self._update("refreshed_at = ?, lease_owner = NULL, lease_expires = NULL", [time.time()], channel_ids)
+
+    def renew(self, channel_ids, lease=LEASE_SECONDS):
+        # Pushes back the expiry of this worker's leases
+        self._update("lease_expires = ?", [time.time() + lease], channel_ids)
+
+    @contextmanager
+    def holding(self, channel_ids, lease=LEASE_SECONDS):
+        # Renews the leases every third of a lease while the block runs, so a slow fetch
+        # isn't claimed again by another worker
+        stop = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(lease / 3):
+                self.renew(channel_ids, lease)
+
+        thread = threading.Thread(target=heartbeat, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def release(self, channel_ids):
+        # Gives up leases without recording a refresh (e.g. after a failure), so they're due again
+        self._update("lease_owner = NULL, lease_expires = NULL", [], channel_ids)
+
+    def _update(self, assignments, values, channel_ids):
+        with closing(self.connect()) as conn:
+            conn.executemany(f"UPDATE refreshes SET {assignments} WHERE channel_id = ? AND lease_owner = ?",
+                             [(*values, channel_id, self.owner) for channel_id in channel_ids])
+
+    def status(self, channels, shards=1):
+        # One row per channel: shard, priority, interval, last refresh and current state
+        now = time.time()
+        with closing(self.connect()) as conn:
+            state = self.refreshes(conn)
+        rows = []
+        for channel in channels:
+            refreshed_at, lease_owner, lease_expires = state.get(channel["channel_id"], (None, None, None))
+            if lease_expires is not None and lease_expires > now:
+                label = f"claimed by {lease_owner}"
+            elif refreshed_at is None or now - refreshed_at >= channel["interval"]:
+                label = "due"
+            else:
+                label = f"fresh for {(refreshed_at + channel['interval'] - now) / 3600:.1f}h"
+            rows.append({**channel, "shard": shard_for(channel["channel_id"], shards),
+                         "refreshed_at": refreshed_at, "state": label})
+        return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the channel registry and refresh state.")
+    parser.add_argument("--channels-file", default=CHANNELS_FILE)
+    parser.add_argument("--shards", type=int, default=1, help="show the shard of each channel for N workers")
+    args = parser.parse_args(argv)
+
+    channels = load_channels(args.channels_file)
+    rows = ChannelRegistry().status(channels, args.shards)
+    for row in rows:
+        refreshed = time.strftime("%Y-%m-%d %H:%M", time.localtime(row["refreshed_at"])) if row["refreshed_at"] else "never"
+        print(f"{row['channel_id']:26s} shard {row['shard']:<3d} priority {row['priority']:<3d} "
+              f"every {row['interval'] / 3600:g}h  last {refreshed:16s} {row['state']}")
+    due = sum(row["state"] == "due" for row in rows)
+    print(f"{len(rows)} channels, {due} due, across {args.shards} shard(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,77 +1,185 @@
 # comment_sentiment_fetcher.py
+# Streams new comments page by page into a batch scorer and a chunked writer, so memory
+# stays bounded by CHUNK_SIZE rows however many comments a video has. Comments already in
+# the table are skipped on append, so a run retried after a failure doesn't store them twice.
 
-from googleapiclient.discovery import build
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-from nltk import download
 import pandas as pd
-import time
+import argparse
 import os
+from collections import Counter
 from dotenv import load_dotenv
+from async_ingestion import fetch_comments, stream_new_comments
+from sentiment_scoring import score_batch
+from storage import file_lock, get_storage
+from warehouse import upsert_comments
+import metrics
 
 # Load API Key
 load_dotenv()
 API_KEY = os.getenv("YOUTUBE_API_KEY")
 
-youtube = build("youtube", "v3", developerKey=API_KEY)
+# Per-video high-water marks for incremental runs
+watermark_file = "comment_watermarks.csv"
 
-download('vader_lexicon')
-sia = SentimentIntensityAnalyzer()
+# Comments scored and written per chunk
+CHUNK_SIZE = int(os.getenv("COMMENT_CHUNK_SIZE", 5000))
 
+@metrics.timed("comments")
 def get_comments(video_id, max_comments=100):
-    comments = []
-    next_page_token = None
-
-    while len(comments) < max_comments:
-        response = youtube.commentThreads().list(
-            part="snippet",
-            videoId=video_id,
-            maxResults=100,
-            textFormat="plainText",
-            pageToken=next_page_token
-        ).execute()
-
-        for item in response.get("items", []):
-            comment = item["snippet"]["topLevelComment"]["snippet"]["textDisplay"]
-            comments.append(comment)
-            if len(comments) >= max_comments:
-                break
-
-        next_page_token = response.get("nextPageToken")
-        if not next_page_token:
-            break
-        time.sleep(0.2)
-
-    return comments
-
-def analyze_comments(video_id, title):
-    comments = get_comments(video_id)
-    results = []
-
-    for comment in comments:
-        sentiment = sia.polarity_scores(comment)
-        results.append({
-            "Video ID": video_id,
-            "Video Title": title,
-            "Comment": comment,
-            "Sentiment": sentiment['compound'],
-            "Pos": sentiment['pos'],
-            "Neu": sentiment['neu'],
-            "Neg": sentiment['neg']
-        })
-
-    return results
-
-# Example: run for a few videos
-video_data = pd.read_csv("video_sentiments.csv")
-all_comments = []
-
-for idx, row in video_data.iterrows():
-    video_id = row["Video ID"]
-    title = row["Video Title"]
-    print(f"Processing: {title}")
-    comments_data = analyze_comments(video_id, title)
-    all_comments.extend(comments_data)
-
-df_comments = pd.DataFrame(all_comments)
-df_comments.to_csv("comment_sentiments.csv", index=False)
-print(" Comment sentiment analysis complete!")
+    return fetch_comments([video_id], max_comments, api_key=API_KEY)[video_id]
+
+def analyze_comments(video_id, title, comments=None, channel_id=None, comment_ids=None, published_at=None,
+                     parent_ids=None):
+    if comments is None:
+        comments = get_comments(video_id)
+    scores = score_batch(comments)
+
+    return pd.DataFrame({
+        "Channel ID": channel_id,
+        "Video ID": video_id,
+        "Video Title": title,
+        "Comment ID": comment_ids,
+        "Parent ID": parent_ids,
+        "Published At": published_at,
+        "Comment": comments,
+        "Sentiment": scores['compound'],
+        "Positive": scores['pos'],
+        "Neutral": scores['neu'],
+        "Negative": scores['neg']
+    })
+
+def append_comments(chunk):
+    # Appends the comments not stored yet (by Comment ID) to comment_sentiments and the
+    # warehouse. The check and the append hold a lock shared with every other writer process.
+    storage = get_storage()
+    with file_lock(f"{storage.path('comment_sentiments')}.append"):
+        try:
+            stored = storage.read("comment_sentiments", columns=["Comment ID"],
+                                  filters={"Channel ID": chunk["Channel ID"].dropna().unique().tolist(),
+                                           "Video ID": chunk["Video ID"].unique().tolist()})
+        except FileNotFoundError:
+            stored = pd.DataFrame(columns=["Comment ID"])
+        if "Comment ID" in stored.columns:
+            chunk = chunk[~chunk["Comment ID"].isin(stored["Comment ID"].dropna())]
+        if chunk.empty:
+            return 0
+        storage.write("comment_sentiments", chunk, mode="append")
+    upsert_comments(chunk)
+    return len(chunk)
+
+def load_watermarks():
+    if not os.path.exists(watermark_file):
+        return {}
+    marks = pd.read_csv(watermark_file, dtype={"Newest Comment ID": str, "Newest Published At": str})
+    marks = marks.astype(object).where(marks.notna(), None)
+    return marks.set_index("Video ID").to_dict("index")
+
+def save_watermarks(watermarks):
+    marks = pd.DataFrame.from_dict(watermarks, orient="index")
+    marks.index.name = "Video ID"
+    tmp = f"{watermark_file}.{os.getpid()}.tmp"
+    marks.reset_index().to_csv(tmp, index=False)
+    os.replace(tmp, watermark_file)
+
+def is_newer(mark, saved):
+    # A mark replaces the saved one unless the saved one has seen later comments
+    if saved is None or not saved.get("Newest Published At"):
+        return True
+    return bool(mark.get("Newest Published At")) and mark["Newest Published At"] >= saved["Newest Published At"]
+
+def update_watermarks(changed):
+    # Merged into the saved marks under a lock held across processes (this script and
+    # video_watcher.py both save marks), and a mark only ever moves forward, so a run that
+    # started from older marks can't undo another's progress
+    with file_lock(watermark_file):
+        watermarks = load_watermarks()
+        watermarks.update({video_id: mark for video_id, mark in changed.items()
+                           if is_newer(mark, watermarks.get(video_id))})
+        save_watermarks(watermarks)
+
+def start_run(full=False):
+    # Without high-water marks the existing comments can't be appended to safely, so start over
+    if full or not os.path.exists(watermark_file):
+        if os.path.exists(watermark_file):
+            os.remove(watermark_file)
+        get_storage().delete("comment_sentiments")
+
+class CommentWriter:
+    # Collects pages until CHUNK_SIZE comments are pending, then scores them in one batch
+    # and appends the chunk to storage and the warehouse
+    def __init__(self, titles, channels, chunk_size=CHUNK_SIZE):
+        self.titles = titles
+        self.channels = channels
+        self.chunk_size = chunk_size
+        self.pending = []
+        self.pending_rows = 0
+        self.newest = {}
+        self.counts = Counter()
+
+    def add(self, video_id, page):
+        # Pages come newest first, so a video's first top-level comment is its new high-water mark
+        if video_id not in self.newest:
+            self.newest[video_id] = next(c for c in page if c["parentId"] is None)
+        self.counts[video_id] += len(page)
+        self.pending.append((video_id, page))
+        self.pending_rows += len(page)
+        if self.pending_rows >= self.chunk_size:
+            self.flush()
+
+    def score(self):
+        frames = [analyze_comments(
+            video_id, self.titles[video_id], [c["text"] for c in page], self.channels[video_id],
+            comment_ids=[c["id"] for c in page], published_at=[c["publishedAt"] for c in page],
+            parent_ids=[c["parentId"] for c in page]
+        ) for video_id, page in self.pending]
+        return pd.concat(frames, ignore_index=True)
+
+    def flush(self):
+        if not self.pending:
+            return
+        with metrics.timed("comment_chunk") as timer:
+            chunk = self.score()
+            timer.add_rows(len(chunk))
+        append_comments(chunk)
+        self.pending = []
+        self.pending_rows = 0
+
+def run_incremental(video_data, max_comments=100, replies=False):
+    watermarks = load_watermarks()
+    titles = dict(zip(video_data["Video ID"], video_data["Video Title"]))
+    channels = dict(zip(video_data["Video ID"], video_data["Channel ID"]))
+
+    # page generator -> batch scorer -> chunked writer
+    writer = CommentWriter(titles, channels)
+    counts = stream_new_comments(titles.keys(), watermarks, writer.add, max_comments, replies, api_key=API_KEY)
+    writer.flush()
+
+    changed = {}
+    for video_id, count in counts.items():
+        if writer.counts[video_id]:
+            print(f"Processing: {titles[video_id]} ({writer.counts[video_id]} new comments)")
+        mark = watermarks.get(video_id, {"Newest Comment ID": None, "Newest Published At": None})
+        if video_id in writer.newest:
+            mark["Newest Comment ID"] = writer.newest[video_id]["id"]
+            mark["Newest Published At"] = writer.newest[video_id]["publishedAt"]
+        mark["Comment Count"] = count
+        changed[video_id] = mark
+    # Saved only once every chunk is written, so a failed run refetches rather than skips
+    update_watermarks(changed)
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch and score YouTube comments")
+    parser.add_argument("--full", action="store_true", help="refetch every video and rewrite the comments table")
+    parser.add_argument("--max-comments", type=int, default=100,
+                        help="top-level comments on a video's first fetch (0: all); later runs read every new one")
+    parser.add_argument("--replies", action="store_true", help="also fetch and score reply threads")
+    args = parser.parse_args()
+
+    video_data = get_storage().read("video_sentiments", columns=["Channel ID", "Video ID", "Video Title"])
+    start_run(args.full)
+    run_incremental(video_data, args.max_comments or None, args.replies)
+    print(" Comment sentiment analysis complete!")
+
+
+if __name__ == "__main__":
+    main()
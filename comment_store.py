@@ -0,0 +1,188 @@
+# comment_store.py
+# Compact snapshot of the scored comments for the dashboard's comment explorer, built
+# from the comment_sentiments table into Arrow IPC files that are memory-mapped, not
+# loaded: channel and video IDs are dictionary-encoded (int32 codes into one copy of
+# each ID), video titles are stored once per video, scores stay float32 and comment text
+# stays in Arrow string buffers instead of one Python object per row. The TOP_K most
+# positive and negative comments per channel and per video are precomputed as CSR index
+# arrays, so a top-k lookup is a slice rather than a sort. A snapshot is keyed on the
+# table's files and rebuilt when they change; older snapshots are removed once they are
+# COMMENT_STORE_KEEP_HOURS old, since another process may still have them mapped.
+#   python comment_store.py    build the snapshot and compare its size with a DataFrame
+
+import os
+import time
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from storage import DATA_DIR, get_storage
+import metrics
+
+TABLE = "comment_sentiments"
+STORE_DIR = os.getenv("COMMENT_STORE_DIR", os.path.join(DATA_DIR, "comment_store"))
+TOP_K = int(os.getenv("COMMENT_TOP_K", 20))
+KEEP_SECONDS = float(os.getenv("COMMENT_STORE_KEEP_HOURS", 24)) * 3600
+SCORES = ["Sentiment", "Positive", "Neutral", "Negative"]
+RANKED = {"positive": "Positive", "negative": "Negative"}
+COLUMNS = ["Channel ID", "Video ID", "Video Title", "Comment ID", "Published At", "Comment"] + SCORES
+
+
+def table_version():
+    # Parquet parts are write-once, so their names and sizes identify the table's content.
+    # None when there's no table, or it's a CSV file from before comments had IDs
+    path = get_storage().path(TABLE)
+    hasher = hashlib.sha256()
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for file in sorted(files):
+                full = os.path.join(root, file)
+                hasher.update(f"{os.path.relpath(full, path)}:{os.path.getsize(full)}\n".encode())
+    elif os.path.exists(path):
+        if not set(COLUMNS) <= set(pd.read_csv(path, nrows=0).columns):
+            return None
+        hasher.update(f"{os.path.getmtime(path)}:{os.path.getsize(path)}".encode())
+    else:
+        return None
+    return hasher.hexdigest()[:16]
+
+def last_per_comment(table):
+    # Row positions keeping the last written row per Comment ID (rows without one are kept)
+    ids = pc.dictionary_encode(table["Comment ID"]).combine_chunks()
+    codes = ids.indices.to_numpy(zero_copy_only=False)
+    missing = ids.is_null().to_numpy(zero_copy_only=False)
+    _, last_reversed = np.unique(codes[::-1][~missing[::-1]], return_index=True)
+    keep = np.zeros(len(codes), dtype=bool)
+    keep[np.flatnonzero(~missing)[::-1][last_reversed]] = True
+    keep |= missing
+    return np.flatnonzero(keep)
+
+def top_k_index(groups, scores, n_groups, k=TOP_K):
+    # CSR arrays: rows[offsets[g]:offsets[g + 1]] are group g's best rows, best first
+    order = np.lexsort((-scores, groups))
+    sorted_groups = groups[order]
+    counts = np.bincount(sorted_groups, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank = np.arange(len(order)) - starts[sorted_groups]
+    offsets = np.concatenate([[0], np.cumsum(np.minimum(counts, k))])
+    return offsets.astype(np.int64), order[rank < k].astype(np.int32)
+
+def build(directory):
+    with metrics.timed("comment_store_build") as timer:
+        table = get_storage().read_arrow(TABLE, columns=COLUMNS)
+        table = table.take(last_per_comment(table))
+        channels = pc.dictionary_encode(table["Channel ID"]).combine_chunks()
+        videos = pc.dictionary_encode(table["Video ID"]).combine_chunks()
+        video_codes = videos.indices.to_numpy(zero_copy_only=False)
+        _, first_row = np.unique(video_codes, return_index=True)
+        comments = pa.table({
+            "channel": channels,
+            "video": videos,
+            "comment_id": table["Comment ID"],
+            "published_at": table["Published At"],
+            "comment": table["Comment"],
+            **{score.lower(): pc.cast(table[score], pa.float32()) for score in SCORES},
+        }).combine_chunks()
+        titles = pa.table({"video_id": videos.dictionary, "title": table["Video Title"].take(first_row)})
+
+        index = {}
+        groups = {"channel": channels.indices.to_numpy(zero_copy_only=False),
+                  "video": video_codes}
+        sizes = {"channel": len(channels.dictionary), "video": len(videos.dictionary)}
+        for level, codes in groups.items():
+            for by, column in RANKED.items():
+                scores = comments[column.lower()].to_numpy()
+                index[f"{level}_{by}_offsets"], index[f"{level}_{by}_rows"] = top_k_index(
+                    codes, np.nan_to_num(scores, nan=-np.inf), sizes[level])
+
+        # Built under a name of this process's own; when another process renames its build of
+        # the same version in first, that one is kept
+        tmp = f"{directory}.{os.getpid()}.tmp"
+        os.makedirs(tmp, exist_ok=True)
+        for name, data in [("comments", comments), ("videos", titles)]:
+            with pa.OSFile(os.path.join(tmp, f"{name}.arrow"), "wb") as sink:
+                with pa.ipc.new_file(sink, data.schema) as writer:
+                    writer.write_table(data)
+        np.savez(os.path.join(tmp, "topk.npz"), **index)
+        try:
+            os.replace(tmp, directory)
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
+            shutil.rmtree(tmp, ignore_errors=True)
+        timer.add_rows(comments.num_rows)
+
+
+class CommentStore:
+    def __init__(self, directory):
+        self.directory = directory
+        # Zero-copy reads over the mapping: pages are loaded only as they're touched
+        self.comments = pa.ipc.open_file(pa.memory_map(os.path.join(directory, "comments.arrow"))).read_all()
+        videos = pa.ipc.open_file(pa.memory_map(os.path.join(directory, "videos.arrow"))).read_all()
+        self.titles = videos["title"].combine_chunks()
+        self.index = dict(np.load(os.path.join(directory, "topk.npz")))
+        self.codes = {level: {key: code for code, key in enumerate(self.comments[level].chunk(0).dictionary.to_pylist())}
+                      if self.comments.num_rows else {} for level in ("channel", "video")}
+
+    def __len__(self):
+        return self.comments.num_rows
+
+    def top_comments(self, channel_id=None, video_id=None, by="positive", k=5):
+        # Same columns as warehouse.top_comments; per video when video_id is given
+        level, key = ("video", video_id) if video_id is not None else ("channel", channel_id)
+        column = RANKED[by]
+        code = self.codes[level].get(key)
+        if code is None:
+            return pd.DataFrame(columns=["Video Title", "Comment", column])
+        if k <= TOP_K:
+            offsets = self.index[f"{level}_{by}_offsets"]
+            rows = self.index[f"{level}_{by}_rows"][offsets[code]:min(offsets[code] + k, offsets[code + 1])]
+        else:
+            # Deeper than the precomputed lists: sort this group's rows
+            members = np.flatnonzero(self.comments[level].chunk(0).indices.to_numpy() == code)
+            scores = np.nan_to_num(self.comments[column.lower()].to_numpy()[members], nan=-np.inf)
+            rows = members[np.argsort(-scores, kind="stable")[:k]]
+        selected = self.comments.take(rows)
+        return pd.DataFrame({
+            "Video Title": self.titles.take(selected["video"].chunk(0).indices).to_pandas(),
+            "Comment": selected["comment"].to_pandas(),
+            column: selected[column.lower()].to_numpy(),
+        })
+
+    def nbytes(self):
+        return self.comments.nbytes + self.titles.nbytes + sum(array.nbytes for array in self.index.values())
+
+
+_store = {}
+
+def remove_old(keep):
+    # Other snapshots (and abandoned builds) untouched for KEEP_SECONDS
+    cutoff = time.time() - KEEP_SECONDS
+    for name in os.listdir(STORE_DIR):
+        path = os.path.join(STORE_DIR, name)
+        if name != keep and os.path.getmtime(path) < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+
+def open_store(version=None):
+    # The snapshot for the table's current version, built on first use
+    version = version or table_version()
+    if version is None:
+        raise FileNotFoundError(f"No data with comment IDs for table '{TABLE}'")
+    if version not in _store:
+        directory = os.path.join(STORE_DIR, version)
+        if not os.path.isdir(directory):
+            build(directory)
+        remove_old(version)
+        _store.clear()
+        _store[version] = CommentStore(directory)
+    return _store[version]
+
+
+if __name__ == "__main__":
+    store = open_store()
+    frame = get_storage().read(TABLE)
+    print(f"{len(store):,} comments: {store.nbytes() / 1e6:.1f} MB as a comment store, "
+          f"{frame.memory_usage(deep=True).sum() / 1e6:.1f} MB as a DataFrame")
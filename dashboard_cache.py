@@ -0,0 +1,195 @@
+# dashboard_cache.py
+# Caching and render instrumentation for dashboard_app.py.
+# Loaders are wrapped in st.cache_data keyed on the warehouse file version and figures
+# are memoized as PNG bytes. The model is cached by prediction_service, and the comment
+# explorer's top comments come from the memory-mapped comment store (comment_store.py),
+# opened once per server process and shared by every session. Fresh-upload velocity is
+# read from the watch feed (watch_feed.py) incrementally, per session.
+# matplotlib and seaborn (over 2s to import) are loaded on the first chart, so the page
+# starts drawing before they are ready.
+
+import io
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+import pandas as pd
+import streamlit as st
+import warehouse
+import watch_feed
+from watch_feed import WATCH_HOURS
+import metrics
+
+# Per-loader call/miss counters, shared by every session of this server process
+cache_calls = Counter()
+cache_misses = Counter()
+
+
+def file_version(*paths):
+    # (mtime, size) of each file; changes whenever new data is written
+    return tuple((os.path.getmtime(p), os.path.getsize(p)) if os.path.exists(p) else None for p in paths)
+
+def data_version():
+    # WAL writes land in the -wal file until checkpointed, so track both
+    return file_version(warehouse.WAREHOUSE_PATH, warehouse.WAREHOUSE_PATH + "-wal")
+
+def counted(cache):
+    # Wrap a cache decorator so hits and misses can be reported
+    def decorator(func):
+        name = func.__name__
+
+        @wraps(func)
+        def miss(*args, **kwargs):
+            cache_misses[name] += 1
+            return func(*args, **kwargs)
+
+        cached = cache(miss)
+
+        @wraps(func)
+        def call(*args, **kwargs):
+            cache_calls[name] += 1
+            return cached(*args, **kwargs)
+        return call
+    return decorator
+
+
+# Datasets and derived per-channel frames
+@counted(st.cache_data(show_spinner=False))
+def load_channels(version):
+    return warehouse.list_channels()
+
+@counted(st.cache_data(show_spinner=False))
+def load_channel_videos(channel_id, version):
+    return warehouse.channel_videos(channel_id)
+
+@counted(st.cache_data(show_spinner=False))
+def load_weekly(channel_id, version):
+    return warehouse.weekly_aggregates(channel_id)
+
+@counted(st.cache_data(show_spinner=False))
+def load_metrics(channel_id, version):
+    return warehouse.channel_metrics(channel_id)
+
+@counted(st.cache_data(show_spinner=False))
+def load_sentiment_summary(channel_id, version):
+    return warehouse.sentiment_summary(channel_id)
+
+@counted(st.cache_data(show_spinner=False))
+def load_daily(channel_id, version):
+    return warehouse.daily_activity(channel_id)
+
+@counted(st.cache_data(show_spinner=False))
+def load_sentiment_counts(channel_id, version):
+    return warehouse.sentiment_label_counts(channel_id)
+
+@counted(st.cache_data(show_spinner=False))
+def load_comments_with_label(channel_id, label, version):
+    return warehouse.comments_with_label(channel_id, label, limit=10)
+
+@counted(st.cache_resource(show_spinner=False))
+def load_comment_store(store_version):
+    # Imported here: pyarrow is only needed once the comment explorer is opened
+    import comment_store
+    return comment_store.open_store(store_version)
+
+@counted(st.cache_data(show_spinner=False))
+def load_comment_store_version(version):
+    # Every write to the comment table is upserted into the warehouse too, so its files are
+    # hashed once per data version rather than walked on every rerun
+    import comment_store
+    return comment_store.table_version()
+
+def load_top_comments(channel_id, by, version, video_id=None):
+    # Precomputed top-k slices from the shared store; the warehouse when the table isn't there
+    store_version = load_comment_store_version(version)
+    if store_version is None:
+        return warehouse.top_comments(channel_id, by=by, k=5)
+    return load_comment_store(store_version).top_comments(channel_id, video_id, by=by, k=5)
+
+
+# Fresh uploads: the fragment showing them reruns on this interval
+WATCH_REFRESH_SECONDS = int(os.getenv("WATCH_REFRESH_SECONDS", 60))
+
+def load_watch_feed(channel_id):
+    # The session keeps the channel's velocity rows and appends only those written since its
+    # last read: no reload of the series, and the warehouse caches are left alone
+    key = f"watch_feed:{channel_id}"
+    feed = st.session_state.get(key)
+    if feed is None:
+        feed = watch_feed.changes_since(0, channel_id)
+    else:
+        new = watch_feed.changes_since(int(feed["Seq"].max()) if len(feed) else 0, channel_id)
+        if not new.empty:
+            feed = pd.concat([feed, new], ignore_index=True) if len(feed) else new
+        # Videos past the watch window drop out
+        feed = feed[feed["Published At"] >= watch_feed.published_after()]
+    st.session_state[key] = feed
+    return feed
+
+
+# Figures, rendered once per channel and data version
+def pyplot():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+def figure_png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    pyplot().close(fig)
+    return buffer.getvalue()
+
+@counted(st.cache_data(show_spinner=False))
+def render_figure(kind, channel_id, version):
+    import seaborn as sns
+    video_stats = load_channel_videos(channel_id, version)
+    fig, ax = pyplot().subplots()
+    if kind == "title_length":
+        sns.scatterplot(data=video_stats, x="Title Length", y="Views", ax=ax)
+        ax.set_yscale("log")  # Optional for better visibility
+    elif kind == "publish_time":
+        sns.boxplot(data=video_stats, x="Publish Time", y="Views", ax=ax)
+        ax.set_title("Views by Publish Time (HH:MM)")
+        ax.tick_params(axis='x', rotation=45)
+    elif kind == "publish_day":
+        order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+        sns.boxplot(data=video_stats, x="Publish Day", y="Views", order=order, ax=ax)
+        ax.set_title("Views by Day of Week")
+    elif kind == "sentiment_views":
+        combined_df = video_stats.dropna(subset=["Sentiment Score", "Views"])
+        sns.scatterplot(data=combined_df, x="Sentiment Score", y="Views", ax=ax)
+        ax.set_title("Sentiment Score vs Views")
+    elif kind == "sentiment_pie":
+        sentiment_counts = load_sentiment_counts(channel_id, version)
+        ax.pie(sentiment_counts, labels=sentiment_counts.index, autopct="%1.1f%%", startangle=90)
+        ax.axis("equal")
+    return figure_png(fig)
+
+
+# Render timings
+@contextmanager
+def section(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        st.session_state.setdefault("section_timings", {})[name] = elapsed * 1000
+        metrics.observe("dashboard_section_seconds", elapsed, section=name)
+
+def render_instrumentation_panel():
+    metrics.export(min_interval=60)
+    with st.sidebar.expander("⏱ Render timings & cache"):
+        timings = st.session_state.get("section_timings", {})
+        if timings:
+            st.dataframe({"Section": list(timings), "ms": [round(ms, 1) for ms in timings.values()]},
+                         hide_index=True)
+            st.caption(f"Total: {sum(timings.values()):.1f} ms")
+        rows = []
+        for name, calls in sorted(cache_calls.items()):
+            hits = calls - cache_misses[name]
+            rows.append({"Loader": name, "Calls": calls, "Hit rate": f"{hits / calls:.0%}"})
+        if rows:
+            st.dataframe(rows, hide_index=True)
@@ -0,0 +1,362 @@
+# fake_youtube_server.py
+# Local stand-in for the YouTube Data API v3 used by the benchmarks and offline runs.
+# Serves channels, search, playlistItems, videos, commentThreads and comments (replies) with
+# deterministic fake data. With live=True the data moves with the clock, for video_watcher.py:
+# a channel's newest upload is published when the server starts and another follows every
+# upload_every seconds, and views, likes and comments grow with a video's age.
+
+import json
+import gzip
+import hashlib
+import time
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+COMMENT_EPOCH = datetime(2025, 6, 1)
+
+
+def descend(node, path):
+    for key in path:
+        if node.get(key) is None:
+            node[key] = {}
+        node = node[key]
+    return node
+
+def parse_fields(fields):
+    # "a,b(c,d/e),f/g" -> {"a": None, "b": {"c": None, "d": {"e": None}}, "f": {"g": None}}
+    tree = {}
+    stack = [tree]
+    name = ""
+    path = []
+
+    def flush():
+        nonlocal name, path
+        if name:
+            path.append(name)
+        if path:
+            descend(stack[-1], path[:-1]).setdefault(path[-1], None)
+        name, path = "", []
+
+    for char in fields:
+        if char == "/":
+            path.append(name)
+            name = ""
+        elif char == "(":
+            path.append(name)
+            stack.append(descend(stack[-1], path))
+            name, path = "", []
+        elif char == ",":
+            flush()
+        elif char == ")":
+            flush()
+            stack.pop()
+        else:
+            name += char.strip()
+    flush()
+    return tree
+
+def apply_fields(payload, fields):
+    # Partial response: keep only the keys selected by a fields= expression
+    def project(value, tree):
+        if tree is None:
+            return value
+        if isinstance(value, list):
+            return [project(item, tree) for item in value]
+        if isinstance(value, dict):
+            return {key: project(value[key], sub) for key, sub in tree.items() if key in value}
+        return value
+    return project(payload, parse_fields(fields))
+
+
+class FakeYouTubeServer:
+    def __init__(self, videos_per_channel=5, comments_per_video=250, latency=0.0, failures=None,
+                 replies_per_comment=0, comment_text=None, live=False, upload_every=3600):
+        self.videos_per_channel = videos_per_channel
+        self.comments_per_video = comments_per_video
+        self.replies_per_comment = replies_per_comment
+        self.latency = latency
+        # Optional comment_text(comment_id) -> str, e.g. synthetic_data.comment_text for
+        # realistic lengths; by default a short fixed rotation
+        self.comment_text = comment_text
+        self.live = live
+        self.upload_every = upload_every
+        self.started = time.time()
+        # {endpoint: [status, status, ...]} returned before serving real responses
+        self.failures = {endpoint: list(statuses) for endpoint, statuses in (failures or {}).items()}
+        self.request_counts = Counter()
+        self.lock = threading.Lock()
+        self.server = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/youtube/v3"
+
+    @property
+    def total_requests(self):
+        return sum(self.request_counts.values())
+
+    def reset_counts(self):
+        with self.lock:
+            self.request_counts.clear()
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 so clients can keep connections alive
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                endpoint = parsed.path.rsplit("/", 1)[-1]
+                params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+                status, payload = fake.handle(endpoint, params)
+                if status == 200 and params.get("fields"):
+                    payload = apply_fields(payload, params["fields"])
+
+                body = json.dumps(payload).encode()
+                etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+                if status == 200 and self.headers.get("If-None-Match") == etag:
+                    # Unchanged since the client's cached copy
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                if status == 200:
+                    self.send_header("ETag", etag)
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle(self, endpoint, params):
+        with self.lock:
+            self.request_counts[endpoint] += 1
+            pending = self.failures.get(endpoint)
+            failure = pending.pop(0) if pending else None
+        if self.latency:
+            time.sleep(self.latency)
+        if failure:
+            return failure, {"error": {"code": failure, "message": "injected failure"}}
+
+        handler = getattr(self, f"handle_{endpoint}", None)
+        if handler is None:
+            return 404, {"error": {"code": 404, "message": f"unknown endpoint {endpoint}"}}
+        return 200, handler(params)
+
+    # Fake data, padded with the metadata the real API returns alongside what we read
+    def resource(self, kind, resource_id, snippet, **parts):
+        snippet = dict(snippet,
+                       description="Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 8,
+                       thumbnails={size: {"url": f"https://i.ytimg.com/vi/{resource_id}/{size}.jpg",
+                                          "width": 480, "height": 360} for size in ("default", "medium", "high")},
+                       localized={"title": snippet.get("title", ""), "description": ""})
+        return dict({"kind": f"youtube#{kind}", "etag": f"etag-{resource_id}", "id": resource_id,
+                     "snippet": snippet}, **parts)
+
+    def video_count(self):
+        if not self.live:
+            return self.videos_per_channel
+        return self.videos_per_channel + int((time.time() - self.started) // self.upload_every)
+
+    def video_ids_for(self, channel_id):
+        return [f"{channel_id[-6:]}v{n:04d}" for n in range(self.video_count())]
+
+    def upload_time(self, video_id):
+        # Live: seconds since the epoch when the video goes up
+        n = int(video_id.rsplit("v", 1)[1])
+        return self.started + (n - self.videos_per_channel + 1) * self.upload_every
+
+    def published_at(self, video_id):
+        if not self.live:
+            return COMMENT_EPOCH + timedelta(hours=int(video_id.rsplit("v", 1)[1]))
+        return datetime.fromtimestamp(self.upload_time(video_id), timezone.utc).replace(tzinfo=None)
+
+    def age_minutes(self, video_id):
+        return max(time.time() - self.upload_time(video_id), 0) / 60
+
+    def comment_count(self, video_id):
+        # Live: a comment every two minutes, up to comments_per_video
+        if not self.live:
+            return self.comments_per_video
+        return min(self.comments_per_video, int(self.age_minutes(video_id) // 2))
+
+    def comment_time(self, video_id, seq):
+        if not self.live:
+            return COMMENT_EPOCH + timedelta(minutes=seq)
+        return self.published_at(video_id) + timedelta(minutes=2 * seq)
+
+    def video_statistics(self, video_id):
+        base = 1000 + sum(map(ord, video_id))
+        if not self.live:
+            return base, 56, self.comments_per_video
+        # Fast early views that level off
+        views = int(base * self.age_minutes(video_id) ** 0.6)
+        return views, views // 40, self.comment_count(video_id)
+
+    def handle_channels(self, params):
+        ids = [i for i in params.get("id", "").split(",") if i]
+        return {"kind": "youtube#channelListResponse", "items": [self.resource(
+            "channel", channel_id,
+            {"title": f"Channel {channel_id}", "customUrl": f"@{channel_id.lower()}"},
+            statistics={
+                "subscriberCount": str(1000 + len(channel_id) * 17),
+                "viewCount": "500000",
+                "videoCount": str(self.video_count()),
+                "hiddenSubscriberCount": False
+            },
+            contentDetails={"relatedPlaylists": {"likes": "", "uploads": "UU" + channel_id[2:]}}
+        ) for channel_id in ids]}
+
+    def handle_search(self, params):
+        channel_id = params.get("channelId", "")
+        max_results = int(params.get("maxResults", 5))
+        items = [self.resource(
+            "searchResult", video_id,
+            {"title": f"Video {video_id}", "publishedAt": f"2025-06-{n % 28 + 1:02d}T15:30:00Z",
+             "channelId": channel_id}
+        ) for n, video_id in enumerate(self.video_ids_for(channel_id)[:max_results])]
+        for item in items:
+            item["id"] = {"kind": "youtube#video", "videoId": item["id"]}
+        return {"kind": "youtube#searchListResponse", "items": items}
+
+    def handle_playlistItems(self, params):
+        # Uploads playlists ("UU" + channel suffix), newest upload first
+        channel_id = "UC" + params.get("playlistId", "")[2:]
+        page_size = int(params.get("maxResults", 5))
+        start = int(params.get("pageToken") or 0)
+        video_ids = self.video_ids_for(channel_id)[::-1]
+        end = min(start + page_size, len(video_ids))
+        items = []
+        for video_id in video_ids[start:end]:
+            published = self.published_at(video_id).strftime("%Y-%m-%dT%H:%M:%SZ")
+            item = self.resource("playlistItem", f"PL{video_id}", {
+                "title": f"Video {video_id}", "publishedAt": published, "channelId": channel_id,
+                "playlistId": params.get("playlistId"), "resourceId": {"kind": "youtube#video", "videoId": video_id}
+            }, contentDetails={"videoId": video_id, "videoPublishedAt": published})
+            items.append(item)
+        response = {"kind": "youtube#playlistItemListResponse", "items": items,
+                    "pageInfo": {"totalResults": len(video_ids), "resultsPerPage": page_size}}
+        if end < len(video_ids):
+            response["nextPageToken"] = str(end)
+        return response
+
+    def handle_videos(self, params):
+        ids = [i for i in params.get("id", "").split(",") if i]
+        items = []
+        for video_id in ids:
+            views, likes, comments = self.video_statistics(video_id)
+            items.append(self.resource(
+                "video", video_id,
+                {"title": f"Video {video_id}", "publishedAt": "2025-06-01T15:30:00Z", "tags": ["python", "data"]},
+                statistics={
+                    "viewCount": str(views),
+                    "likeCount": str(likes),
+                    "favoriteCount": "0",
+                    "commentCount": str(comments)
+                }
+            ))
+        return {"kind": "youtube#videoListResponse", "items": items}
+
+    def handle_commentThreads(self, params):
+        # Newest first: sequence numbers count up from the oldest comment, so adding
+        # comments (raising comments_per_video) keeps existing IDs stable
+        video_id = params.get("videoId", "")
+        page_size = int(params.get("maxResults", 20))
+        start = int(params.get("pageToken") or 0)
+        total = self.comment_count(video_id)
+        end = min(start + page_size, total)
+        texts = ["Great video, loved it!", "This was boring and too long.", "Thanks for sharing", "Terrible audio :("]
+        items = []
+        for n in range(start, end):
+            seq = total - 1 - n
+            published = self.comment_time(video_id, seq)
+            thread_id = f"{video_id}c{seq}"
+            text = self.comment_text(thread_id) if self.comment_text else texts[seq % len(texts)]
+            thread = {
+                "kind": "youtube#commentThread",
+                "etag": f"etag-{thread_id}",
+                "id": thread_id,
+                "snippet": {"videoId": video_id, "canReply": True, "totalReplyCount": self.replies_per_comment,
+                            "topLevelComment": self.comment(thread_id, text, seq, published)}
+            }
+            if "replies" in params.get("part", ""):
+                # The API inlines at most five replies per thread
+                thread["replies"] = {"comments": [self.reply(thread_id, k)
+                                                  for k in range(min(self.replies_per_comment, 5))]}
+            items.append(thread)
+        response = {"kind": "youtube#commentThreadListResponse", "items": items}
+        if end < total:
+            response["nextPageToken"] = str(end)
+        return response
+
+    def handle_comments(self, params):
+        # Replies to one thread, oldest first
+        parent_id = params.get("parentId", "")
+        page_size = int(params.get("maxResults", 20))
+        start = int(params.get("pageToken") or 0)
+        end = min(start + page_size, self.replies_per_comment)
+        response = {"kind": "youtube#commentListResponse",
+                    "items": [self.reply(parent_id, k) for k in range(start, end)]}
+        if end < self.replies_per_comment:
+            response["nextPageToken"] = str(end)
+        return response
+
+    def comment(self, comment_id, text, seq, published, parent_id=None):
+        published = published.strftime("%Y-%m-%dT%H:%M:%SZ")
+        snippet = {
+            "textDisplay": text,
+            "textOriginal": text,
+            "authorDisplayName": f"@viewer{seq}",
+            "authorProfileImageUrl": f"https://yt3.ggpht.com/viewer{seq}=s48-c-k",
+            "likeCount": seq % 7,
+            "publishedAt": published,
+            "updatedAt": published
+        }
+        if parent_id:
+            snippet["parentId"] = parent_id
+        return {"kind": "youtube#comment", "etag": f"etag-{comment_id}", "id": comment_id, "snippet": snippet}
+
+    def reply(self, thread_id, k):
+        replies = ["Agreed!", "Not really, the second half dragged.", "Same here", "lol"]
+        seq = int(thread_id.rsplit("c", 1)[1])
+        published = COMMENT_EPOCH + timedelta(minutes=seq, seconds=k + 1)
+        return self.comment(f"{thread_id}.r{k}", replies[k % len(replies)], seq, published, parent_id=thread_id)
+
+if __name__ == "__main__":
+    with FakeYouTubeServer() as fake:
+        print("Fake YouTube API listening on", fake.base_url)
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,87 @@
+# feature_store.py
+# Engagement-model features per video, computed with vectorized string/date ops and
+# persisted in the "video_features" table keyed by video ID. Each row stores a hash of
+# the inputs it was computed from and the feature-schema version, so a build only
+# computes rows for new or changed videos. Training and serving share FEATURE_COLUMNS.
+
+import numpy as np
+import pandas as pd
+from storage import get_storage
+
+TABLE = "video_features"
+# Bump whenever a feature definition changes; older rows are then recomputed
+FEATURE_VERSION = 1
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+# Friday is the reference day, as get_dummies(drop_first=True) produced on a full week
+DAY_COLUMNS = [f"Day of Week_{day}" for day in sorted(DAYS) if day != "Friday"]
+FEATURE_COLUMNS = ["Title Length", "Tag Count", "Sentiment Score", "Publish Hour"] + DAY_COLUMNS
+
+# Columns the features are computed from; a change in any of them recomputes the row
+INPUT_COLUMNS = ["Video Title", "Tags", "Publish Time", "Published At", "Sentiment Score"]
+
+
+def input_hash(videos):
+    return pd.util.hash_pandas_object(videos[INPUT_COLUMNS], index=False).to_numpy()
+
+def compute_features(videos):
+    features = pd.DataFrame({"Video ID": videos["Video ID"].to_numpy()})
+    features["Input Hash"] = input_hash(videos)
+    features["Title Length"] = videos["Video Title"].str.len().to_numpy()
+    tags = videos["Tags"]
+    features["Tag Count"] = np.where(tags.notna(), tags.str.count(r"\|").fillna(0) + 1, 0)
+    features["Sentiment Score"] = videos["Sentiment Score"].to_numpy()
+    features["Publish Hour"] = pd.to_numeric(videos["Publish Time"].str.slice(0, 2), errors="coerce").astype("Int8").array
+    weekday = pd.to_datetime(videos["Published At"], errors="coerce", utc=True).dt.dayofweek.to_numpy()
+    for column in DAY_COLUMNS:
+        features[column] = weekday == DAYS.index(column.removeprefix("Day of Week_"))
+    return features
+
+def align_features(df):
+    # Fixed column layout for training and serving: missing features are filled, extras dropped
+    df = df.copy()
+    for column in FEATURE_COLUMNS:
+        if column not in df.columns:
+            df[column] = False if column in DAY_COLUMNS else np.nan
+    return df[FEATURE_COLUMNS]
+
+def read_features(video_ids=None, columns=None):
+    filters = {"Feature Version": FEATURE_VERSION}
+    if video_ids is not None:
+        filters["Video ID"] = list(video_ids)
+    try:
+        stored = get_storage().read(TABLE, columns=columns, filters=filters)
+    except FileNotFoundError:
+        return pd.DataFrame(columns=columns or ["Video ID", "Input Hash"] + FEATURE_COLUMNS)
+    # Later rows for a video replace earlier ones
+    return stored.drop_duplicates("Video ID", keep="last").reset_index(drop=True)
+
+def update_features(videos):
+    # Compute and store features only for videos that are new or whose inputs changed
+    videos = videos.drop_duplicates("Video ID", keep="last")
+    stored = read_features(columns=["Video ID", "Input Hash"])
+    current = pd.MultiIndex.from_arrays([videos["Video ID"].to_numpy(), input_hash(videos)])
+    known = pd.MultiIndex.from_arrays([stored["Video ID"].to_numpy(), stored["Input Hash"].to_numpy()])
+    changed = videos[~current.isin(known)]
+    if not changed.empty:
+        features = compute_features(changed)
+        features["Feature Version"] = FEATURE_VERSION
+        get_storage().write(TABLE, features, mode="append")
+    return len(changed), len(videos) - len(changed)
+
+def build_training_frame():
+    # Video ID, Views and FEATURE_COLUMNS for every usable video, refreshing stale features first
+    # A video without tags (or a CSV table predating the column) counts as zero tags
+    videos = get_storage().read("video_sentiments", columns=["Video ID", "Views"] + INPUT_COLUMNS)
+    videos = videos.reindex(columns=["Video ID", "Views"] + INPUT_COLUMNS)
+    videos = videos.dropna(subset=["Video Title", "Views", "Publish Time", "Sentiment Score"])
+    computed, reused = update_features(videos)
+    print(f"Features: {computed} computed, {reused} reused")
+
+    labels = videos.drop_duplicates("Video ID", keep="last")[["Video ID", "Views"]]
+    features = read_features(labels["Video ID"])
+    frame = labels.merge(features, on="Video ID", how="inner").dropna(subset=["Publish Hour"])
+    return pd.concat([frame[["Video ID", "Views"]], align_features(frame)], axis=1)
+
+def compact():
+    get_storage().compact(TABLE)
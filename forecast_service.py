@@ -0,0 +1,146 @@
+# forecast_service.py
+# Batch subscriber forecasting: fits every channel's model with the selected engine
+# (Prophet in a process pool, or vectorized damped-trend smoothing across all channels
+# at once), stores fitted models and forecasts keyed on a hash of the input series and
+# reuses them until new data arrives. The forecasting page only reads the cached frames.
+
+import os
+import hashlib
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from storage import get_storage
+from subscriber_store import read_series, read_all_series
+import smoothing_forecast
+import metrics
+
+FORECAST_DIR = os.getenv("FORECAST_DIR", "forecasts")
+FORECAST_ENGINE = os.getenv("FORECAST_ENGINE", "prophet")
+FORECAST_PERIODS = 30
+FORECAST_COLUMNS = ["ds", "yhat", "yhat_lower", "yhat_upper"]
+
+
+def prepare_series(df):
+    # subscriber_store rows -> Prophet's ds/y frame
+    return (df[["date", "subscribers"]].dropna()
+            .rename(columns={"date": "ds", "subscribers": "y"})
+            .reset_index(drop=True))
+
+def series_key(series, periods=FORECAST_PERIODS, engine="prophet"):
+    digest = hashlib.sha256(f"{engine}:{periods}:".encode())
+    digest.update(pd.util.hash_pandas_object(series[["ds", "y"]], index=False).values.tobytes())
+    return digest.hexdigest()[:16]
+
+def cache_paths(channel_id, key):
+    base = os.path.join(FORECAST_DIR, channel_id, key)
+    return base + ".parquet", base + ".model.json"
+
+def load_cached(channel_id, key):
+    forecast_path, _ = cache_paths(channel_id, key)
+    if os.path.exists(forecast_path):
+        return pd.read_parquet(forecast_path)
+    return None
+
+def save_forecast(channel_id, key, forecast, model_json=None):
+    forecast_path, model_path = cache_paths(channel_id, key)
+    os.makedirs(os.path.dirname(forecast_path), exist_ok=True)
+    forecast.to_parquet(forecast_path, index=False)
+    if model_json is not None:
+        with open(model_path, "w") as f:
+            f.write(model_json)
+    # Forecasts of the channel's earlier series won't be asked for again
+    directory = os.path.dirname(forecast_path)
+    for name in os.listdir(directory):
+        if not name.startswith(f"{key}."):
+            os.remove(os.path.join(directory, name))
+
+def fit_prophet(series, periods=FORECAST_PERIODS):
+    # Imported here: Prophet is slow to import and only the workers need it
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    from prophet import Prophet
+    from prophet.serialize import model_to_json
+
+    model = Prophet()
+    model.fit(series)
+    future = model.make_future_dataframe(periods=periods)
+    forecast = model.predict(future)[FORECAST_COLUMNS]
+    return forecast, model_to_json(model)
+
+def _fit_job(job):
+    channel_id, series, periods = job
+    return channel_id, fit_prophet(series, periods)
+
+def fit_prophet_many(series_by_channel, periods=FORECAST_PERIODS, workers=None):
+    # One Prophet fit per channel, spread over a process pool
+    jobs = [(channel_id, series, periods) for channel_id, series in series_by_channel.items()]
+    if workers == 1 or len(jobs) <= 1:
+        return dict(map(_fit_job, jobs))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return dict(pool.map(_fit_job, jobs))
+
+def fit_smoothing_many(series_by_channel, periods=FORECAST_PERIODS, workers=None):
+    # A single vectorized fit covers every channel, so no pool is needed
+    return smoothing_forecast.forecast_many(series_by_channel, periods)
+
+# engine name -> fit({channel_id: ds/y frame}, periods, workers) -> {channel_id: (forecast, model_json)}
+ENGINES = {
+    "prophet": fit_prophet_many,
+    "smoothing": fit_smoothing_many,
+}
+
+def forecast_channel(channel_id, periods=FORECAST_PERIODS, engine=FORECAST_ENGINE):
+    # Cached forecast for one channel, fitting inline only when the series changed
+    series = prepare_series(read_series(channel_id))
+    if len(series) < 2:
+        return None
+    key = series_key(series, periods, engine)
+    forecast = load_cached(channel_id, key)
+    if forecast is None:
+        with metrics.timed("forecast_fit", engine=engine) as timer:
+            forecast, model_json = ENGINES[engine]({channel_id: series}, periods, workers=1)[channel_id]
+            timer.add_rows(1)
+        save_forecast(channel_id, key, forecast, model_json)
+    return forecast
+
+def run_batch(channel_ids=None, workers=None, periods=FORECAST_PERIODS, engine=FORECAST_ENGINE):
+    # Fit every channel whose series changed since its last forecast
+    if channel_ids is None:
+        channel_ids = get_storage().read("channel_stats", columns=["Channel ID"])["Channel ID"].unique()
+
+    pending = {}
+    keys = {}
+    reused = 0
+    for channel_id, df in read_all_series(channel_ids, ["date", "subscribers"]).items():
+        series = prepare_series(df)
+        if len(series) < 2:
+            continue
+        keys[channel_id] = series_key(series, periods, engine)
+        if load_cached(channel_id, keys[channel_id]) is not None:
+            reused += 1
+            continue
+        pending[channel_id] = series
+
+    results = {}
+    if pending:
+        with metrics.timed("forecast_fit", engine=engine) as timer:
+            results = ENGINES[engine](pending, periods, workers=workers)
+            timer.add_rows(len(pending))
+    metrics.inc("forecast_cache_hits_total", reused, engine=engine)
+    for channel_id, (forecast, model_json) in results.items():
+        save_forecast(channel_id, keys[channel_id], forecast, model_json)
+
+    print(f"Forecasts ({engine}): {len(pending)} fitted, {reused} reused from cache")
+    return len(pending), reused
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit and cache subscriber forecasts for every channel.")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default=FORECAST_ENGINE)
+    parser.add_argument("--workers", type=int, default=None, help="Prophet worker processes")
+    args = parser.parse_args(argv)
+    run_batch(workers=args.workers, engine=args.engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# metrics.py
+# In-process counters and timing histograms for the pipeline, exported when the process
+# exits (and on demand) as one JSON line per export in metrics/metrics.jsonl and as a
+# Prometheus text file per job for the node_exporter textfile collector: metrics/<job>.prom,
+# or <job>-<instance>.prom when METRICS_INSTANCE is set (e.g. per worker shard).
+# `timed` works as a decorator (sync or async) or a context manager and can count rows
+# processed; `profile` wraps a block in cProfile or pyinstrument when
+# PROFILE=cprofile|pyinstrument is set. METRICS=0 turns recording off.
+
+import os
+import sys
+import json
+import time
+import atexit
+import inspect
+import functools
+import threading
+from contextlib import contextmanager
+
+ENABLED = os.getenv("METRICS", "1") != "0"
+METRICS_DIR = os.getenv("METRICS_DIR", "metrics")
+PROFILE = os.getenv("PROFILE", "")
+# Set per process when several run the same script, so each keeps its own .prom file
+INSTANCE = os.getenv("METRICS_INSTANCE", "")
+PREFIX = "yt_"
+# Seconds; suits everything from a cached API hit to a model search
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+_lock = threading.Lock()
+# (name, sorted label items) -> value
+_counters = {}
+# (name, sorted label items) -> {"buckets": [...], "count", "sum", "max"}
+_histograms = {}
+_last_export = [0.0]
+
+
+def job_name():
+    # The script's name; `python -c` and stdin runs have none ("-c", "-")
+    script = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] not in ("", "-c", "-") else ""
+    job = os.path.splitext(script)[0] or "python"
+    return f"{job}-{INSTANCE}" if INSTANCE else job
+
+def inc(name, value=1, **labels):
+    if not ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def observe(name, value, **labels):
+    if not ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {"buckets": [0] * len(BUCKETS), "count": 0, "sum": 0.0, "max": 0.0}
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                histogram["buckets"][i] += 1
+        histogram["count"] += 1
+        histogram["sum"] += value
+        histogram["max"] = max(histogram["max"], value)
+
+
+class timed:
+    # Records <name>_seconds, and <name>_rows_total / <name>_errors_total when they apply:
+    #   @timed("api_request", endpoint="videos")  or  with timed("storage_write") as t: t.add_rows(n)
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+        self.rows = 0
+
+    def add_rows(self, rows):
+        self.rows += rows
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(f"{self.name}_seconds", time.perf_counter() - self.start, **self.labels)
+        if self.rows:
+            inc(f"{self.name}_rows_total", self.rows, **self.labels)
+        if exc_type is not None:
+            inc(f"{self.name}_errors_total", **self.labels)
+        return False
+
+    def __call__(self, func):
+        # A fresh timer per call, so concurrent calls never share a start time
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with timed(self.name, **self.labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(self.name, **self.labels):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+@contextmanager
+def profile(name, mode=None):
+    # Profiles the block when mode (default: PROFILE) is set; output lands in metrics/profiles
+    mode = PROFILE if mode is None else mode
+    if not mode:
+        yield
+        return
+    directory = os.path.join(METRICS_DIR, "profiles")
+    os.makedirs(directory, exist_ok=True)
+    stem = os.path.join(directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}")
+
+    if mode == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("pyinstrument is not installed; profiling with cProfile instead")
+            mode = "cprofile"
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(f"{stem}.html", "w") as f:
+                    f.write(profiler.output_html())
+                print(f"Profile for {name}: {stem}.html")
+            return
+    if mode != "cprofile":
+        raise ValueError(f"Unknown profiler {mode!r}; expected cprofile or pyinstrument")
+
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(f"{stem}.prof")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+        print(f"Profile for {name}: {stem}.prof")
+
+
+def label_text(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    escape = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in items) + "}"
+
+def snapshot():
+    # JSON-friendly view: counters, and per timer count/total/mean/max plus rows per second
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: dict(value) for key, value in _histograms.items()}
+    timers = {}
+    for (name, labels), histogram in histograms.items():
+        summary = {
+            "count": histogram["count"],
+            "seconds": round(histogram["sum"], 6),
+            "mean_ms": round(histogram["sum"] / histogram["count"] * 1000, 3),
+            "max_ms": round(histogram["max"] * 1000, 3),
+        }
+        rows = counters.get((name.removesuffix("_seconds") + "_rows_total", labels))
+        if rows and histogram["sum"]:
+            summary["rows_per_second"] = round(rows / histogram["sum"], 1)
+        timers[name.removesuffix("_seconds") + label_text(labels)] = summary
+    return {
+        "counters": {name + label_text(labels): value for (name, labels), value in sorted(counters.items())},
+        "timers": dict(sorted(timers.items())),
+    }
+
+def prometheus_text():
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, dict(value, buckets=list(value["buckets"]))) for key, value in _histograms.items())
+    lines = []
+    typed = set()
+    for (name, labels), value in counters:
+        if name not in typed:
+            lines.append(f"# TYPE {PREFIX}{name} counter")
+            typed.add(name)
+        lines.append(f"{PREFIX}{name}{label_text(labels)} {value}")
+    for (name, labels), histogram in histograms:
+        if name not in typed:
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+            typed.add(name)
+        for bound, count in zip(BUCKETS, histogram["buckets"]):
+            lines.append(f"{PREFIX}{name}_bucket{label_text(labels, [('le', bound)])} {count}")
+        lines.append(f"{PREFIX}{name}_bucket{label_text(labels, [('le', '+Inf')])} {histogram['count']}")
+        lines.append(f"{PREFIX}{name}_sum{label_text(labels)} {histogram['sum']}")
+        lines.append(f"{PREFIX}{name}_count{label_text(labels)} {histogram['count']}")
+    return "\n".join(lines) + "\n"
+
+def export(min_interval=0):
+    # Appends a snapshot to metrics.jsonl and rewrites this job's .prom file; long-running
+    # processes pass min_interval (seconds) to export at most that often
+    if not ENABLED or not (_counters or _histograms):
+        return
+    if time.monotonic() - _last_export[0] < min_interval:
+        return
+    _last_export[0] = time.monotonic()
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    job = job_name()
+    record = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "job": job, "pid": os.getpid(), **snapshot()}
+    with open(os.path.join(METRICS_DIR, "metrics.jsonl"), "a") as f:
+        f.write(json.dumps(record) + "\n")
+    # Renamed into place so the collector never reads a partial file; the temp name is
+    # per process, so processes exporting the same job never share one
+    path = os.path.join(METRICS_DIR, f"{job}.prom")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+atexit.register(export)
@@ -0,0 +1,324 @@
+# pipeline.py
+# Runs the fetch -> comments / prepare -> train scripts as a DAG with checkpoints.
+# Every stage has a fingerprint: a hash of its code, its parameters and its inputs (and
+# today's date for the stages that read from the API). A stage whose fingerprint matches
+# its last successful run, and whose outputs exist, is skipped. Per-channel stages run
+# channels in parallel worker threads, or in one batched call (fetch and comments, whose API
+# calls take 50 IDs at a time and share one quota bucket), and checkpoint each finished
+# channel, so a rerun after a failure only redoes the channels that hadn't finished. A stage
+# that raises, or leaves an empty output, is reported as a StageError and not checkpointed.
+#   python pipeline.py                     run every stale stage
+#   python pipeline.py --stages prepare train --force train
+#   python pipeline.py --status
+
+import os
+import json
+import time
+import hashlib
+import argparse
+from datetime import date
+from graphlib import TopologicalSorter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+from storage import TABLES, get_storage
+import metrics
+
+PIPELINE_DIR = os.getenv("PIPELINE_DIR", ".pipeline")
+STATE_PATH = os.path.join(PIPELINE_DIR, "state.json")
+WORKERS = int(os.getenv("PIPELINE_WORKERS", 4))
+
+
+class StageError(Exception):
+    pass
+
+
+def write_json(path, value):
+    # Write-then-rename, so an interrupted run never leaves a half-written checkpoint
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(value, f)
+    os.replace(tmp, path)
+
+def load_state():
+    if not os.path.exists(STATE_PATH):
+        return {}
+    with open(STATE_PATH) as f:
+        return json.load(f)
+
+def update_input_hash(hasher, name):
+    # Tables are hashed by their file names and sizes (Parquet parts are written once under
+    # unique names, so that identifies their content); plain files by their bytes
+    path = get_storage().path(name) if name in TABLES else name
+    hasher.update(f"{name}\n".encode())
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for file in sorted(files):
+                full = os.path.join(root, file)
+                hasher.update(f"{os.path.relpath(full, path)}:{os.path.getsize(full)}\n".encode())
+    elif os.path.exists(path):
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                hasher.update(block)
+    else:
+        hasher.update(b"<missing>\n")
+
+def outputs_exist(stage):
+    return all(get_storage().exists(name) if name in TABLES else os.path.exists(name)
+               for name in STAGES[stage]["outputs"])
+
+
+# Stage runners: (channel IDs, checkpointed unit runner, options) -> None
+
+def run_fetch(channel_ids, run_units, options):
+    from youtube_data_fetcher import fetch_channels, save_results
+
+    def fetch(pending):
+        # One ingestion run for every pending channel: channels?id= and videos?id= batch 50
+        # IDs per call, and the quota bucket and connection pool are shared
+        results = fetch_channels(pending, options["videos_per_channel"], options["max_comments"])
+        return {channel_id: list(result) for channel_id, result in results.items()}
+
+    results = run_units(channel_ids, batch=fetch)
+    save_results({channel_id: tuple(result) for channel_id, result in results.items() if result is not None})
+
+def run_comments(channel_ids, run_units, options):
+    from comment_sentiment_fetcher import start_run, run_incremental
+
+    video_data = get_storage().read("video_sentiments", columns=["Channel ID", "Video ID", "Video Title"])
+    if not run_units.resuming:
+        start_run(options["full_comments"])
+
+    def fetch(pending):
+        # One incremental run for every pending channel, as for fetch: one quota bucket and
+        # connection pool, and the videos?id= change checks batch 50 IDs per call
+        run_incremental(video_data[video_data["Channel ID"].isin(pending)], options["max_comments"] or None,
+                        options["replies"])
+        return {channel_id: True for channel_id in pending}
+
+    run_units([c for c in channel_ids if c in set(video_data["Channel ID"])], batch=fetch)
+
+def run_prepare(channel_ids, run_units, options):
+    import model_data_preparation
+    model_data_preparation.main()
+    # An empty training set would only fail later, inside the model fit
+    if pd.read_csv(model_data_preparation.DATA_PATH).empty:
+        raise StageError(f"prepare: no usable videos in video_sentiments, {model_data_preparation.DATA_PATH} is empty")
+
+def run_train(channel_ids, run_units, options):
+    import engagement_model
+    engagement_model.main(["--incremental"] if options["incremental_train"] else [])
+
+
+# "after": upstream stages, "code": files whose changes rerun the stage, "params": options
+# that are part of the fingerprint, "external": reads the API, so reruns at most daily
+STAGES = {
+    "fetch": {
+        "after": [],
+        "run": run_fetch,
+        "code": ["youtube_data_fetcher.py", "async_ingestion.py"],
+        "params": ["videos_per_channel", "max_comments"],
+        "inputs": [],
+        "outputs": ["channel_stats", "video_sentiments"],
+        "external": True,
+    },
+    "comments": {
+        "after": ["fetch"],
+        "run": run_comments,
+        "code": ["comment_sentiment_fetcher.py", "async_ingestion.py", "sentiment_scoring.py"],
+        "params": ["max_comments", "replies"],
+        "inputs": ["video_sentiments"],
+        "outputs": ["comment_sentiments"],
+        "external": True,
+    },
+    "prepare": {
+        "after": ["fetch"],
+        "run": run_prepare,
+        "code": ["model_data_preparation.py", "feature_store.py"],
+        "params": [],
+        "inputs": ["video_sentiments"],
+        "outputs": ["model_data.csv"],
+        "external": False,
+    },
+    "train": {
+        "after": ["prepare"],
+        "run": run_train,
+        "code": ["engagement_model.py"],
+        "params": [],
+        "inputs": ["model_data.csv"],
+        "outputs": ["engagement_model.pkl", "engagement_model.json"],
+        "external": False,
+    },
+}
+
+
+def stage_order(stages=None):
+    order = list(TopologicalSorter({name: stage["after"] for name, stage in STAGES.items()}).static_order())
+    return [name for name in order if stages is None or name in stages]
+
+def fingerprint(stage, channel_ids, options):
+    spec = STAGES[stage]
+    hasher = hashlib.sha256(stage.encode())
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in spec["code"]:
+        with open(os.path.join(here, name), "rb") as f:
+            hasher.update(f.read())
+    params = {name: options[name] for name in spec["params"]}
+    if spec["external"]:
+        params.update(channel_ids=sorted(channel_ids), day=date.today().isoformat())
+    hasher.update(json.dumps(params, sort_keys=True).encode())
+    for name in spec["inputs"]:
+        update_input_hash(hasher, name)
+    return hasher.hexdigest()[:16]
+
+def unit_runner(stage, stage_fingerprint, workers):
+    # Runs work(unit) for every unit not yet checkpointed under this fingerprint, in parallel,
+    # or batch(units) -> {unit: result} once for all of them (a unit it leaves out gets None);
+    # returns {unit: result} in unit order and raises once every unit has been tried
+    directory = os.path.join(PIPELINE_DIR, stage, stage_fingerprint)
+
+    def run_units(units, work=None, batch=None):
+        results = {}
+        for unit in units:
+            path = os.path.join(directory, f"{unit}.json")
+            if os.path.exists(path):
+                with open(path) as f:
+                    results[unit] = json.load(f)
+        todo = [unit for unit in units if unit not in results]
+        if results:
+            print(f"[{stage}] resuming: {len(results)}/{len(units)} channels already done")
+            metrics.inc("pipeline_units_total", len(results), stage=stage, status="resumed")
+
+        def attempts():
+            # (unit, result or exception) as units finish; a single worker runs them on the
+            # calling thread, where a profiler can see them
+            if batch is not None:
+                try:
+                    outcomes = batch(todo) if todo else {}
+                except Exception as e:
+                    outcomes = {unit: e for unit in todo}
+                for unit in todo:
+                    yield unit, outcomes.get(unit)
+                return
+            if workers <= 1:
+                for unit in todo:
+                    try:
+                        yield unit, work(unit)
+                    except Exception as e:
+                        yield unit, e
+                return
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(work, unit): unit for unit in todo}
+                for future in as_completed(futures):
+                    yield futures[future], future.exception() or future.result()
+
+        failures = {}
+        for unit, outcome in attempts():
+            if isinstance(outcome, Exception):
+                failures[unit] = outcome
+                print(f"[{stage}] {unit} failed: {outcome!r}")
+                metrics.inc("pipeline_units_total", stage=stage, status="failed")
+                continue
+            results[unit] = outcome
+            write_json(os.path.join(directory, f"{unit}.json"), outcome)
+            metrics.inc("pipeline_units_total", stage=stage, status="done")
+        if failures:
+            raise StageError(f"{stage}: {len(failures)} of {len(units)} channels failed; rerun to resume")
+        return {unit: results[unit] for unit in units}
+
+    run_units.resuming = os.path.isdir(directory) and bool(os.listdir(directory))
+    return run_units
+
+def clear_checkpoints(stage):
+    directory = os.path.join(PIPELINE_DIR, stage)
+    for fingerprint_dir in os.listdir(directory) if os.path.isdir(directory) else []:
+        for name in os.listdir(os.path.join(directory, fingerprint_dir)):
+            os.remove(os.path.join(directory, fingerprint_dir, name))
+        os.rmdir(os.path.join(directory, fingerprint_dir))
+
+def run(channel_ids, stages=None, force=(), workers=WORKERS, profiler=None, **options):
+    state = load_state()
+    if profiler:
+        # Profilers only see the thread they were started on
+        workers = 1
+    for stage in stage_order(stages):
+        stage_fingerprint = fingerprint(stage, channel_ids, options)
+        last = state.get(stage, {})
+        if stage not in force and last.get("fingerprint") == stage_fingerprint and outputs_exist(stage):
+            print(f"[{stage}] up to date ({stage_fingerprint}), skipping")
+            metrics.inc("pipeline_stages_skipped_total", stage=stage)
+            continue
+
+        print(f"[{stage}] running ({stage_fingerprint})")
+        start = time.perf_counter()
+        try:
+            with metrics.timed("pipeline_stage", stage=stage), metrics.profile(stage, profiler):
+                STAGES[stage]["run"](channel_ids, unit_runner(stage, stage_fingerprint, workers), options)
+        except StageError:
+            raise
+        except Exception as e:
+            raise StageError(f"{stage}: {e!r}") from e
+        elapsed = time.perf_counter() - start
+
+        state[stage] = {"fingerprint": stage_fingerprint, "seconds": round(elapsed, 2),
+                        "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        write_json(STATE_PATH, state)
+        clear_checkpoints(stage)
+        print(f"[{stage}] done in {elapsed:.2f}s")
+
+def status(channel_ids, **options):
+    state = load_state()
+    for stage in stage_order():
+        last = state.get(stage)
+        current = fingerprint(stage, channel_ids, options)
+        directory = os.path.join(PIPELINE_DIR, stage, current)
+        pending = len(os.listdir(directory)) if os.path.isdir(directory) else 0
+        if last is None:
+            label = "never run"
+        elif last["fingerprint"] == current and outputs_exist(stage):
+            label = f"up to date (ran {last['finished_at']}, {last['seconds']}s)"
+        else:
+            label = f"stale (last ran {last['finished_at']})"
+        print(f"{stage:9s} {label}" + (f", {pending} channels checkpointed" if pending else ""))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the fetch/score/prepare/train pipeline.")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), help="run only these stages (in DAG order)")
+    parser.add_argument("--force", nargs="*", choices=list(STAGES),
+                        help="rerun these stages even if up to date; no names forces every stage")
+    parser.add_argument("--channels", nargs="+", help="channel IDs; defaults to the registry (channels.txt)")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="channels processed in parallel")
+    parser.add_argument("--videos-per-channel", type=int, default=5)
+    parser.add_argument("--max-comments", type=int, default=100)
+    parser.add_argument("--replies", action="store_true", help="also fetch and score reply threads")
+    parser.add_argument("--full-comments", action="store_true", help="rewrite the comments table from scratch")
+    parser.add_argument("--incremental-train", action="store_true", help="warm-start the saved model")
+    parser.add_argument("--profile", choices=["cprofile", "pyinstrument"], default=metrics.PROFILE or None,
+                        help="profile each stage that runs (output in metrics/profiles)")
+    parser.add_argument("--status", action="store_true", help="show which stages are up to date and exit")
+    args = parser.parse_args(argv)
+
+    if args.channels:
+        channel_ids = args.channels
+    else:
+        from channel_registry import tracked_channel_ids
+        channel_ids = tracked_channel_ids()
+    options = dict(videos_per_channel=args.videos_per_channel, max_comments=args.max_comments,
+                   replies=args.replies, full_comments=args.full_comments, incremental_train=args.incremental_train)
+
+    if args.status:
+        status(channel_ids, **options)
+    else:
+        force = list(STAGES) if args.force == [] else args.force or []
+        if args.full_comments:
+            force.append("comments")
+        try:
+            run(channel_ids, args.stages, force, args.workers, args.profile, **options)
+        except StageError as e:
+            raise SystemExit(f"Pipeline stopped: {e}")
+
+
+if __name__ == "__main__":
+    main()
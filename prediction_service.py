@@ -0,0 +1,192 @@
+# prediction_service.py
+# Engagement (views) predictions for the dashboard and any other caller.
+# The model is loaded once per process with memory-mapped arrays and reloaded when the
+# pickle changes; inputs are validated and aligned to the layout the model was trained
+# on (raw video rows are turned into features by the feature store), and predictions
+# are cached per video ID and feature values. Run as a script to serve a local HTTP API:
+#   POST /predict {"records": [...]} -> {"predictions": [...]}, GET /health
+
+import os
+import copy
+import json
+import argparse
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+import joblib
+from engagement_model import MODEL_PATH, MODEL_INFO_PATH
+from feature_store import FEATURE_COLUMNS, DAY_COLUMNS, INPUT_COLUMNS, compute_features
+import metrics
+
+CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "100000"))
+HOST = os.getenv("PREDICTION_HOST", "127.0.0.1")
+PORT = int(os.getenv("PREDICTION_PORT", "8765"))
+# Smaller batches predict on one thread; starting the worker threads costs more than it saves
+PARALLEL_MIN_ROWS = 1000
+
+_lock = threading.Lock()
+_model = {"version": None, "estimator": None, "serial": None, "features": FEATURE_COLUMNS}
+# (video ID, feature values) -> prediction, least recently used first
+_cache = OrderedDict()
+
+
+def model_version():
+    # Raises FileNotFoundError until engagement_model.py has been run
+    return os.path.getmtime(MODEL_PATH), os.path.getsize(MODEL_PATH)
+
+def feature_layout():
+    # The columns the saved model was trained on, in order
+    if os.path.exists(MODEL_INFO_PATH):
+        with open(MODEL_INFO_PATH) as f:
+            return json.load(f)["features"]
+    return FEATURE_COLUMNS
+
+def loaded_model():
+    # The current model entry, reloaded if the pickle changed
+    version = model_version()
+    with _lock:
+        if _model["version"] != version:
+            # Tree arrays stay in the page cache and are shared by every process serving them
+            estimator = joblib.load(MODEL_PATH, mmap_mode="r")
+            # A shallow copy pinned to one thread for small batches; it shares the trees,
+            # and neither copy's n_jobs is changed after this, so concurrent calls can't race
+            serial = estimator
+            if getattr(estimator, "n_jobs", None) is not None:
+                serial = copy.copy(estimator)
+                serial.n_jobs = 1
+            _model.update(version=version, estimator=estimator, serial=serial, features=feature_layout())
+            _cache.clear()
+        return dict(_model)
+
+def get_model():
+    model = loaded_model()
+    return model["estimator"], model["features"]
+
+def align(records, columns):
+    # Records (dicts or a frame) -> (float matrix in the model's column order, video IDs).
+    # Day-of-week flags default to False; any other missing feature is an error.
+    numeric = [c for c in columns if c not in DAY_COLUMNS]
+    if not isinstance(records, pd.DataFrame):
+        if all(set(numeric) <= record.keys() for record in records):
+            # Already-featurized dicts skip pandas entirely; most single calls land here
+            matrix = np.array([[record.get(c, False) for c in columns] for record in records], dtype=float)
+            return matrix.reshape(len(records), len(columns)), [record.get("Video ID") for record in records]
+        records = pd.DataFrame.from_records(records)
+
+    df = records.reset_index(drop=True)
+    video_ids = df["Video ID"].tolist() if "Video ID" in df.columns else [None] * len(df)
+    if not set(numeric) <= set(df.columns) and set(INPUT_COLUMNS) <= set(df.columns):
+        # Raw video rows: derive the features exactly as training did
+        df = compute_features(df.assign(**{"Video ID": video_ids}))
+    missing = [c for c in numeric if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing features: {missing}")
+
+    matrix = np.zeros((len(df), len(columns)))
+    for j, column in enumerate(columns):
+        if column in DAY_COLUMNS:
+            if column in df.columns:
+                matrix[:, j] = df[column].fillna(False).astype(bool).to_numpy()
+        else:
+            matrix[:, j] = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    return matrix, video_ids
+
+def predict_frame(records):
+    # Predictions as a float array in input order; NaN where a feature is missing/invalid
+    model = loaded_model()
+    columns = model["features"]
+    matrix, video_ids = align(records, columns)
+    predictions = np.full(len(matrix), np.nan)
+    if not len(matrix):
+        return predictions
+
+    keys = [(video_id, row.tobytes()) for video_id, row in zip(video_ids, matrix)]
+    with _lock:
+        for i, key in enumerate(keys):
+            if key in _cache:
+                _cache.move_to_end(key)
+                predictions[i] = _cache[key]
+    todo = np.flatnonzero(np.isnan(predictions) & ~np.isnan(matrix).any(axis=1))
+    metrics.inc("prediction_rows_total", len(matrix))
+    metrics.inc("prediction_cache_hits_total", int((~np.isnan(predictions)).sum()))
+    if len(todo):
+        estimator = model["estimator"] if len(todo) >= PARALLEL_MIN_ROWS else model["serial"]
+        with metrics.timed("model_predict", model="serving") as timer:
+            predictions[todo] = estimator.predict(pd.DataFrame(matrix[todo], columns=columns))
+            timer.add_rows(len(todo))
+        with _lock:
+            for i in todo:
+                _cache[keys[i]] = predictions[i]
+            while len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+    return predictions
+
+def predict(records):
+    # JSON-friendly predictions: one float (or None) per record
+    return [None if np.isnan(p) else float(p) for p in predict_frame(records)]
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        if self.path != "/predict":
+            return self.reply(404, {"error": f"Unknown path {self.path}"})
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            records = body["records"] if isinstance(body, dict) else body
+            self.reply(200, {"predictions": predict(records)})
+        except FileNotFoundError:
+            self.reply(503, {"error": "Model not trained; run engagement_model.py"})
+        except (ValueError, KeyError, TypeError) as e:
+            self.reply(400, {"error": str(e)})
+
+    def do_GET(self):
+        if self.path != "/health":
+            return self.reply(404, {"error": f"Unknown path {self.path}"})
+        try:
+            _, columns = get_model()
+        except FileNotFoundError:
+            return self.reply(503, {"error": "Model not trained; run engagement_model.py"})
+        self.reply(200, {"features": columns, "cached_predictions": len(_cache)})
+
+    def reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def make_server(host=HOST, port=PORT):
+    return ThreadingHTTPServer((host, port), PredictionHandler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve engagement predictions over HTTP.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args(argv)
+
+    get_model()
+    server = make_server(args.host, args.port)
+    print(f"Serving predictions on http://{args.host}:{server.server_address[1]}/predict")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
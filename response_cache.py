@@ -0,0 +1,193 @@
+# response_cache.py
+# On-disk cache of YouTube Data API responses shared by the sync and async clients.
+# Responses are stored in SQLite keyed by endpoint and normalized parameters (the API key
+# is left out), served while younger than the endpoint's TTL and revalidated with
+# If-None-Match once stale. The file is capped in size, evicting least recently used
+# responses first. Modes (RESPONSE_CACHE):
+#   off     no caching
+#   on      serve fresh responses, revalidate stale ones, store everything fetched
+#   record  always fetch and store, so a run can be replayed later
+#   replay  serve stored responses of any age and never touch the network; a miss raises
+
+import os
+import sys
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from urllib.parse import urlencode
+
+CACHE_MODE = os.getenv("RESPONSE_CACHE", "on")
+CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", os.path.join(".cache", "responses.sqlite"))
+CACHE_MAX_BYTES = int(float(os.getenv("RESPONSE_CACHE_MAX_MB", "256")) * 1024 * 1024)
+MODES = {"off", "on", "record", "replay"}
+
+# Seconds a response is served without revalidation. Comment pages change the fastest.
+ENDPOINT_TTLS = {
+    "channels": 3600,
+    "videos": 3600,
+    "search": 3600,
+    "playlistItems": 3600,
+    "commentThreads": 900,
+    "comments": 900,
+}
+DEFAULT_TTL = 900
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    request TEXT NOT NULL,
+    etag TEXT,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+"""
+
+
+class CacheMissError(KeyError):
+    # Replay mode was asked for a response that was never recorded
+    pass
+
+
+class CachedResponse:
+    def __init__(self, key, etag, body, stored_at, ttl):
+        self.key = key
+        self.etag = etag
+        self.body = body
+        self.stored_at = stored_at
+        self.ttl = ttl
+
+    @property
+    def fresh(self):
+        return time.time() - self.stored_at < self.ttl
+
+    def json(self):
+        return json.loads(self.body)
+
+
+def request_key(base_url, endpoint, params):
+    # Same key whatever the parameter order; the API key never reaches the cache
+    normalized = urlencode(sorted((k, str(v)) for k, v in params.items() if k != "key"))
+    request = f"{base_url.rstrip('/')}/{endpoint}?{normalized}"
+    return hashlib.sha256(request.encode()).hexdigest(), request
+
+
+class ResponseCache:
+    def __init__(self, path=CACHE_PATH, mode=CACHE_MODE, max_bytes=CACHE_MAX_BYTES, ttls=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}; expected one of {sorted(MODES)}")
+        self.path = path
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.ttls = {**ENDPOINT_TTLS, **(ttls or {})}
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # One connection shared by the fetcher threads and the event loop, serialized by the lock
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def lookup(self, base_url, endpoint, params):
+        # The stored response (fresh or stale) or None; record mode always misses
+        if self.mode == "record":
+            return None
+        key, request = request_key(base_url, endpoint, params)
+        with self.lock:
+            row = self.conn.execute("SELECT etag, body, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        if row is None:
+            if self.mode == "replay":
+                raise CacheMissError(f"No recorded response for {request}")
+            return None
+        etag, body, stored_at = row
+        # Replayed responses never go stale
+        ttl = float("inf") if self.mode == "replay" else self.ttls.get(endpoint, DEFAULT_TTL)
+        return CachedResponse(key, etag, zlib.decompress(body), stored_at, ttl)
+
+    def store(self, base_url, endpoint, params, body, etag=None):
+        key, request = request_key(base_url, endpoint, params)
+        compressed = zlib.compress(body, 1)
+        now = time.time()
+        with self.lock:
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, endpoint, request, etag, compressed, len(compressed), now, now)
+            )
+            self.total_bytes += len(compressed) - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def revalidated(self, cached):
+        # 304 Not Modified: the stored body is good for another TTL
+        now = time.time()
+        with self.lock:
+            self.conn.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?",
+                              (now, now, cached.key))
+        cached.stored_at = now
+
+    def _evict(self):
+        # Least recently used first, down to 90% of the cap so eviction doesn't run on every store
+        target = self.max_bytes * 0.9
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        evicted = []
+        for key, size in rows:
+            if self.total_bytes <= target:
+                break
+            evicted.append((key,))
+            self.total_bytes -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def summary(self):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT endpoint, COUNT(*), SUM(size) FROM responses GROUP BY endpoint ORDER BY endpoint"
+            ).fetchall()
+        return {endpoint: {"responses": count, "bytes": size} for endpoint, count, size in rows}
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.execute("VACUUM")
+            self.total_bytes = 0
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_response_cache(mode=None):
+    # Process-wide cache for the configured mode; None when caching is off
+    mode = mode or CACHE_MODE
+    if mode == "off":
+        return None
+    with _caches_lock:
+        if mode not in _caches:
+            _caches[mode] = ResponseCache(mode=mode)
+        return _caches[mode]
+
+
+if __name__ == "__main__":
+    # python response_cache.py [stats|clear]
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    cache = ResponseCache(mode="on")
+    if command == "clear":
+        cache.clear()
+        print(f"Cleared {CACHE_PATH}")
+    else:
+        for endpoint, info in cache.summary().items():
+            print(f"{endpoint:15s} {info['responses']:7d} responses {info['bytes'] / 1e6:9.2f} MB")
+        print(f"{'total':15s} {cache.total_bytes / 1e6:27.2f} MB of {CACHE_MAX_BYTES / 1e6:.0f} MB")
@@ -1,27 +1,18 @@
 # sentiment_analyzer.py
 
-from googleapiclient.discovery import build
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-from nltk import download
-import numpy as np
-from dotenv import load_dotenv
-
-download('vader_lexicon')
-
-load_dotenv()
-API_KEY = os.getenv("YOUTUBE_API_KEY")  
-youtube = build("youtube", "v3", developerKey=API_KEY)
+from youtube_client import get_client
+from sentiment_scoring import score_batch
 
 # Fetch comments for a given video ID
 def get_comments(video_id, max_results=100):
     comments = []
-    request = youtube.commentThreads().list(
+    response = get_client().get(
+        "commentThreads",
         part="snippet",
         videoId=video_id,
         maxResults=min(max_results, 100),
         textFormat="plainText"
     )
-    response = request.execute()
 
     for item in response.get("items", []):
         comment = item["snippet"]["topLevelComment"]["snippet"]["textDisplay"]
@@ -32,7 +23,6 @@ def get_comments(video_id, max_results=100):
 # Analyze sentiment
 def analyze_video_comments(video_id):
     comments = get_comments(video_id)
-    sid = SentimentIntensityAnalyzer()
 
     if not comments:
         return {
@@ -43,22 +33,12 @@ def analyze_video_comments(video_id):
             "total_comments": 0
         }
 
-    compound_scores = []
-    pos_scores = []
-    neg_scores = []
-    neu_scores = []
-
-    for comment in comments:
-        score = sid.polarity_scores(comment)
-        compound_scores.append(score["compound"])
-        pos_scores.append(score["pos"])
-        neg_scores.append(score["neg"])
-        neu_scores.append(score["neu"])
+    scores = score_batch(comments)
 
     return {
-        "compound": np.mean(compound_scores),
-        "pos": np.mean(pos_scores),
-        "neg": np.mean(neg_scores),
-        "neu": np.mean(neu_scores),
+        "compound": float(scores["compound"].mean()),
+        "pos": float(scores["pos"].mean()),
+        "neg": float(scores["neg"].mean()),
+        "neu": float(scores["neu"].mean()),
         "total_comments": len(comments)
     }
@@ -0,0 +1,126 @@
+# sentiment_scoring.py
+# Shared VADER scoring: lexicon loaded once from a local cache, batch scoring into a
+# numpy structured array, a content-hash LRU cache for repeated texts and optional
+# multi-process fan-out. NLTK (about 2s to import) is loaded on the first score, and
+# the lexicon is only ever downloaded then, never at import.
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import metrics
+
+# Local lexicon cache (defaults to ./nltk_data next to the scripts)
+NLTK_DATA_DIR = os.getenv("NLTK_DATA", os.path.join(os.path.dirname(os.path.abspath(__file__)), "nltk_data"))
+CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", 200000))
+# With NLTK_OFFLINE=1 a missing lexicon is an error instead of a download
+OFFLINE = os.getenv("NLTK_OFFLINE", "0") == "1"
+
+SCORE_DTYPE = np.dtype([("compound", "f4"), ("pos", "f4"), ("neu", "f4"), ("neg", "f4")])
+
+_analyzer = None
+_cache = OrderedDict()
+# Worker threads (pipeline.py) score concurrently; OrderedDict reordering isn't thread-safe
+_cache_lock = threading.Lock()
+
+
+def ensure_lexicon():
+    # Only touches the network the first time, when no cached lexicon is found
+    import nltk
+    if NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.append(NLTK_DATA_DIR)
+    try:
+        nltk.data.find("sentiment/vader_lexicon.zip")
+    except LookupError:
+        if OFFLINE:
+            raise LookupError(f"VADER lexicon not found in {NLTK_DATA_DIR}; run `python sentiment_scoring.py` "
+                              "once with network access to cache it") from None
+        nltk.download("vader_lexicon", download_dir=NLTK_DATA_DIR, quiet=True)
+
+def get_analyzer():
+    global _analyzer
+    if _analyzer is None:
+        ensure_lexicon()
+        from nltk.sentiment.vader import SentimentIntensityAnalyzer
+        _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
+
+def text_key(text):
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+def _score_unique(texts):
+    # Score distinct texts through the LRU cache; returns a list of score tuples
+    analyzer = get_analyzer()
+    results = []
+    scored = 0
+    for text in texts:
+        key = text_key(text)
+        with _cache_lock:
+            scores = _cache.get(key)
+            if scores is not None:
+                _cache.move_to_end(key)
+        if scores is None:
+            scored += 1
+            s = analyzer.polarity_scores(text)
+            scores = (s["compound"], s["pos"], s["neu"], s["neg"])
+            with _cache_lock:
+                _cache[key] = scores
+                if len(_cache) > CACHE_SIZE:
+                    _cache.popitem(last=False)
+        results.append(scores)
+    # polarity_scores calls; the rest were served from the cache
+    metrics.inc("sentiment_polarity_scores_total", scored)
+    return results
+
+def _dedupe(texts):
+    # -> (distinct texts, index of each input text into them)
+    positions = {}
+    unique = []
+    inverse = np.empty(len(texts), dtype=np.int64)
+    for i, text in enumerate(texts):
+        if not isinstance(text, str):
+            text = ""
+        position = positions.get(text)
+        if position is None:
+            position = positions[text] = len(unique)
+            unique.append(text)
+        inverse[i] = position
+    return unique, inverse
+
+def score_batch(texts):
+    # Scores for every text, in input order, as a SCORE_DTYPE structured array
+    with metrics.timed("sentiment_batch") as timer:
+        unique, inverse = _dedupe(list(texts))
+        timer.add_rows(len(inverse))
+        return np.array(_score_unique(unique), dtype=SCORE_DTYPE)[inverse]
+
+def score_batch_parallel(texts, workers=None, chunk_size=20000):
+    # Same as score_batch, but distinct texts are scored in chunks across processes
+    with metrics.timed("sentiment_batch") as timer:
+        unique, inverse = _dedupe(list(texts))
+        timer.add_rows(len(inverse))
+        if len(unique) <= chunk_size:
+            return np.array(_score_unique(unique), dtype=SCORE_DTYPE)[inverse]
+
+        chunks = [unique[start:start + chunk_size] for start in range(0, len(unique), chunk_size)]
+        ensure_lexicon()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            scores = [row for chunk in pool.map(_score_unique, chunks) for row in chunk]
+        return np.array(scores, dtype=SCORE_DTYPE)[inverse]
+
+def score_text(text):
+    # polarity_scores-style dict for a single (possibly joined) text
+    row = score_batch([text])[0]
+    return {name: round(float(row[name]), 4) for name in SCORE_DTYPE.names}
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+if __name__ == "__main__":
+    # Fills the local lexicon cache, e.g. while building an image that later runs offline
+    ensure_lexicon()
+    print(f"VADER lexicon cached in {NLTK_DATA_DIR}")
@@ -0,0 +1,118 @@
+# smoothing_forecast.py
+# Vectorized damped-trend exponential smoothing (additive Holt with a damped trend) for
+# many subscriber series at once. Every channel is stacked into one NumPy array, right-
+# aligned on its last observed day, and the smoothing recursion, parameter search and
+# prediction intervals run as array operations across all channels together.
+
+import json
+import numpy as np
+import pandas as pd
+
+# Each channel keeps the (alpha, beta) pair with the lowest one-step-ahead squared error
+ALPHAS = np.array([0.1, 0.3, 0.5, 0.8, 1.0])
+BETAS = np.array([0.01, 0.05, 0.2, 0.5])
+PHI = 0.98
+# Prophet's default interval_width is 0.8
+INTERVAL_Z = 1.2816
+
+
+def stack_series(series_by_channel):
+    # {channel_id: ds/y frame} -> channel ids, last dates and a channels x days array holding
+    # each series right-aligned on its own last date (NaN before it starts)
+    channel_ids = np.array(list(series_by_channel), dtype=object)
+    frames = list(series_by_channel.values())
+    ds = pd.to_datetime(np.concatenate([f["ds"].to_numpy() for f in frames])).to_numpy().astype("datetime64[D]")
+    y = np.concatenate([f["y"].to_numpy(dtype=float) for f in frames])
+    rows = np.repeat(np.arange(len(frames)), [len(f) for f in frames])
+    start = ds.min()
+    cols = (ds - start).astype(int)
+
+    # Scatter onto one shared daily grid (later rows win), then fill gaps inside each series
+    values = np.full((len(frames), cols.max() + 1), np.nan)
+    values[rows, cols] = y
+    values = pd.DataFrame(values.T).interpolate(limit_area="inside").to_numpy().T
+
+    days = values.shape[1]
+    last = days - 1 - np.argmax(~np.isnan(values[:, ::-1]), axis=1)
+    source = np.arange(days) - (days - 1 - last)[:, None]
+    aligned = np.take_along_axis(values, np.clip(source, 0, None), axis=1)
+    aligned[source < 0] = np.nan
+    return channel_ids, pd.DatetimeIndex(start + last), aligned
+
+def smooth(values, alpha, beta, phi=PHI, keep_fitted=False):
+    # Runs the recursion for all channels (and, when alpha/beta are (G, 1) columns, all G
+    # parameter pairs) at once. The first observation sets the level, the second the trend.
+    shape = np.broadcast_shapes(np.shape(alpha), values.shape[:1])
+    level = np.full(shape, np.nan)
+    trend = np.zeros(shape)
+    seen = np.zeros(shape, dtype=int)
+    sse = np.zeros(shape)
+    fitted = np.full(values.shape, np.nan) if keep_fitted else None
+
+    for t in range(values.shape[1]):
+        y = values[:, t]
+        valid = ~np.isnan(y)
+        forecast = level + phi * trend
+        update = valid & (seen >= 2)
+        error = np.where(update, y - forecast, 0.0)
+        sse += error ** 2
+        if keep_fitted:
+            fitted[:, t] = np.where(update, forecast, y)
+
+        second = valid & (seen == 1)
+        trend = np.where(second, y - level, np.where(update, phi * trend + alpha * beta * error, trend))
+        level = np.where(second | (valid & (seen == 0)), y, np.where(update, forecast + alpha * error, level))
+        seen += valid
+    return level, trend, sse, np.maximum(seen - 2, 1), fitted
+
+def fit(values, phi=PHI):
+    # Grid search over every (alpha, beta) pair in one pass, then refit with the winners
+    alpha_grid, beta_grid = (g.ravel()[:, None] for g in np.meshgrid(ALPHAS, BETAS, indexing="ij"))
+    _, _, sse, _, _ = smooth(values, alpha_grid, beta_grid, phi)
+    best = np.argmin(sse, axis=0)
+    alpha, beta = alpha_grid[best, 0], beta_grid[best, 0]
+    level, trend, sse, count, fitted = smooth(values, alpha, beta, phi, keep_fitted=True)
+    return {
+        "alpha": alpha, "beta": beta, "phi": phi, "level": level, "trend": trend,
+        "sigma": np.sqrt(sse / count), "fitted": fitted,
+    }
+
+def predict(params, periods):
+    # h-step means and intervals for the additive damped-trend model
+    phi = params["phi"]
+    powers = np.cumsum(phi ** np.arange(1, periods + 1))             # phi + ... + phi^h
+    yhat = params["level"][:, None] + powers * params["trend"][:, None]
+    # Var(h) = sigma^2 * (1 + sum_{j<h} (alpha + alpha*beta*phi_j)^2)
+    c = params["alpha"][:, None] * (1 + params["beta"][:, None] * powers[:-1])
+    spread = np.sqrt(1 + np.concatenate([np.zeros((len(yhat), 1)), np.cumsum(c ** 2, axis=1)], axis=1))
+    width = INTERVAL_Z * params["sigma"][:, None] * spread
+    return yhat, yhat - width, yhat + width
+
+def forecast_many(series_by_channel, periods):
+    # Same ds/yhat/yhat_lower/yhat_upper frames as Prophet: fitted history plus the future
+    channel_ids, last_dates, values = stack_series(series_by_channel)
+    params = fit(values)
+    yhat, lower, upper = predict(params, periods)
+    history_width = INTERVAL_Z * params["sigma"]
+    last_days = last_dates.to_numpy().astype("datetime64[D]")
+    value_columns = pd.Index(["yhat", "yhat_lower", "yhat_upper"])
+
+    results = {}
+    for i, channel_id in enumerate(channel_ids):
+        history = params["fitted"][i, ~np.isnan(values[i])]
+        offsets = np.arange(1 - len(history), periods + 1)
+        columns = np.column_stack([
+            np.concatenate([history, yhat[i]]),
+            np.concatenate([history - history_width[i], lower[i]]),
+            np.concatenate([history + history_width[i], upper[i]]),
+        ])
+        forecast = pd.DataFrame(columns, columns=value_columns, copy=False)
+        forecast.insert(0, "ds", (last_days[i] + offsets).astype("datetime64[ns]"))
+        model_json = json.dumps({
+            "engine": "smoothing",
+            **{name: float(params[name][i]) for name in ["alpha", "beta", "level", "trend", "sigma"]},
+            "phi": params["phi"],
+            "last_date": last_dates[i].date().isoformat(),
+        })
+        results[channel_id] = (forecast, model_json)
+    return results
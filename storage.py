@@ -0,0 +1,385 @@
+# storage.py
+# Table storage for the pipeline outputs with pluggable backends.
+# The default backend keeps each table as a Parquet dataset partitioned by channel and
+# date, with explicit column types, column/predicate pushdown on read and appends that
+# land as new files. The CSV backend keeps the original one-file-per-table layout.
+# write() modes: "append", "overwrite" (the whole table) and "replace" (only the rows of
+# the channels in the frame, i.e. its values of the first partition column). CSV writes
+# hold an exclusive lock on the table, so concurrent fetcher shards don't lose each other's
+# rows in a replace.
+
+import os
+import time
+import uuid
+import shutil
+from contextlib import contextmanager
+from datetime import date
+from urllib.parse import quote
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import metrics
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+DATA_DIR = os.getenv("DATA_DIR", "data")
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "parquet")
+
+# Explicit column types per table, the columns each table is partitioned by and its
+# date column (filled with today's date when missing from written rows). Tables with a
+# unique key keep the last written row per key when compacted.
+TABLES = {
+    "channel_stats": {
+        "schema": pa.schema([
+            ("Channel ID", pa.string()),
+            ("Channel Name", pa.string()),
+            ("Subscribers", pa.int64()),
+            ("Total Views", pa.int64()),
+            ("Total Videos", pa.int64()),
+            ("Ingest Date", pa.string()),
+        ]),
+        "partition_by": ["Channel ID", "Ingest Date"],
+        "date_column": "Ingest Date",
+    },
+    "video_sentiments": {
+        "schema": pa.schema([
+            ("Channel ID", pa.string()),
+            ("Channel Name", pa.string()),
+            ("Video Title", pa.string()),
+            ("Video ID", pa.string()),
+            ("Upload Date", pa.string()),
+            ("Publish Time", pa.string()),
+            ("Publish Day", pa.string()),
+            ("Title Length", pa.int32()),
+            ("Views", pa.int64()),
+            ("Sentiment Score", pa.float64()),
+            ("% Positive", pa.float64()),
+            ("% Negative", pa.float64()),
+            ("% Neutral", pa.float64()),
+            ("Total Comments", pa.int32()),
+            ("Subscribers", pa.int64()),
+            ("Published At", pa.string()),
+            ("Tags", pa.string()),
+            ("Ingest Date", pa.string()),
+        ]),
+        "partition_by": ["Channel ID", "Ingest Date"],
+        "date_column": "Ingest Date",
+    },
+    "comment_sentiments": {
+        "schema": pa.schema([
+            ("Channel ID", pa.string()),
+            ("Video ID", pa.string()),
+            ("Video Title", pa.string()),
+            ("Comment ID", pa.string()),
+            ("Parent ID", pa.string()),
+            ("Published At", pa.string()),
+            ("Comment", pa.string()),
+            ("Sentiment", pa.float32()),
+            ("Positive", pa.float32()),
+            ("Neutral", pa.float32()),
+            ("Negative", pa.float32()),
+            ("Ingest Date", pa.string()),
+        ]),
+        "partition_by": ["Channel ID", "Ingest Date"],
+        "date_column": "Ingest Date",
+    },
+    "subs_timeseries": {
+        "schema": pa.schema([
+            ("date", pa.string()),
+            ("channel_id", pa.string()),
+            ("channel_name", pa.string()),
+            ("subscribers", pa.int64()),
+            ("total_views", pa.int64()),
+            ("total_videos", pa.int64()),
+        ]),
+        # One directory per channel so a single series is read without touching the others
+        "partition_by": ["channel_id"],
+        "date_column": "date",
+        "unique_key": ["channel_id", "date"],
+    },
+    "channel_catalog": {
+        "schema": pa.schema([
+            ("Channel ID", pa.string()),
+            ("Video ID", pa.string()),
+            ("Video Title", pa.string()),
+            ("Upload Date", pa.string()),
+            ("Published At", pa.string()),
+            ("Ingest Date", pa.string()),
+        ]),
+        # Every upload of a channel, appended as new uploads are discovered
+        "partition_by": ["Channel ID"],
+        "date_column": "Ingest Date",
+        "unique_key": ["Channel ID", "Video ID"],
+    },
+    "video_features": {
+        "schema": pa.schema([
+            ("Video ID", pa.string()),
+            ("Input Hash", pa.uint64()),
+            ("Title Length", pa.int32()),
+            ("Tag Count", pa.int32()),
+            ("Sentiment Score", pa.float64()),
+            ("Publish Hour", pa.int8()),
+            ("Day of Week_Monday", pa.bool_()),
+            ("Day of Week_Saturday", pa.bool_()),
+            ("Day of Week_Sunday", pa.bool_()),
+            ("Day of Week_Thursday", pa.bool_()),
+            ("Day of Week_Tuesday", pa.bool_()),
+            ("Day of Week_Wednesday", pa.bool_()),
+            ("Feature Version", pa.int32()),
+            ("Ingest Date", pa.string()),
+        ]),
+        # One directory per feature-schema version; a version bump starts a fresh partition
+        "partition_by": ["Feature Version"],
+        "date_column": "Ingest Date",
+        "unique_key": ["Video ID"],
+    },
+}
+
+PANDAS_DTYPES = {
+    pa.string(): "string",
+    pa.float32(): "float32",
+    pa.float64(): "float64",
+}
+
+
+def date_column(table):
+    return TABLES[table]["date_column"]
+
+def dedupe(table, df):
+    # Keep the last written row per unique key, ordered by date
+    key = TABLES[table].get("unique_key")
+    if not key or df.empty:
+        return df
+    df = df.drop_duplicates(subset=[c for c in key if c in df.columns], keep="last")
+    return df.sort_values(date_column(table), kind="stable").reset_index(drop=True)
+
+def to_arrow(table, df):
+    # Cast a frame to the table schema: missing columns become nulls, unknown ones are dropped
+    schema = TABLES[table]["schema"]
+    df = df.copy()
+    if date_column(table) not in df.columns:
+        df[date_column(table)] = date.today().isoformat()
+    for field in schema:
+        if field.name not in df.columns:
+            df[field.name] = None
+    return pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+
+def filter_expression(filters):
+    # {"col": value} or {"col": [values]} -> pyarrow dataset expression
+    expression = None
+    for column, value in (filters or {}).items():
+        if isinstance(value, (list, tuple, set)):
+            condition = ds.field(column).isin(list(value))
+        else:
+            condition = ds.field(column) == value
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+class ParquetBackend:
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+
+    def path(self, table):
+        return os.path.join(self.data_dir, table)
+
+    def partitioning(self, table):
+        schema = TABLES[table]["schema"]
+        return ds.partitioning(
+            pa.schema([schema.field(name) for name in TABLES[table]["partition_by"]]), flavor="hive"
+        )
+
+    def exists(self, table):
+        return os.path.isdir(self.path(table))
+
+    def write(self, table, df, mode="append"):
+        if mode == "overwrite":
+            self.delete(table)
+        if df.empty:
+            return
+        # Every write lands as new files, so appends never rewrite existing data. A replace
+        # is written next to the table first, then swapped in (see swap_in)
+        target = self.path(table)
+        if mode == "replace":
+            target = f"{self.path(table)}.{os.getpid()}-{uuid.uuid4().hex[:8]}.tmp"
+        with metrics.timed("storage_write", table=table, backend="parquet") as timer:
+            ds.write_dataset(
+                to_arrow(table, df),
+                target,
+                format="parquet",
+                partitioning=self.partitioning(table),
+                # Time-ordered names so path order is write order
+                basename_template=f"part-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+            )
+            timer.add_rows(len(df))
+        if mode == "replace":
+            self.swap_in(table, target)
+
+    def swap_in(self, table, staged):
+        # Moves each channel's partition directory from `staged` into the table, one rename
+        # after the old one is moved aside: readers never find the channel empty while its
+        # files are written, and a crash before the swap leaves the old rows in place. Only
+        # these channels change, so workers writing other channels at the same time are unaffected.
+        os.makedirs(self.path(table), exist_ok=True)
+        for name in os.listdir(staged):
+            current = os.path.join(self.path(table), name)
+            retired = os.path.join(staged, f"{name}.old")
+            if os.path.isdir(current):
+                os.replace(current, retired)
+            os.replace(os.path.join(staged, name), current)
+        shutil.rmtree(staged, ignore_errors=True)
+
+    def dataset(self, table):
+        if not self.exists(table):
+            raise FileNotFoundError(f"No data for table '{table}' in {self.path(table)}")
+        return ds.dataset(self.path(table), format="parquet", schema=TABLES[table]["schema"],
+                          partitioning=self.partitioning(table))
+
+    def read_arrow(self, table, columns=None, filters=None):
+        # Only the requested columns and matching partitions/row groups are read
+        with metrics.timed("storage_read", table=table, backend="parquet") as timer:
+            result = self.dataset(table).to_table(columns=columns, filter=filter_expression(filters))
+            timer.add_rows(result.num_rows)
+        return result
+
+    def read(self, table, columns=None, filters=None):
+        return self.read_arrow(table, columns, filters).to_pandas()
+
+    def delete(self, table):
+        if self.exists(table):
+            shutil.rmtree(self.path(table))
+
+    def compact(self, table):
+        # Rewrite each partition as a single deduplicated, date-sorted file
+        if not self.exists(table):
+            return
+        partition_dirs = sorted({os.path.dirname(path) for path in self.dataset(table).files})
+        for partition_dir in partition_dirs:
+            old_files = sorted(os.path.join(partition_dir, name) for name in os.listdir(partition_dir)
+                               if name.endswith(".parquet"))
+            already_compact = old_files[0].endswith("-compacted.parquet") or not TABLES[table].get("unique_key")
+            if len(old_files) < 2 and already_compact:
+                continue
+            schema = TABLES[table]["schema"]
+            file_schema = pa.schema([f for f in schema if f.name not in TABLES[table]["partition_by"]])
+            merged = ds.dataset(old_files, format="parquet", schema=file_schema).to_table().to_pandas()
+            merged = dedupe(table, merged)
+
+            compacted = os.path.join(partition_dir, f"part-{time.time_ns():020d}-compacted.parquet")
+            pq.write_table(pa.Table.from_pandas(merged, schema=file_schema, preserve_index=False), compacted)
+            for path in old_files:
+                os.remove(path)
+
+
+@contextmanager
+def file_lock(path):
+    # Exclusive lock on `path`.lock, held across processes until the block exits
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.lock", "a+") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class CsvBackend:
+    def __init__(self, data_dir="."):
+        self.data_dir = data_dir
+
+    def path(self, table):
+        return os.path.join(self.data_dir, f"{table}.csv")
+
+    def exists(self, table):
+        return os.path.exists(self.path(table))
+
+    def write(self, table, df, mode="append"):
+        with metrics.timed("storage_write", table=table, backend="csv") as timer:
+            frame = to_arrow(table, df).to_pandas()
+            path = self.path(table)
+            # Replace is a read-modify-write of the whole file: locked, and swapped in whole
+            with file_lock(path):
+                if mode == "append" and self.exists(table):
+                    frame.to_csv(path, mode="a", header=False, index=False)
+                else:
+                    if mode == "replace" and self.exists(table):
+                        column = TABLES[table]["partition_by"][0]
+                        kept = pd.read_csv(path, dtype=str)
+                        frame = pd.concat([kept[~kept[column].isin(frame[column].astype(str))], frame],
+                                          ignore_index=True)
+                    tmp = f"{path}.{os.getpid()}.tmp"
+                    frame.to_csv(tmp, index=False)
+                    os.replace(tmp, path)
+            timer.add_rows(len(frame))
+
+    def read(self, table, columns=None, filters=None):
+        schema = TABLES[table]["schema"]
+        wanted = set(columns or schema.names) | set(filters or {})
+        dtypes = {field.name: PANDAS_DTYPES[field.type] for field in schema if field.type in PANDAS_DTYPES}
+        with metrics.timed("storage_read", table=table, backend="csv") as timer:
+            df = pd.read_csv(self.path(table), usecols=lambda c: c in wanted, dtype=dtypes)
+            timer.add_rows(len(df))
+        for column, value in (filters or {}).items():
+            if column not in df.columns:
+                continue
+            values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            df = df[df[column].isin(values)]
+        return df[[c for c in (columns or df.columns) if c in df.columns]].reset_index(drop=True)
+
+    def read_arrow(self, table, columns=None, filters=None):
+        return pa.Table.from_pandas(self.read(table, columns, filters), preserve_index=False)
+
+    def delete(self, table):
+        if self.exists(table):
+            os.remove(self.path(table))
+
+    def compact(self, table):
+        if self.exists(table):
+            df = dedupe(table, pd.read_csv(self.path(table)))
+            df.to_csv(self.path(table), index=False)
+
+
+BACKENDS = {
+    "parquet": ParquetBackend,
+    "csv": CsvBackend,
+}
+
+_storage = {}
+
+def get_storage(backend=None):
+    name = backend or STORAGE_BACKEND
+    if name not in _storage:
+        _storage[name] = BACKENDS[name]()
+    return _storage[name]
+
+def migrate_csv(source_dir=".", backend="parquet"):
+    # One-off import of the legacy CSV outputs into another backend
+    csv = CsvBackend(source_dir)
+    target = get_storage(backend)
+    for table in TABLES:
+        if not csv.exists(table):
+            continue
+        df = pd.read_csv(csv.path(table))
+        if table == "comment_sentiments" and "Channel ID" not in df.columns and csv.exists("video_sentiments"):
+            videos = pd.read_csv(csv.path("video_sentiments"), usecols=["Video ID", "Channel ID"])
+            df = df.merge(videos.drop_duplicates("Video ID"), on="Video ID", how="left")
+        target.write(table, df, mode="overwrite")
+        print(f"Migrated {table}: {len(df)} rows")
+
+
+if __name__ == "__main__":
+    migrate_csv()
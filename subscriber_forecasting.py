@@ -1,33 +1,49 @@
-import pandas as pd
-from prophet import Prophet
-import matplotlib.pyplot as plt
 import streamlit as st
+from storage import get_storage
+from subscriber_store import read_series
+from forecast_service import ENGINES, FORECAST_ENGINE, forecast_channel, prepare_series
 
-# Load the data
-df = pd.read_csv("subs_timeseries.csv")
 
-# Let user select a channel
-st.title("📈 YouTube Subscriber Forecasting")
-channels = df["channel_name"].unique()
-selected = st.selectbox("Select a Channel", sorted(channels))
+# Runs once per page load, like dashboard_app.main
+def main():
+    # Let user select a channel (names come from the small channel_stats table)
+    st.title("📈 YouTube Subscriber Forecasting")
+    channels = get_storage().read("channel_stats", columns=["Channel ID", "Channel Name"]).drop_duplicates("Channel ID")
+    selected = st.selectbox("Select a Channel", sorted(channels["Channel Name"]))
+    selected_id = channels.loc[channels["Channel Name"] == selected, "Channel ID"].iloc[0]
 
-# Prepare data
-df = df[df["channel_name"] == selected][["date", "subscribers"]].dropna()
-df = df.rename(columns={"date": "ds", "subscribers": "y"})
+    # Prepare data: only the selected channel's series
+    df = prepare_series(read_series(selected_id, columns=["date", "subscribers"]))
 
-# Fit model
-model = Prophet()
-model.fit(df)
+    # Forecast next 30 days (precomputed by forecast_service.py; fitted here only if the series changed)
+    engine = st.sidebar.selectbox("Forecast engine", sorted(ENGINES), index=sorted(ENGINES).index(FORECAST_ENGINE))
+    forecast = forecast_channel(selected_id, engine=engine)
+    if forecast is None:
+        st.info("Not enough subscriber history to forecast this channel yet.")
+        st.stop()
 
-# Forecast next 30 days
-future = model.make_future_dataframe(periods=30)
-forecast = model.predict(future)
+    # Plot (matplotlib is imported once the page has something to show)
+    import matplotlib.pyplot as plt
+    st.subheader("Forecast Plot")
+    fig1, ax = plt.subplots(figsize=(10, 5))
+    ax.plot(df["ds"].astype("datetime64[ns]"), df["y"], "k.", label="Observed")
+    ax.plot(forecast["ds"], forecast["yhat"], color="#0072B2", label="Forecast")
+    ax.fill_between(forecast["ds"], forecast["yhat_lower"], forecast["yhat_upper"], color="#0072B2", alpha=0.2)
+    ax.set_xlabel("ds")
+    ax.set_ylabel("y")
+    ax.legend()
+    st.pyplot(fig1)
 
-# Plot
-st.subheader("Forecast Plot")
-fig1 = model.plot(forecast)
-st.pyplot(fig1)
+    # Optional: Show forecast data
+    st.subheader("Forecast Data (next 30 days)")
+    st.dataframe(forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]].tail(30))
 
-# Optional: Show forecast data
-st.subheader("Forecast Data (next 30 days)")
-st.dataframe(forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]].tail(30))
+    # Views and uploads logged alongside subscribers
+    st.subheader("Channel History")
+    history = read_series(selected_id, columns=["date", "total_views", "total_videos"]).set_index("date")
+    st.line_chart(history[["total_views"]])
+    st.line_chart(history[["total_videos"]])
+
+
+if __name__ == "__main__":
+    main()
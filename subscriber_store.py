@@ -0,0 +1,55 @@
+# subscriber_store.py
+# Append-only daily subscriber/views/videos snapshots per channel.
+# Each fetch run appends one batch; rows are deduplicated on (date, channel) when read
+# and when the log is compacted, so re-running on the same day never doubles a point.
+
+from datetime import date
+import pandas as pd
+from storage import get_storage, dedupe
+
+TABLE = "subs_timeseries"
+
+
+def append_snapshot(channel_stats_by_id, day=None):
+    # One write for every channel fetched in this run
+    day = day or date.today().isoformat()
+    rows = pd.DataFrame([
+        {
+            "date": day,
+            "channel_id": channel_id,
+            "channel_name": stats["Channel Name"],
+            "subscribers": stats["Subscribers"],
+            "total_views": stats["Total Views"],
+            "total_videos": stats["Total Videos"]
+        }
+        for channel_id, stats in channel_stats_by_id.items()
+    ])
+    if rows.empty:
+        return rows
+    rows = dedupe(TABLE, rows)
+    get_storage().write(TABLE, rows, mode="append")
+    return rows
+
+def read_series(channel_id, columns=None):
+    # Only the channel's own partition is scanned
+    columns = columns or ["date", "subscribers", "total_views", "total_videos"]
+    df = get_storage().read(TABLE, columns=list(dict.fromkeys(["date", "channel_id"] + columns)),
+                            filters={"channel_id": channel_id})
+    return dedupe(TABLE, df)[columns]
+
+def read_all_series(channel_ids=None, columns=None):
+    # Every requested channel's series in one scan, keyed by channel
+    columns = columns or ["date", "subscribers", "total_views", "total_videos"]
+    filters = {"channel_id": list(channel_ids)} if channel_ids is not None else None
+    df = get_storage().read(TABLE, columns=list(dict.fromkeys(["date", "channel_id"] + columns)),
+                            filters=filters)
+    df = dedupe(TABLE, df)
+    return {channel_id: group[columns].reset_index(drop=True) for channel_id, group in df.groupby("channel_id")}
+
+def compact():
+    get_storage().compact(TABLE)
+
+
+if __name__ == "__main__":
+    compact()
+    print("Compacted", TABLE)
@@ -0,0 +1,194 @@
+# synthetic_data.py
+# Seeded synthetic YouTube data for benchmarks and offline development: channels, videos
+# (with views that depend on their features), comments whose word counts follow a
+# log-normal distribution like real comment sections, and daily subscriber histories.
+# scale=1 is SCALE_UNIT; higher scales multiply the number of channels.
+# Usage: python synthetic_data.py [scale]   (fills DATA_DIR and the warehouse)
+
+import sys
+import random
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+SCALE_UNIT = {"channels": 5, "videos_per_channel": 20, "comments_per_video": 50, "history_days": 365}
+END_DATE = datetime(2025, 6, 30)
+
+# Median ~9 words with a long tail, as in typical comment sections
+COMMENT_WORDS_MU = 2.2
+COMMENT_WORDS_SIGMA = 0.85
+MAX_COMMENT_WORDS = 300
+# Share of comments with a positive / negative / no particular tone, and how often a
+# word in a toned comment carries that tone
+TONES = [0.55, 0.2, 0.25]
+TONE_WORD_RATE = 0.2
+EMOJI_RATE = 0.1
+
+NEUTRAL = ("the this that video part minute channel when what how i you it is was at in on "
+           "and but so just really more about first time watch again code music audio editing "
+           "explain explained question idea tutorial episode series start end here there "
+           "always never maybe still my your we they").split()
+POSITIVE = "great love awesome amazing helpful thanks best nice fun beautiful excellent perfect good".split()
+NEGATIVE = "boring bad terrible hate awful worst annoying waste wrong poor confusing disappointing".split()
+EMOJIS = ["😂", "🔥", "❤️", "👍", "😢", "!!!", "lol"]
+TITLE_WORDS = ("How Why Python Data Guide Tutorial Beginners Advanced Tips Vlog Day Review Build "
+               "Learn Explained Fast Easy Complete Course Project Challenge Update Live Stream "
+               "Top Best Ultimate Secret Mistakes Math Science Family Life").split()
+TAGS = "python data science tutorial vlog family math education coding music gaming review".split()
+
+
+def word_counts(rng, n):
+    counts = np.rint(rng.lognormal(COMMENT_WORDS_MU, COMMENT_WORDS_SIGMA, n))
+    return np.clip(counts, 1, MAX_COMMENT_WORDS).astype(int)
+
+def comment_texts(n, seed=0):
+    # n comment texts, vectorized over one flat array of word indices
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array(NEUTRAL + POSITIVE + NEGATIVE, dtype=object)
+    lengths = word_counts(rng, n)
+    tone = np.repeat(rng.choice(3, n, p=TONES), lengths)
+    words = rng.integers(0, len(NEUTRAL), lengths.sum())
+    toned = (rng.random(len(words)) < TONE_WORD_RATE) & (tone < 2)
+    words[toned & (tone == 0)] = len(NEUTRAL) + rng.integers(0, len(POSITIVE), (toned & (tone == 0)).sum())
+    words[toned & (tone == 1)] = (len(NEUTRAL) + len(POSITIVE)
+                                  + rng.integers(0, len(NEGATIVE), (toned & (tone == 1)).sum()))
+    emoji = np.where(rng.random(n) < EMOJI_RATE, rng.integers(0, len(EMOJIS), n), -1)
+
+    tokens = vocabulary[words]
+    ends = np.cumsum(lengths)
+    texts = []
+    for i, end in enumerate(ends):
+        text = " ".join(tokens[end - lengths[i]:end]).capitalize()
+        texts.append(f"{text} {EMOJIS[emoji[i]]}" if emoji[i] >= 0 else text)
+    return texts
+
+def comment_text(key):
+    # One comment, always the same for the same key (the fake API server calls this per ID)
+    rng = random.Random(key)
+    n = int(min(max(round(rng.lognormvariate(COMMENT_WORDS_MU, COMMENT_WORDS_SIGMA)), 1), MAX_COMMENT_WORDS))
+    tone = rng.choices([POSITIVE, NEGATIVE, None], weights=TONES)[0]
+    words = [rng.choice(tone) if tone and rng.random() < TONE_WORD_RATE else rng.choice(NEUTRAL) for _ in range(n)]
+    text = " ".join(words).capitalize()
+    return f"{text} {rng.choice(EMOJIS)}" if rng.random() < EMOJI_RATE else text
+
+def channels(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Channel ID": [f"UC{i:022d}" for i in range(n)],
+        "Channel Name": [f"Synthetic Channel {i}" for i in range(n)],
+        "Subscribers": rng.lognormal(11, 1.8, n).astype("int64") + 100,
+        "Total Views": rng.lognormal(16, 2, n).astype("int64") + 10_000,
+        "Total Videos": rng.integers(20, 3000, n),
+    })
+
+def videos(channel_df, per_channel, seed=0):
+    # video_sentiments rows; views grow with subscribers, sentiment, tags and a good hour
+    rng = np.random.default_rng(seed)
+    n = len(channel_df) * per_channel
+    channel = channel_df.loc[np.repeat(np.arange(len(channel_df)), per_channel)].reset_index(drop=True)
+
+    published = pd.to_datetime(END_DATE) - pd.to_timedelta(rng.uniform(0, 365 * 86400, n), unit="s")
+    published = published.floor("s")
+    title_words = rng.integers(3, 12, n)
+    titles = [" ".join(rng.choice(TITLE_WORDS, k)) for k in title_words]
+    tag_counts = rng.integers(0, 12, n)
+    tags = [("|".join(rng.choice(TAGS, k)) if k else None) for k in tag_counts]
+    sentiment = 2 * rng.beta(5, 3, n) - 1
+    positive = rng.uniform(5, 40, n)
+    negative = rng.uniform(0, 15, n)
+    hour = published.hour.to_numpy()
+
+    log_views = (np.log(channel["Subscribers"].to_numpy()) * 0.6 + 2 + 0.8 * sentiment + 0.05 * tag_counts
+                 + 0.3 * ((hour >= 14) & (hour <= 18)) + rng.normal(0, 0.5, n))
+    return pd.DataFrame({
+        "Channel ID": channel["Channel ID"],
+        "Channel Name": channel["Channel Name"],
+        "Video Title": titles,
+        "Video ID": [f"{cid[-6:]}v{i % per_channel:04d}" for i, cid in enumerate(channel["Channel ID"])],
+        "Upload Date": published.strftime("%Y-%m-%d"),
+        "Publish Time": published.strftime("%H:%M"),
+        "Publish Day": published.day_name(),
+        "Title Length": [len(title) for title in titles],
+        "Views": np.exp(log_views).astype("int64"),
+        "Sentiment Score": sentiment.round(4),
+        "% Positive": positive.round(2),
+        "% Negative": negative.round(2),
+        "% Neutral": (100 - positive - negative).round(2),
+        "Total Comments": rng.poisson(80, n),
+        "Subscribers": channel["Subscribers"],
+        "Published At": published.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "Tags": tags,
+    })
+
+def comments(video_df, per_video, seed=0):
+    # comment_sentiments rows with random scores (scoring is benchmarked separately)
+    rng = np.random.default_rng(seed)
+    n = len(video_df) * per_video
+    index = np.repeat(np.arange(len(video_df)), per_video)
+    seq = np.tile(np.arange(per_video), len(video_df))
+    video_ids = video_df["Video ID"].to_numpy()[index]
+    published = (pd.to_datetime(video_df["Published At"].to_numpy()[index])
+                 + pd.to_timedelta(rng.exponential(3 * 86400, n), unit="s")).floor("s")
+    positive = rng.uniform(0, 0.6, n)
+    negative = rng.uniform(0, 0.4, n) * (1 - positive)
+    return pd.DataFrame({
+        "Channel ID": video_df["Channel ID"].to_numpy()[index],
+        "Video ID": video_ids,
+        "Video Title": video_df["Video Title"].to_numpy()[index],
+        "Comment ID": [f"{video_id}c{k}" for video_id, k in zip(video_ids, seq)],
+        "Parent ID": None,
+        "Published At": published.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "Comment": comment_texts(n, seed),
+        "Sentiment": (positive - negative).astype("float32"),
+        "Positive": positive.astype("float32"),
+        "Neutral": (1 - positive - negative).astype("float32"),
+        "Negative": negative.astype("float32"),
+    })
+
+def subscriber_history(channel_df, days, seed=0):
+    # subs_timeseries rows: logistic growth up to today's count, weekly ripple and noise
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(end=END_DATE, periods=days, freq="D").strftime("%Y-%m-%d")
+    t = np.arange(days)
+    frames = []
+    for row, midpoint, rate in zip(channel_df.itertuples(index=False),
+                                   rng.uniform(0.2, 1.2, len(channel_df)) * days,
+                                   rng.uniform(2, 10, len(channel_df)) / days):
+        final = row.Subscribers
+        curve = final / (1 + np.exp(-rate * (t - midpoint)))
+        curve *= final / curve[-1]
+        ripple = 1 + 0.002 * np.sin(2 * np.pi * t / 7) + rng.normal(0, 0.001, days)
+        frames.append(pd.DataFrame({
+            "date": dates,
+            "channel_id": row[0],
+            "channel_name": row[1],
+            "subscribers": np.maximum.accumulate(curve * ripple).astype("int64"),
+            "total_views": (row[3] * (t + 1) / days).astype("int64"),
+            "total_videos": np.linspace(max(row[4] - days // 7, 1), row[4], days).astype("int64"),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+def dataset(scale=1, seed=0):
+    # Every table at the given scale
+    unit = SCALE_UNIT
+    channel_df = channels(unit["channels"] * scale, seed)
+    video_df = videos(channel_df, unit["videos_per_channel"], seed)
+    return {
+        "channel_stats": channel_df,
+        "video_sentiments": video_df,
+        "comment_sentiments": comments(video_df, unit["comments_per_video"], seed),
+        "subs_timeseries": subscriber_history(channel_df, unit["history_days"], seed),
+    }
+
+def populate(scale=1, seed=0):
+    # Writes the dataset through the storage layer and loads it into the warehouse
+    from storage import get_storage
+    import warehouse
+    storage = get_storage()
+    for table, df in dataset(scale, seed).items():
+        storage.write(table, df, mode="overwrite")
+    warehouse.load_from_storage()
+
+
+if __name__ == "__main__":
+    populate(int(sys.argv[1]) if len(sys.argv) > 1 else 1)
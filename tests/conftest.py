@@ -0,0 +1,37 @@
+# tests/conftest.py
+# Every test runs in its own scratch directory: the stores default to paths relative to
+# the working directory, so changing into tmp_path isolates them. The response cache and
+# metrics export are turned off before any project module reads its settings.
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+for name in ["DATA_DIR", "WAREHOUSE_PATH", "WATCH_PATH", "REGISTRY_PATH", "FORECAST_DIR", "PIPELINE_DIR",
+             "COMMENT_STORE_DIR", "METRICS_DIR", "STORAGE_BACKEND", "YOUTUBE_API_BASE_URL"]:
+    os.environ.pop(name, None)
+os.environ["RESPONSE_CACHE"] = "off"
+os.environ["METRICS"] = "0"
+os.environ["YOUTUBE_API_KEY"] = "test"
+
+import pytest
+import storage
+import warehouse
+import watch_feed
+from fake_youtube_server import FakeYouTubeServer
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Per-path state kept by the modules would otherwise carry over between directories
+    monkeypatch.setattr(storage, "_storage", {})
+    monkeypatch.setattr(warehouse, "_initialized", set())
+    monkeypatch.setattr(watch_feed, "_initialized", set())
+    return tmp_path
+
+@pytest.fixture
+def fake_api():
+    with FakeYouTubeServer(videos_per_channel=5, comments_per_video=20) as fake:
+        yield fake
@@ -0,0 +1,92 @@
+# tests/test_async_ingestion.py
+# Quota bucket, retry/backoff and comment paging of the async ingestor against the fake API.
+
+import time
+import asyncio
+import httpx
+import pytest
+from async_ingestion import QuotaExceededError, TokenBucket, YouTubeIngestor, stream_new_comments
+from fake_youtube_server import FakeYouTubeServer
+
+
+def ingest(fake, coroutine, **kwargs):
+    # Runs coroutine(ingestor) with an ingestor on the fake server that backs off almost instantly
+    async def run():
+        async with YouTubeIngestor(base_url=fake.base_url, api_key="test", cache=False,
+                                   backoff_base=0.001, **kwargs) as ingestor:
+            return await coroutine(ingestor)
+    return asyncio.run(run())
+
+
+def test_token_bucket_spends_and_waits_for_refill():
+    bucket = TokenBucket(capacity=2, window_seconds=0.2)
+
+    async def spend():
+        start = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire("videos")
+        return time.monotonic() - start
+
+    # Two units are in the bucket; the third refills at 10 units a second
+    assert asyncio.run(spend()) >= 0.08
+    assert bucket.used["videos"] == 3
+    assert bucket.available() < 1
+
+def test_token_bucket_rejects_a_call_it_can_never_afford():
+    with pytest.raises(QuotaExceededError):
+        asyncio.run(TokenBucket(capacity=10).acquire("search"))
+
+def test_retries_rate_limits_and_server_errors():
+    with FakeYouTubeServer(failures={"videos": [429, 503, 403]}) as fake:
+        ingestor_stats = {}
+
+        async def run(ingestor):
+            stats = await ingestor.video_stats(["000000v0000"])
+            ingestor_stats["retries"] = ingestor.retry_count
+            return stats
+
+        stats = ingest(fake, run)
+        assert "000000v0000" in stats
+        assert ingestor_stats["retries"] == 3
+        assert fake.request_counts["videos"] == 4
+
+def test_gives_up_after_max_retries():
+    with FakeYouTubeServer(failures={"videos": [503, 503, 503]}) as fake:
+        with pytest.raises(httpx.HTTPStatusError):
+            ingest(fake, lambda ingestor: ingestor.video_stats(["000000v0000"]), max_retries=2)
+        assert fake.request_counts["videos"] == 3
+
+def test_incremental_paging_reads_down_to_the_mark_past_max_comments():
+    with FakeYouTubeServer(comments_per_video=300) as fake:
+        everything = ingest(fake, lambda ingestor: ingestor.comment_threads("000000v0000", None, order="time"))
+        mark = (everything[250]["id"], everything[250]["publishedAt"])
+        capped = ingest(fake, lambda ingestor: ingestor.comment_threads("000000v0000", 100, order="time"))
+        since = ingest(fake, lambda ingestor: ingestor.comment_threads("000000v0000", 100, order="time",
+                                                                       since=mark))
+    assert len(everything) == 300
+    assert len(capped) == 100
+    assert [c["id"] for c in since] == [c["id"] for c in everything[:250]]
+
+def test_a_failed_reply_fetch_skips_only_that_thread():
+    with FakeYouTubeServer(comments_per_video=3, replies_per_comment=7, failures={"comments": [404]}) as fake:
+        comments = ingest(fake, lambda ingestor: ingestor.comment_threads("000000v0000", 3, replies=True))
+    top_level = [c for c in comments if c["parentId"] is None]
+    replies = [c for c in comments if c["parentId"] is not None]
+    assert len(top_level) == 3
+    assert len(replies) == 2 * 7
+
+def test_stream_new_comments_skips_videos_whose_count_did_not_move(fake_api):
+    video_ids = ["000000v0000", "000000v0001"]
+    pages = []
+    counts = stream_new_comments(video_ids, {}, lambda video_id, page: pages.append((video_id, page)), 10,
+                                 base_url=fake_api.base_url, api_key="test", cache=False)
+    assert {video_id for video_id, _ in pages} == set(video_ids)
+
+    newest = {video_id: page[0] for video_id, page in reversed(pages)}
+    watermarks = {video_id: {"Newest Comment ID": newest[video_id]["id"],
+                             "Newest Published At": newest[video_id]["publishedAt"],
+                             "Comment Count": counts[video_id]} for video_id in video_ids}
+    pages.clear()
+    stream_new_comments(video_ids, watermarks, lambda video_id, page: pages.append((video_id, page)), 10,
+                        base_url=fake_api.base_url, api_key="test", cache=False)
+    assert pages == []
@@ -0,0 +1,50 @@
+# tests/test_channel_registry.py
+# Consistent-hash sharding and refresh leases.
+
+import time
+from channel_registry import ChannelRegistry, channel_entry, shard_for
+
+CHANNELS = [channel_entry(f"UC{i:022d}", interval="1h") for i in range(400)]
+
+
+def test_every_channel_has_one_shard_and_shards_are_balanced():
+    shards = [shard_for(channel["channel_id"], 4) for channel in CHANNELS]
+    assert set(shards) == {0, 1, 2, 3}
+    assert min(shards.count(shard) for shard in range(4)) > len(CHANNELS) / 4 / 2
+
+def test_adding_a_shard_only_moves_channels_onto_it():
+    before = {channel["channel_id"]: shard_for(channel["channel_id"], 4) for channel in CHANNELS}
+    after = {channel["channel_id"]: shard_for(channel["channel_id"], 5) for channel in CHANNELS}
+    moved = [channel_id for channel_id in before if before[channel_id] != after[channel_id]]
+    assert all(after[channel_id] == 4 for channel_id in moved)
+    assert len(moved) < len(CHANNELS) * 0.35
+
+def test_shards_claim_disjoint_channels():
+    registry = ChannelRegistry("registry.db", owner="a")
+    claimed = [set(registry.claim(CHANNELS, shard, 3)) for shard in range(3)]
+    assert set().union(*claimed) == {channel["channel_id"] for channel in CHANNELS}
+    assert sum(map(len, claimed)) == len(CHANNELS)
+
+def test_a_lease_blocks_other_workers_until_it_expires():
+    channels = CHANNELS[:3]
+    first, second = ChannelRegistry("registry.db", owner="a"), ChannelRegistry("registry.db", owner="b")
+    assert len(first.claim(channels, lease=0.2)) == 3
+    assert second.claim(channels) == []
+    time.sleep(0.3)
+    assert len(second.claim(channels)) == 3
+    # The expired owner can no longer record the refresh; the new owner can
+    first.mark_refreshed([channel["channel_id"] for channel in channels])
+    assert first.claim(channels) == []
+    second.mark_refreshed([channel["channel_id"] for channel in channels])
+    assert first.claim(channels) == []
+    assert len(first.claim(channels, force=True)) == 3
+
+def test_holding_renews_the_lease():
+    channels = CHANNELS[:2]
+    first, second = ChannelRegistry("registry.db", owner="a"), ChannelRegistry("registry.db", owner="b")
+    claimed = first.claim(channels, lease=0.3)
+    with first.holding(claimed, lease=0.3):
+        time.sleep(0.6)
+        assert second.claim(channels) == []
+    time.sleep(0.4)
+    assert len(second.claim(channels)) == 2
@@ -0,0 +1,51 @@
+# tests/test_comment_sentiment_fetcher.py
+# Incremental comment ingestion: appends skip stored comments, watermarks only move forward.
+
+import pandas as pd
+import async_ingestion
+import comment_sentiment_fetcher as fetcher
+from storage import get_storage
+
+VIDEOS = pd.DataFrame({"Channel ID": ["UC0000000000000000000000"] * 2,
+                       "Video ID": ["000000v0000", "000000v0001"],
+                       "Video Title": ["First", "Second"]})
+
+
+def mark(comment_id, published_at, count):
+    return {"Newest Comment ID": comment_id, "Newest Published At": published_at, "Comment Count": count}
+
+
+def test_append_skips_comments_already_stored():
+    chunk = fetcher.analyze_comments("v1", "Title", ["great video", "boring"], "UC1", comment_ids=["a", "b"],
+                                     published_at=["2025-06-01T00:00:00Z"] * 2, parent_ids=[None, None])
+    assert fetcher.append_comments(chunk) == 2
+    assert fetcher.append_comments(chunk) == 0
+    assert fetcher.append_comments(chunk.assign(**{"Comment ID": ["a", "c"]})) == 1
+    assert sorted(get_storage().read("comment_sentiments")["Comment ID"]) == ["a", "b", "c"]
+
+def test_watermarks_only_move_forward():
+    fetcher.update_watermarks({"v1": mark("new", "2025-06-02T00:00:00Z", 10)})
+    # A run that started from older marks (or saw no comments) doesn't undo the newer one
+    fetcher.update_watermarks({"v1": mark("old", "2025-06-01T00:00:00Z", 5), "v2": mark(None, None, 0)})
+    fetcher.update_watermarks({"v1": mark(None, None, 3)})
+    marks = fetcher.load_watermarks()
+    assert marks["v1"] == mark("new", "2025-06-02T00:00:00Z", 10)
+    assert marks["v2"] == mark(None, None, 0)
+    fetcher.update_watermarks({"v1": mark("newer", "2025-06-03T00:00:00Z", 12)})
+    assert fetcher.load_watermarks()["v1"]["Newest Comment ID"] == "newer"
+
+def test_incremental_run_resumes_without_duplicates(fake_api, monkeypatch):
+    monkeypatch.setattr(fetcher, "API_KEY", "test")
+    monkeypatch.setattr(fetcher, "stream_new_comments", lambda *args, **kwargs: async_ingestion.stream_new_comments(
+        *args, base_url=fake_api.base_url, cache=False, **kwargs))
+
+    fetcher.start_run()
+    fetcher.run_incremental(VIDEOS, max_comments=10)
+    stored = get_storage().read("comment_sentiments")
+    assert len(stored) == 2 * 10 and stored["Comment ID"].is_unique
+
+    # A run that failed after writing its comments but before saving the watermarks
+    fetcher.save_watermarks({})
+    fetcher.run_incremental(VIDEOS, max_comments=10)
+    stored = get_storage().read("comment_sentiments")
+    assert len(stored) == 2 * 10 and stored["Comment ID"].is_unique
@@ -0,0 +1,58 @@
+# tests/test_comment_store.py
+# Top-k slices from the comment store against a plain pandas sort of the same rows.
+
+import numpy as np
+import pytest
+import synthetic_data
+import comment_store
+from storage import get_storage
+
+
+@pytest.fixture
+def comments(monkeypatch):
+    monkeypatch.setattr(comment_store, "_store", {})
+    channels = synthetic_data.channels(3)
+    videos = synthetic_data.videos(channels, 4)
+    rows = synthetic_data.comments(videos, 30)
+    get_storage().write("comment_sentiments", rows, mode="append")
+    # Rescored comments are appended again; the store keeps the last row per Comment ID
+    rescored = rows.iloc[::4].assign(Sentiment=np.float32(0.99), Positive=np.float32(0.99),
+                                     Negative=np.float32(0))
+    get_storage().write("comment_sentiments", rescored, mode="append")
+    current = rows.set_index("Comment ID")
+    current.update(rescored.set_index("Comment ID"))
+    return current.reset_index()
+
+def expected(current, by, k, **match):
+    column = comment_store.RANKED[by]
+    rows = current
+    for key, value in match.items():
+        rows = rows[rows[key] == value]
+    return rows[column].astype("float32").sort_values(ascending=False, kind="stable").head(k).tolist()
+
+@pytest.mark.parametrize("by", ["positive", "negative"])
+@pytest.mark.parametrize("k", [5, comment_store.TOP_K + 10])
+def test_top_comments_per_channel_and_video(comments, by, k):
+    store = comment_store.open_store()
+    assert len(store) == len(comments)
+    column = comment_store.RANKED[by]
+    for channel_id in comments["Channel ID"].unique():
+        top = store.top_comments(channel_id, by=by, k=k)
+        assert top[column].tolist() == pytest.approx(expected(comments, by, k, **{"Channel ID": channel_id}))
+    for video_id in comments["Video ID"].unique()[:3]:
+        top = store.top_comments(video_id=video_id, by=by, k=k)
+        assert top[column].tolist() == pytest.approx(expected(comments, by, k, **{"Video ID": video_id}))
+        titles = comments.loc[comments["Video ID"] == video_id, "Video Title"].unique()
+        assert set(top["Video Title"]) <= set(titles)
+
+def test_unknown_channel_has_no_top_comments(comments):
+    assert comment_store.open_store().top_comments("UC-unknown").empty
+
+def test_a_new_table_version_gets_a_new_snapshot(comments):
+    first = comment_store.open_store()
+    extra = comments.head(1).assign(**{"Comment ID": "new", "Positive": np.float32(1.0)})
+    get_storage().write("comment_sentiments", extra, mode="append")
+    second = comment_store.open_store()
+    assert second is not first
+    assert len(second) == len(first) + 1
+    assert second.top_comments(extra["Channel ID"].iloc[0], k=1)["Positive"].tolist() == [1.0]
@@ -0,0 +1,63 @@
+# tests/test_pipeline.py
+# The fetch -> comments -> prepare -> train pipeline end to end against the fake API, run
+# as a script so the API base URL is read from the environment like in production.
+
+import os
+import sys
+import subprocess
+import pandas as pd
+import pytest
+import pipeline
+import synthetic_data
+from conftest import ROOT
+from storage import get_storage
+
+CHANNELS = [f"UC{i:022d}" for i in range(12)]
+
+
+def run_pipeline(fake, *args):
+    env = dict(os.environ, YOUTUBE_API_BASE_URL=fake.base_url)
+    return subprocess.run([sys.executable, os.path.join(ROOT, "pipeline.py"), "--channels", *CHANNELS, *args],
+                          env=env, capture_output=True, text=True, timeout=600)
+
+
+def test_fetch_to_train_against_the_fake_api(fake_api):
+    result = run_pipeline(fake_api)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    videos = get_storage().read("video_sentiments")
+    assert set(videos["Channel ID"]) == set(CHANNELS)
+    assert videos["Tags"].notna().all()
+    assert len(get_storage().read("comment_sentiments")) == len(videos) * 20
+
+    model_data = pd.read_csv("model_data.csv")
+    assert len(model_data) == len(videos)
+    assert (model_data["Tag Count"] > 0).all()
+    assert os.path.exists("engagement_model.pkl")
+
+    status = run_pipeline(fake_api, "--status")
+    assert status.stdout.count("up to date") == len(pipeline.STAGES), status.stdout
+
+def test_rerun_does_not_duplicate_comments(fake_api):
+    assert run_pipeline(fake_api, "--stages", "fetch", "comments").returncode == 0
+    first = len(get_storage().read("comment_sentiments"))
+    assert run_pipeline(fake_api, "--stages", "comments", "--force", "comments").returncode == 0
+    assert len(get_storage().read("comment_sentiments")) == first
+
+def test_prepare_with_no_usable_videos_fails_and_is_not_checkpointed():
+    videos = synthetic_data.videos(synthetic_data.channels(1), 3).assign(**{"Publish Time": None})
+    get_storage().write("video_sentiments", videos, mode="append")
+    options = dict(videos_per_channel=5, max_comments=100, replies=False, full_comments=False,
+                   incremental_train=False)
+    with pytest.raises(pipeline.StageError, match="prepare"):
+        pipeline.run(CHANNELS, ["prepare", "train"], **options)
+    assert "prepare" not in pipeline.load_state()
+
+def test_an_unexpected_error_in_a_stage_becomes_a_stage_error(monkeypatch):
+    def broken(channel_ids, run_units, options):
+        raise ValueError("boom")
+
+    monkeypatch.setitem(pipeline.STAGES["prepare"], "run", broken)
+    with pytest.raises(pipeline.StageError, match="prepare: ValueError"):
+        pipeline.run(CHANNELS, ["prepare"])
+    assert "prepare" not in pipeline.load_state()
@@ -0,0 +1,267 @@
+# video_watcher.py
+# Watch mode for fresh uploads: a long-running loop that picks up each tracked channel's
+# new videos and follows their views, likes and comment sentiment through the first
+# WATCH_HOURS after upload. A video is polled less often as it ages (POLL_SCHEDULE: every
+# 5 minutes in its first hour, backing off to hourly). Stats come from batched videos?id=
+# calls, 50 videos per quota unit, and the uploads playlist is only read for channels whose
+# video count went up (checked with channels?id=, 50 channels per unit). Every tick is
+# planned against the watcher's own quota budget (WATCH_QUOTA_UNITS a day): what it can't
+# afford waits for the next tick, youngest videos first. Each poll appends a velocity row
+# to the watch feed (watch_feed.py), which the dashboard reads incrementally. New comments
+# are scored as they arrive and written to comment_sentiments and the warehouse every
+# WATCH_FLUSH_INTERVAL, so the dashboard's other caches aren't invalidated on every poll.
+#   python video_watcher.py [--shard K --shards N] [--once]
+
+import os
+import math
+import time
+import asyncio
+import argparse
+from datetime import datetime
+import pandas as pd
+from dotenv import load_dotenv
+from async_ingestion import MAX_IDS_PER_REQUEST, QUOTA_WINDOW_SECONDS, TokenBucket, YouTubeIngestor
+from channel_registry import CHANNELS_FILE, parse_interval, shard_for, tracked_channel_ids
+from comment_sentiment_fetcher import analyze_comments, append_comments, load_watermarks, update_watermarks
+import watch_feed
+from watch_feed import WATCH_HOURS
+import metrics
+
+load_dotenv()
+
+
+def parse_schedule(text):
+    # "1h:5m,6h:15m" -> [(age limit in hours, poll interval in seconds)], youngest first
+    steps = [step.split(":") for step in text.split(",") if step.strip()]
+    return sorted((parse_interval(age) / 3600, parse_interval(interval)) for age, interval in steps)
+
+# Poll interval by age: under an hour old every 5 minutes, and so on; hourly after the last step
+POLL_SCHEDULE = parse_schedule(os.getenv("WATCH_SCHEDULE", "1h:5m,6h:15m,24h:30m"))
+MAX_POLL_SECONDS = parse_interval(os.getenv("WATCH_MAX_INTERVAL", "1h"))
+DISCOVER_SECONDS = parse_interval(os.getenv("WATCH_DISCOVER_INTERVAL", "10m"))
+FLUSH_SECONDS = parse_interval(os.getenv("WATCH_FLUSH_INTERVAL", "1h"))
+# Out of the project's 10,000 daily units, so batch fetches keep the rest
+WATCH_QUOTA_UNITS = int(os.getenv("WATCH_QUOTA_UNITS", 2000))
+# Newest uploads read from the playlist of a channel whose video count went up
+DISCOVER_DEPTH = 5
+MAX_COMMENTS = int(os.getenv("WATCH_MAX_COMMENTS", 100))
+COMMENT_PAGE_SIZE = 100
+
+
+def poll_interval(age_hours):
+    for limit, interval in POLL_SCHEDULE:
+        if age_hours < limit:
+            return interval
+    return MAX_POLL_SECONDS
+
+def age_hours(published_at, now):
+    return (now - datetime.fromisoformat(published_at.replace("Z", "+00:00")).timestamp()) / 3600
+
+def per_hour(current, previous, hours):
+    if current is None or previous is None or hours <= 0:
+        return None
+    return (current - previous) / hours
+
+
+class VideoWatcher:
+    def __init__(self, channel_ids, ingestor, max_comments=MAX_COMMENTS, path=None):
+        self.channel_ids = list(channel_ids)
+        self.ingestor = ingestor
+        self.max_comments = max_comments
+        self.path = path
+        # Last video count seen per channel; a channel is searched for uploads when it moves
+        self.video_counts = {}
+        self.next_discovery = 0
+        # Scored comments and their high-water marks, written out every FLUSH_SECONDS
+        self.pending = []
+        self.pending_marks = {}
+        self.last_flush = time.time()
+
+    def affordable(self):
+        return int(self.ingestor.bucket.available())
+
+    async def discover(self, now):
+        # New uploads from channels whose video count changed (all of them on the first pass)
+        if self.affordable() < math.ceil(len(self.channel_ids) / MAX_IDS_PER_REQUEST):
+            return 0
+        channels = await self.ingestor.channel_stats(self.channel_ids)
+        moved = [channel_id for channel_id, stats in channels.items()
+                 if stats["Total Videos"] != self.video_counts.get(channel_id)][:self.affordable()]
+        known = watch_feed.watched_ids(self.path)
+        playlists = await asyncio.gather(*[
+            self.ingestor.playlist_videos(channels[channel_id]["Uploads Playlist"] or "UU" + channel_id[2:],
+                                          DISCOVER_DEPTH, known_ids=known)
+            for channel_id in moved
+        ])
+
+        marks = load_watermarks()
+        fresh = []
+        for channel_id, videos in zip(moved, playlists):
+            self.video_counts[channel_id] = channels[channel_id]["Total Videos"]
+            for video in videos:
+                if age_hours(video["Published At"], now) >= WATCH_HOURS:
+                    continue
+                # Start from the comment fetcher's high-water mark, if it has one
+                mark = marks.get(video["Video ID"], {})
+                fresh.append({"video_id": video["Video ID"], "channel_id": channel_id,
+                              "title": video["Video Title"], "published_at": video["Published At"],
+                              "next_poll": now, "newest_comment_id": mark.get("Newest Comment ID"),
+                              "newest_comment_at": mark.get("Newest Published At")})
+        watch_feed.add_videos(fresh, self.path)
+        for video in fresh:
+            print(f"Watching new upload: {video['title']} ({video['video_id']})")
+        metrics.inc("watch_videos_added_total", len(fresh))
+        return len(fresh)
+
+    async def poll(self, now):
+        # Stats for the due videos, as many as the budget allows, youngest first
+        due = [video for video in watch_feed.active_videos(self.channel_ids, self.path)
+               if video["next_poll"] <= now]
+        due = due[:self.affordable() * MAX_IDS_PER_REQUEST]
+        if not due:
+            return 0
+        stats = await self.ingestor.video_stats([video["video_id"] for video in due])
+        # Deleted or made private since the last poll
+        gone = [video["video_id"] for video in due if video["video_id"] not in stats]
+        watch_feed.retire(gone, self.path)
+        due = [video for video in due if video["video_id"] in stats]
+
+        new_comments = await self.fetch_comments(due, stats)
+        samples, states = [], []
+        for video in due:
+            current = stats[video["video_id"]]
+            samples.append(self.sample(video, current, new_comments.get(video["video_id"], []), now))
+            states.append(video)
+        watch_feed.record_polls(samples, states, self.path)
+        metrics.inc("watch_polls_total", len(samples))
+        return len(samples)
+
+    async def fetch_comments(self, due, stats):
+        # New comments above each video's high-water mark, for videos whose count moved. Paging
+        # runs down to the mark however many there are, so `pages` is the usual cost, not a cap
+        pages = max(math.ceil(self.max_comments / COMMENT_PAGE_SIZE), 1)
+        moved = [video for video in due if stats[video["video_id"]]["Comments"] != (video["comments"] or 0)]
+        moved = moved[:self.affordable() // pages]
+        if not moved:
+            return {}
+        since_by_video = {video["video_id"]: (video["newest_comment_id"], video["newest_comment_at"])
+                          if video["newest_comment_id"] else None for video in moved}
+        return await self.ingestor.new_comments_for_videos(since_by_video, self.max_comments)
+
+    def sample(self, video, current, comments, now):
+        # Scores the video's new comments, updates its state in place and returns its velocity row
+        if comments:
+            scored = analyze_comments(
+                video["video_id"], video["title"], [c["text"] for c in comments], video["channel_id"],
+                comment_ids=[c["id"] for c in comments], published_at=[c["publishedAt"] for c in comments],
+                parent_ids=[c["parentId"] for c in comments])
+            self.pending.append(scored)
+            video["comments_scored"] += len(scored)
+            video["sentiment_sum"] += float(scored["Sentiment"].sum())
+            video["newest_comment_id"] = comments[0]["id"]
+            video["newest_comment_at"] = comments[0]["publishedAt"]
+            self.pending_marks[video["video_id"]] = {"Newest Comment ID": comments[0]["id"],
+                                                     "Newest Published At": comments[0]["publishedAt"],
+                                                     "Comment Count": current["Comments"]}
+
+        age = age_hours(video["published_at"], now)
+        # Rates since the previous poll; none on the first, where the only baseline is the
+        # upload itself and a few seconds of age would blow the rate up
+        if video["last_polled"] is None:
+            previous, hours = {"views": None, "likes": None, "comments": None}, 0
+        else:
+            previous, hours = video, (now - video["last_polled"]) / 3600
+        row = {
+            "video_id": video["video_id"],
+            "channel_id": video["channel_id"],
+            "polled_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now)),
+            "age_hours": round(age, 3),
+            "views": current["Views"],
+            "likes": current["Likes"],
+            "comments": current["Comments"],
+            "views_per_hour": per_hour(current["Views"], previous["views"], hours),
+            "likes_per_hour": per_hour(current["Likes"], previous["likes"], hours),
+            "comments_per_hour": per_hour(current["Comments"], previous["comments"], hours),
+            "mean_sentiment": video["sentiment_sum"] / video["comments_scored"] if video["comments_scored"] else None,
+        }
+        video.update(views=current["Views"], likes=current["Likes"], comments=current["Comments"],
+                     last_polled=now, next_poll=now + poll_interval(age), done=int(age >= WATCH_HOURS))
+        return row
+
+    def flush(self):
+        # Scored comments go to comment_sentiments and the warehouse, then their marks are
+        # saved, so comment_sentiment_fetcher.py picks up where the watcher left off
+        if self.pending:
+            saved = append_comments(pd.concat(self.pending, ignore_index=True))
+            update_watermarks(self.pending_marks)
+            print(f"Saved {saved} new comments on {len(self.pending_marks)} watched videos")
+        self.pending, self.pending_marks = [], {}
+        self.last_flush = time.time()
+
+    async def tick(self):
+        now = time.time()
+        with metrics.timed("watch_tick"):
+            if now >= self.next_discovery:
+                await self.discover(now)
+                self.next_discovery = now + DISCOVER_SECONDS
+            polled = await self.poll(now)
+            if time.time() - self.last_flush >= FLUSH_SECONDS:
+                self.flush()
+        if polled:
+            print(f"{time.strftime('%H:%M:%S')} polled {polled} videos, "
+                  f"{self.affordable()} quota units left in the budget")
+        return polled
+
+    def idle_seconds(self):
+        # Until the next poll or discovery is due, or until the budget holds a unit again
+        wake = min(filter(None, [watch_feed.next_poll(self.channel_ids, self.path), self.next_discovery]))
+        seconds = wake - time.time()
+        bucket = self.ingestor.bucket
+        if bucket.available() < 1:
+            seconds = max(seconds, (1 - bucket.tokens) / bucket.refill_per_second)
+        return min(max(seconds, 1), DISCOVER_SECONDS)
+
+    async def run(self, once=False):
+        try:
+            while True:
+                await self.tick()
+                if once:
+                    break
+                await asyncio.sleep(self.idle_seconds())
+        finally:
+            self.flush()
+
+
+def watch(channel_ids, once=False, max_comments=MAX_COMMENTS, quota_units=WATCH_QUOTA_UNITS, path=None,
+          **ingestor_kwargs):
+    async def _run():
+        bucket = TokenBucket(quota_units, QUOTA_WINDOW_SECONDS)
+        async with YouTubeIngestor(bucket=bucket, **ingestor_kwargs) as ingestor:
+            await VideoWatcher(channel_ids, ingestor, max_comments, path).run(once)
+    # Every poll wants fresh numbers, so the response cache is left out
+    ingestor_kwargs.setdefault("cache", False)
+    print(f"Watching uploads of {len(channel_ids)} channels for {WATCH_HOURS:g}h after publishing")
+    asyncio.run(_run())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Follow views, likes and comment sentiment of fresh uploads.")
+    parser.add_argument("--channels-file", default=CHANNELS_FILE)
+    parser.add_argument("--shard", type=int, default=0, help="this worker's shard, 0 to shards-1")
+    parser.add_argument("--shards", type=int, default=1, help="workers the channels are split across")
+    parser.add_argument("--once", action="store_true", help="run a single tick and exit")
+    parser.add_argument("--max-comments", type=int, default=MAX_COMMENTS, help="comments read on a video's first poll; later polls read every new one")
+    parser.add_argument("--quota-units", type=int, default=WATCH_QUOTA_UNITS, help="quota units to spend per day")
+    args = parser.parse_args(argv)
+    if args.max_comments < 1:
+        parser.error("--max-comments must be at least 1")
+
+    channel_ids = [channel_id for channel_id in tracked_channel_ids(args.channels_file)
+                   if shard_for(channel_id, args.shards) == args.shard]
+    try:
+        watch(channel_ids, args.once, args.max_comments, args.quota_units)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
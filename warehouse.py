@@ -0,0 +1,498 @@
+# warehouse.py
+# Embedded SQLite warehouse (WAL mode) for the dashboard: channels, videos, comments and
+# subscriber snapshots with indexes on channel/video/sentiment, upserts from the fetchers
+# and the per-channel queries the dashboard renders. Per-channel rollups (totals, weekly
+# and daily aggregates, comment label counts, running sums for the sentiment/views
+# correlation and a comment sentiment histogram) are kept current by triggers as rows
+# are written, so the dashboard reads a handful of precomputed rows per channel.
+
+import os
+import sqlite3
+import threading
+from contextlib import closing
+import pandas as pd
+
+WAREHOUSE_PATH = os.getenv("WAREHOUSE_PATH", "warehouse.db")
+
+# VADER's usual compound-score cut-offs for labelling a comment
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channels (
+    channel_id TEXT PRIMARY KEY,
+    channel_name TEXT NOT NULL,
+    subscribers INTEGER,
+    total_views INTEGER,
+    total_videos INTEGER,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS videos (
+    video_id TEXT PRIMARY KEY,
+    channel_id TEXT NOT NULL,
+    title TEXT,
+    published_at TEXT,
+    upload_date TEXT,
+    publish_time TEXT,
+    publish_day TEXT,
+    title_length INTEGER,
+    views INTEGER,
+    sentiment_score REAL,
+    pct_positive REAL,
+    pct_negative REAL,
+    pct_neutral REAL,
+    total_comments INTEGER,
+    tags TEXT,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_videos_channel_published ON videos (channel_id, published_at);
+CREATE INDEX IF NOT EXISTS idx_videos_channel_sentiment ON videos (channel_id, sentiment_score);
+
+CREATE TABLE IF NOT EXISTS comments (
+    comment_id TEXT PRIMARY KEY,
+    video_id TEXT NOT NULL,
+    channel_id TEXT,
+    parent_id TEXT,
+    text TEXT,
+    published_at TEXT,
+    sentiment REAL,
+    positive REAL,
+    neutral REAL,
+    negative REAL
+);
+CREATE INDEX IF NOT EXISTS idx_comments_video ON comments (video_id);
+CREATE INDEX IF NOT EXISTS idx_comments_channel_sentiment ON comments (channel_id, sentiment);
+CREATE INDEX IF NOT EXISTS idx_comments_channel_positive ON comments (channel_id, positive DESC);
+CREATE INDEX IF NOT EXISTS idx_comments_channel_negative ON comments (channel_id, negative DESC);
+
+CREATE TABLE IF NOT EXISTS subscriber_snapshots (
+    channel_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    subscribers INTEGER,
+    total_views INTEGER,
+    total_videos INTEGER,
+    PRIMARY KEY (channel_id, date)
+);
+"""
+
+# Columns added after a table was first created: (table, column, type)
+ADDED_COLUMNS = [
+    ("comments", "parent_id", "TEXT"),
+]
+
+# Videos above this sentiment score count towards the dashboard's engagement lift
+LIFT_THRESHOLD = 0.3
+# Comment sentiment histogram: equal-width bins over [-1, 1]
+SENTIMENT_BINS = 40
+# Bump when a rollup definition changes: the rollups are then rebuilt from the raw rows
+ROLLUP_VERSION = 1
+
+PAIRED = "{r}.sentiment_score IS NOT NULL AND {r}.views IS NOT NULL"
+POSITIVE = f"{{r}}.sentiment >= {POSITIVE_THRESHOLD}"
+NEGATIVE = f"{{r}}.sentiment <= {NEGATIVE_THRESHOLD}"
+
+def when(condition, value="1"):
+    return f"CASE WHEN {condition} THEN {value} ELSE 0 END"
+
+# Each rollup sums expressions over the rows of its source table, per key; expressions are
+# written against the row alias {r}. The first sum counts rows, and a key whose count
+# drops to zero is removed. Views are summed as REAL where squares could overflow.
+ROLLUPS = {
+    "channel_video_rollups": {
+        "source": "videos",
+        "key": {"channel_id": "{r}.channel_id"},
+        "where": "1",
+        "sums": {
+            "videos": "1",
+            "views": "COALESCE({r}.views, 0)",
+            # Videos with both sentiment and views: running sums for the correlation and lift
+            "pairs": when(PAIRED),
+            "sum_s": when(PAIRED, "{r}.sentiment_score"),
+            "sum_v": when(PAIRED, "CAST({r}.views AS REAL)"),
+            "sum_ss": when(PAIRED, "{r}.sentiment_score * {r}.sentiment_score"),
+            "sum_vv": when(PAIRED, "CAST({r}.views AS REAL) * {r}.views"),
+            "sum_sv": when(PAIRED, "{r}.sentiment_score * {r}.views"),
+            "lift_videos": when(f"{PAIRED} AND {{r}}.sentiment_score > {LIFT_THRESHOLD}"),
+            "lift_views": when(f"{PAIRED} AND {{r}}.sentiment_score > {LIFT_THRESHOLD}", "{r}.views"),
+            "base_videos": when(f"{PAIRED} AND {{r}}.sentiment_score <= {LIFT_THRESHOLD}"),
+            "base_views": when(f"{PAIRED} AND {{r}}.sentiment_score <= {LIFT_THRESHOLD}", "{r}.views"),
+        },
+    },
+    "weekly_video_rollups": {
+        "source": "videos",
+        # Weeks start on Monday, matching pandas' to_period("W")
+        "key": {"channel_id": "{r}.channel_id",
+                "week": "date(substr({r}.published_at, 1, 10), '-6 days', 'weekday 1')"},
+        "where": "{r}.published_at IS NOT NULL",
+        "sums": {
+            "uploads": "1",
+            "views": "COALESCE({r}.views, 0)",
+            "sentiment_n": when("{r}.sentiment_score IS NOT NULL"),
+            "sentiment_sum": "COALESCE({r}.sentiment_score, 0)",
+        },
+    },
+    "daily_video_rollups": {
+        "source": "videos",
+        "key": {"channel_id": "{r}.channel_id", "day": "substr({r}.published_at, 1, 10)"},
+        "where": "{r}.published_at IS NOT NULL",
+        "sums": {"uploads": "1", "views": "COALESCE({r}.views, 0)"},
+    },
+    "channel_comment_rollups": {
+        "source": "comments",
+        "key": {"channel_id": "{r}.channel_id"},
+        "where": "{r}.channel_id IS NOT NULL",
+        "sums": {
+            "comments": "1",
+            "positive": when(POSITIVE),
+            "negative": when(NEGATIVE),
+            # Unscored comments are labelled Neutral, as sentiment_label() does
+            "neutral": when(f"NOT COALESCE({POSITIVE} OR {NEGATIVE}, 0)"),
+            "sentiment_n": when("{r}.sentiment IS NOT NULL"),
+            "sentiment_sum": "COALESCE({r}.sentiment, 0)",
+        },
+    },
+    "daily_comment_rollups": {
+        "source": "comments",
+        "key": {"channel_id": "{r}.channel_id", "day": "substr({r}.published_at, 1, 10)"},
+        "where": "{r}.channel_id IS NOT NULL AND {r}.published_at IS NOT NULL",
+        "sums": {
+            "comments": "1",
+            "positive": when(POSITIVE),
+            "negative": when(NEGATIVE),
+            "sentiment_n": when("{r}.sentiment IS NOT NULL"),
+            "sentiment_sum": "COALESCE({r}.sentiment, 0)",
+        },
+    },
+    "comment_sentiment_bins": {
+        "source": "comments",
+        "key": {"channel_id": "{r}.channel_id",
+                "bin": f"MIN(MAX(CAST(({{r}}.sentiment + 1) * {SENTIMENT_BINS / 2} AS INTEGER), 0), {SENTIMENT_BINS - 1})"},
+        "where": "{r}.channel_id IS NOT NULL AND {r}.sentiment IS NOT NULL",
+        "sums": {"comments": "1"},
+    },
+}
+# Source columns the rollups read; updates that change none of them skip the triggers
+ROLLUP_INPUTS = {
+    "videos": ["channel_id", "published_at", "views", "sentiment_score"],
+    "comments": ["channel_id", "published_at", "sentiment"],
+}
+
+# Dashboard column names for the videos table
+VIDEO_COLUMNS = {
+    "video_id": "Video ID",
+    "channel_id": "Channel ID",
+    "title": "Video Title",
+    "published_at": "Published At",
+    "upload_date": "Upload Date",
+    "publish_time": "Publish Time",
+    "publish_day": "Publish Day",
+    "title_length": "Title Length",
+    "views": "Views",
+    "sentiment_score": "Sentiment Score",
+    "pct_positive": "% Positive",
+    "pct_negative": "% Negative",
+    "pct_neutral": "% Neutral",
+    "total_comments": "Total Comments",
+    "tags": "Tags",
+}
+
+
+def sentiment_label(column="c.sentiment"):
+    return (f"CASE WHEN {column} >= {POSITIVE_THRESHOLD} THEN 'Positive' "
+            f"WHEN {column} <= {NEGATIVE_THRESHOLD} THEN 'Negative' ELSE 'Neutral' END")
+
+
+def rollup_upsert(name, row, sign=""):
+    # Adds (or with sign="-", removes) one source row's contribution to a rollup
+    spec = ROLLUPS[name]
+    keys, sums = list(spec["key"]), list(spec["sums"])
+    values = [expr.format(r=row) for expr in spec["key"].values()]
+    values += [f"{sign}({expr.format(r=row)})" for expr in spec["sums"].values()]
+    updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in sums)
+    statements = [f"INSERT INTO {name} ({', '.join(keys + sums)}) SELECT {', '.join(values)} "
+                  f"WHERE {spec['where'].format(r=row)} ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates};"]
+    if sign:
+        matches = " AND ".join(f"{key} = {expr.format(r=row)}" for key, expr in spec["key"].items())
+        statements.append(f"DELETE FROM {name} WHERE {matches} AND {sums[0]} <= 0;")
+    return statements
+
+def rollup_ddl():
+    # Drops and recreates every rollup table and its triggers
+    statements = []
+    for source, columns in ROLLUP_INPUTS.items():
+        names = [name for name, spec in ROLLUPS.items() if spec["source"] == source]
+        add = lambda row: [sql for name in names for sql in rollup_upsert(name, row)]
+        remove = lambda row: [sql for name in names for sql in rollup_upsert(name, row, "-")]
+        changed = " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in columns)
+        triggers = {
+            f"{source}_rollup_insert": ("AFTER INSERT", "", add("NEW")),
+            f"{source}_rollup_update": ("AFTER UPDATE", f" WHEN {changed}", remove("OLD") + add("NEW")),
+            f"{source}_rollup_delete": ("AFTER DELETE", "", remove("OLD")),
+        }
+        for trigger, (event, condition, body) in triggers.items():
+            statements.append(f"DROP TRIGGER IF EXISTS {trigger}")
+            statements.append(f"CREATE TRIGGER {trigger} {event} ON {source} FOR EACH ROW{condition} "
+                              f"BEGIN {' '.join(body)} END")
+    for name, spec in ROLLUPS.items():
+        columns = [f"{key} NOT NULL" for key in spec["key"]] + [f"{column} NUMERIC NOT NULL" for column in spec["sums"]]
+        statements.append(f"DROP TABLE IF EXISTS {name}")
+        statements.append(f"CREATE TABLE {name} ({', '.join(columns)}, PRIMARY KEY ({', '.join(spec['key'])}))")
+    return statements
+
+def rebuild_rollups(conn):
+    # Recomputes every rollup from the raw rows
+    for name, spec in ROLLUPS.items():
+        keys, sums = list(spec["key"]), list(spec["sums"])
+        values = [expr.format(r="r") for expr in spec["key"].values()]
+        values += [f"SUM({expr.format(r='r')})" for expr in spec["sums"].values()]
+        conn.execute(f"DELETE FROM {name}")
+        conn.execute(f"INSERT INTO {name} ({', '.join(keys + sums)}) SELECT {', '.join(values)} "
+                     f"FROM {spec['source']} r WHERE {spec['where'].format(r='r')} "
+                     f"GROUP BY {', '.join(str(i + 1) for i in range(len(keys)))}")
+
+def ensure_rollups(conn):
+    # Creates the rollups (and fills them from rows already in the warehouse) on first use
+    # and whenever ROLLUP_VERSION changes; the version lives in PRAGMA user_version
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= ROLLUP_VERSION:
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    if conn.execute("PRAGMA user_version").fetchone()[0] < ROLLUP_VERSION:
+        for statement in rollup_ddl():
+            conn.execute(statement)
+        rebuild_rollups(conn)
+        conn.execute(f"PRAGMA user_version = {ROLLUP_VERSION}")
+    conn.execute("COMMIT")
+
+
+_initialized = set()
+
+def connect(path=None):
+    # WAL lets the fetchers write while the dashboard reads
+    path = path or WAREHOUSE_PATH
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if path not in _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        for table, column, sql_type in ADDED_COLUMNS:
+            if column not in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {sql_type}")
+        ensure_rollups(conn)
+        _initialized.add(path)
+    return conn
+
+def _upsert(table, key, rows, path=None):
+    rows = [row for row in rows if row.get(key) is not None]
+    if not rows:
+        return 0
+    columns = list(rows[0])
+    updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != key)
+    sql = (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+           f"ON CONFLICT ({key}) DO UPDATE SET {updates}")
+    with closing(connect(path)) as conn, conn:
+        conn.executemany(sql, [tuple(row[c] for c in columns) for row in rows])
+    return len(rows)
+
+def _records(df, mapping):
+    # Frame with dashboard column names -> warehouse rows (NaN -> NULL)
+    present = {source: target for source, target in mapping.items() if source in df.columns}
+    frame = df[list(present)].rename(columns=present).astype(object)
+    return frame.where(frame.notna(), None).to_dict("records")
+
+def upsert_channels(channel_df, path=None):
+    rows = _records(channel_df, {
+        "Channel ID": "channel_id",
+        "Channel Name": "channel_name",
+        "Subscribers": "subscribers",
+        "Total Views": "total_views",
+        "Total Videos": "total_videos",
+    })
+    return _upsert("channels", "channel_id", rows, path)
+
+def upsert_videos(video_df, path=None):
+    rows = _records(video_df, {target: source for source, target in VIDEO_COLUMNS.items()})
+    return _upsert("videos", "video_id", rows, path)
+
+def upsert_comments(comment_df, path=None):
+    rows = _records(comment_df, {
+        "Comment ID": "comment_id",
+        "Video ID": "video_id",
+        "Channel ID": "channel_id",
+        "Parent ID": "parent_id",
+        "Comment": "text",
+        "Published At": "published_at",
+        "Sentiment": "sentiment",
+        "Positive": "positive",
+        "Neutral": "neutral",
+        "Negative": "negative",
+    })
+    return _upsert("comments", "comment_id", rows, path)
+
+def upsert_subscriber_snapshots(snapshot_df, path=None):
+    rows = _records(snapshot_df, {
+        "channel_id": "channel_id",
+        "date": "date",
+        "subscribers": "subscribers",
+        "total_views": "total_views",
+        "total_videos": "total_videos",
+    })
+    if not rows:
+        return 0
+    columns = list(rows[0])
+    sql = (f"INSERT OR REPLACE INTO subscriber_snapshots ({', '.join(columns)}) "
+           f"VALUES ({', '.join('?' * len(columns))})")
+    with closing(connect(path)) as conn, conn:
+        conn.executemany(sql, [tuple(row[c] for c in columns) for row in rows])
+    return len(rows)
+
+_readers = threading.local()
+
+def reader(path=None):
+    # One long-lived connection per thread for queries: every new connection re-parses the
+    # schema, rollup triggers included, which costs more than the dashboard's small reads
+    path = path or WAREHOUSE_PATH
+    connections = _readers.__dict__.setdefault("connections", {})
+    if path not in connections:
+        connections[path] = connect(path)
+    return connections[path]
+
+def query(sql, params=(), path=None):
+    return pd.read_sql_query(sql, reader(path), params=params)
+
+
+# Dashboard queries
+def list_channels(path=None):
+    return query("SELECT channel_id AS 'Channel ID', channel_name AS 'Channel Name' "
+                 "FROM channels ORDER BY channel_name", path=path)
+
+def channel_metrics(channel_id, path=None):
+    row = query("""
+        SELECT c.subscribers AS subscribers,
+               COALESCE(r.videos, 0) AS videos,
+               COALESCE(r.views, 0) AS views
+        FROM channels c LEFT JOIN channel_video_rollups r ON r.channel_id = c.channel_id
+        WHERE c.channel_id = ?
+    """, (channel_id,), path)
+    return row.iloc[0].to_dict() if not row.empty else {"subscribers": None, "videos": 0, "views": 0}
+
+def channel_videos(channel_id, path=None):
+    columns = ", ".join(f"{source} AS '{target}'" for source, target in VIDEO_COLUMNS.items())
+    return query(f"SELECT {columns} FROM videos WHERE channel_id = ? ORDER BY published_at",
+                 (channel_id,), path)
+
+def weekly_aggregates(channel_id, path=None):
+    weekly = query("""
+        SELECT week AS Week, uploads AS Uploads, views AS Views,
+               sentiment_sum / NULLIF(sentiment_n, 0) AS 'Mean Sentiment'
+        FROM weekly_video_rollups WHERE channel_id = ? ORDER BY week
+    """, (channel_id,), path)
+    weekly["Week"] = pd.to_datetime(weekly["Week"])
+    weekly = weekly.set_index("Week")
+    weekly["Views Change %"] = weekly["Views"].pct_change() * 100
+    weekly["Uploads Change %"] = weekly["Uploads"].pct_change() * 100
+    return weekly
+
+def top_comments(channel_id, by="positive", k=5, path=None):
+    # Served straight from the (channel_id, positive/negative DESC) indexes
+    column = {"positive": "positive", "negative": "negative"}[by]
+    return query(f"""
+        SELECT v.title AS 'Video Title', c.text AS Comment, c.{column} AS '{column.title()}'
+        FROM comments c LEFT JOIN videos v ON v.video_id = c.video_id
+        WHERE c.channel_id = ?
+        ORDER BY c.{column} DESC LIMIT ?
+    """, (channel_id, k), path)
+
+def daily_activity(channel_id, path=None):
+    # Uploads, views and comments (with their labels and mean sentiment) per day
+    daily = query("""
+        SELECT day AS Day, SUM(uploads) AS Uploads, SUM(views) AS Views, SUM(comments) AS Comments,
+               SUM(positive) AS Positive, SUM(comments) - SUM(positive) - SUM(negative) AS Neutral,
+               SUM(negative) AS Negative, SUM(sentiment_sum) / NULLIF(SUM(sentiment_n), 0) AS 'Mean Sentiment'
+        FROM (SELECT day, uploads, views, 0 AS comments, 0 AS positive, 0 AS negative,
+                     0 AS sentiment_n, 0 AS sentiment_sum
+              FROM daily_video_rollups WHERE channel_id = ?
+              UNION ALL
+              SELECT day, 0, 0, comments, positive, negative, sentiment_n, sentiment_sum
+              FROM daily_comment_rollups WHERE channel_id = ?)
+        GROUP BY day ORDER BY day
+    """, (channel_id, channel_id), path)
+    daily["Day"] = pd.to_datetime(daily["Day"])
+    return daily.set_index("Day")
+
+def sentiment_label_counts(channel_id, path=None):
+    counts = query("""
+        SELECT negative AS Negative, neutral AS Neutral, positive AS Positive
+        FROM channel_comment_rollups WHERE channel_id = ?
+    """, (channel_id,), path)
+    counts = counts.iloc[0] if not counts.empty else pd.Series(0, index=counts.columns)
+    return counts[counts > 0].astype("int64").rename("count").rename_axis("Sentiment")
+
+def sentiment_summary(channel_id, path=None):
+    # Sentiment/views correlation, the engagement lift of videos above LIFT_THRESHOLD and
+    # comment sentiment mean and percentiles, all from the rollups (None when undefined)
+    videos = query("SELECT * FROM channel_video_rollups WHERE channel_id = ?", (channel_id,), path)
+    comments = query("SELECT * FROM channel_comment_rollups WHERE channel_id = ?", (channel_id,), path)
+    bins = query("SELECT bin, comments FROM comment_sentiment_bins WHERE channel_id = ? ORDER BY bin",
+                 (channel_id,), path)
+    summary = {"correlation": None, "positive_avg_views": None, "base_avg_views": None, "lift": None,
+               "comments": 0, "mean_sentiment": None, "p10": None, "median": None, "p90": None}
+
+    if not videos.empty:
+        v = videos.iloc[0]
+        n = v["pairs"]
+        var_s = n * v["sum_ss"] - v["sum_s"] ** 2
+        var_v = n * v["sum_vv"] - v["sum_v"] ** 2
+        if n >= 2 and var_s > 0 and var_v > 0:
+            summary["correlation"] = float((n * v["sum_sv"] - v["sum_s"] * v["sum_v"]) / (var_s * var_v) ** 0.5)
+        if v["lift_videos"]:
+            summary["positive_avg_views"] = float(v["lift_views"] / v["lift_videos"])
+        if v["base_videos"]:
+            summary["base_avg_views"] = float(v["base_views"] / v["base_videos"])
+        if summary["positive_avg_views"] is not None and summary["base_avg_views"]:
+            summary["lift"] = (summary["positive_avg_views"] - summary["base_avg_views"]) / summary["base_avg_views"] * 100
+
+    if not comments.empty:
+        c = comments.iloc[0]
+        summary["comments"] = int(c["comments"])
+        if c["sentiment_n"]:
+            summary["mean_sentiment"] = float(c["sentiment_sum"] / c["sentiment_n"])
+    if not bins.empty:
+        # Midpoint of the bin holding each quantile
+        cumulative = bins["comments"].cumsum().to_numpy() / bins["comments"].sum()
+        width = 2 / SENTIMENT_BINS
+        for name, q in [("p10", 0.1), ("median", 0.5), ("p90", 0.9)]:
+            summary[name] = -1 + (int(bins["bin"].iloc[int((cumulative < q).sum())]) + 0.5) * width
+    return summary
+
+def comments_with_label(channel_id, label, limit=10, path=None):
+    return query(f"""
+        SELECT v.title AS 'Video Title', c.text AS Comment, {sentiment_label()} AS label
+        FROM comments c LEFT JOIN videos v ON v.video_id = c.video_id
+        WHERE c.channel_id = ? AND {sentiment_label()} = ?
+        LIMIT ?
+    """, (channel_id, label, limit), path).rename(columns={"label": "Sentiment"})
+
+
+def load_from_storage(path=None):
+    # Backfill the warehouse from the storage layer
+    from storage import get_storage
+    storage = get_storage()
+    for table, upsert in [("channel_stats", upsert_channels), ("video_sentiments", upsert_videos),
+                          ("comment_sentiments", upsert_comments),
+                          ("subs_timeseries", upsert_subscriber_snapshots)]:
+        try:
+            df = storage.read(table)
+        except FileNotFoundError:
+            continue
+        if table == "comment_sentiments":
+            # Rows written before comment IDs were stored get a stable synthetic key
+            missing = df["Comment ID"].isna()
+            df.loc[missing, "Comment ID"] = (df.loc[missing, "Video ID"] + ":" +
+                                             pd.util.hash_pandas_object(df.loc[missing, "Comment"],
+                                                                        index=False).astype(str))
+        print(f"Loaded {upsert(df, path)} rows from {table}")
+
+
+if __name__ == "__main__":
+    load_from_storage()
@@ -0,0 +1,156 @@
+# watch_feed.py
+# State and output of the fresh-upload watcher (video_watcher.py), kept in a SQLite file of
+# its own (WATCH_PATH) so its writes every few minutes don't change the warehouse the rest
+# of the dashboard is cached on. watched_videos holds each video's polling schedule and
+# last stats; velocity is the per-video time series, one row per poll. velocity doubles
+# as the change feed: rows are numbered in the order they're written, so a reader that
+# remembers the last seq it saw fetches only the rows written since.
+
+import os
+import json
+import sqlite3
+import time
+from contextlib import closing
+import pandas as pd
+
+WATCH_PATH = os.getenv("WATCH_PATH", "watch.db")
+# How long after upload a video is followed
+WATCH_HOURS = float(os.getenv("WATCH_HOURS", 48))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watched_videos (
+    video_id TEXT PRIMARY KEY,
+    channel_id TEXT NOT NULL,
+    title TEXT,
+    published_at TEXT NOT NULL,
+    next_poll REAL NOT NULL,
+    last_polled REAL,
+    views INTEGER,
+    likes INTEGER,
+    comments INTEGER,
+    comments_scored INTEGER NOT NULL DEFAULT 0,
+    sentiment_sum REAL NOT NULL DEFAULT 0,
+    newest_comment_id TEXT,
+    newest_comment_at TEXT,
+    done INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_watched_due ON watched_videos (done, next_poll);
+
+CREATE TABLE IF NOT EXISTS velocity (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    video_id TEXT NOT NULL,
+    channel_id TEXT NOT NULL,
+    polled_at TEXT NOT NULL,
+    age_hours REAL NOT NULL,
+    views INTEGER,
+    likes INTEGER,
+    comments INTEGER,
+    views_per_hour REAL,
+    likes_per_hour REAL,
+    comments_per_hour REAL,
+    mean_sentiment REAL
+);
+CREATE INDEX IF NOT EXISTS idx_velocity_channel ON velocity (channel_id, seq);
+"""
+
+# Dashboard column names for the velocity feed
+VELOCITY_COLUMNS = {
+    "v.seq": "Seq",
+    "v.video_id": "Video ID",
+    "w.title": "Video Title",
+    "w.published_at": "Published At",
+    "v.polled_at": "Polled At",
+    "v.age_hours": "Age (h)",
+    "v.views": "Views",
+    "v.likes": "Likes",
+    "v.comments": "Comments",
+    "v.views_per_hour": "Views/h",
+    "v.likes_per_hour": "Likes/h",
+    "v.comments_per_hour": "Comments/h",
+    "v.mean_sentiment": "Mean Sentiment",
+}
+SAMPLE_COLUMNS = ["video_id", "channel_id", "polled_at", "age_hours", "views", "likes", "comments",
+                  "views_per_hour", "likes_per_hour", "comments_per_hour", "mean_sentiment"]
+STATE_COLUMNS = ["next_poll", "last_polled", "views", "likes", "comments", "comments_scored", "sentiment_sum",
+                 "newest_comment_id", "newest_comment_at", "done"]
+
+_initialized = set()
+
+
+def connect(path=None):
+    # WAL: the watcher writes while dashboard sessions read the feed
+    path = path or WATCH_PATH
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if path not in _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _initialized.add(path)
+    return conn
+
+def watched_ids(path=None):
+    # Every video ever watched, finished ones included, so they aren't picked up again
+    with closing(connect(path)) as conn:
+        return {row[0] for row in conn.execute("SELECT video_id FROM watched_videos")}
+
+def add_videos(videos, path=None):
+    # videos: [{"video_id", "channel_id", "title", "published_at", "next_poll", ...optional state}]
+    with closing(connect(path)) as conn, conn:
+        for video in videos:
+            columns = list(video)
+            conn.execute(f"INSERT OR IGNORE INTO watched_videos ({', '.join(columns)}) "
+                         f"VALUES ({', '.join('?' * len(columns))})", [video[c] for c in columns])
+    return len(videos)
+
+def of_channels(channel_ids):
+    # Clause and params limiting rows to these channels (None: every channel), so watchers
+    # sharing the file each see only their own shard's videos
+    if channel_ids is None:
+        return "", []
+    return " AND channel_id IN (SELECT value FROM json_each(?))", [json.dumps(list(channel_ids))]
+
+def active_videos(channel_ids=None, path=None):
+    # Videos still being watched, youngest first
+    clause, params = of_channels(channel_ids)
+    with closing(connect(path)) as conn:
+        rows = conn.execute(f"SELECT * FROM watched_videos WHERE done = 0{clause} ORDER BY published_at DESC",
+                            params).fetchall()
+    return [dict(row) for row in rows]
+
+def record_polls(samples, states, path=None):
+    # Appends velocity rows and updates the polled videos' state in one transaction, so
+    # the feed never shows a poll the state doesn't reflect
+    with closing(connect(path)) as conn, conn:
+        conn.executemany(f"INSERT INTO velocity ({', '.join(SAMPLE_COLUMNS)}) "
+                         f"VALUES ({', '.join('?' * len(SAMPLE_COLUMNS))})",
+                         [[sample[c] for c in SAMPLE_COLUMNS] for sample in samples])
+        conn.executemany(f"UPDATE watched_videos SET {', '.join(f'{c} = ?' for c in STATE_COLUMNS)} "
+                         f"WHERE video_id = ?",
+                         [[state[c] for c in STATE_COLUMNS] + [state["video_id"]] for state in states])
+
+def retire(video_ids, path=None):
+    with closing(connect(path)) as conn, conn:
+        conn.executemany("UPDATE watched_videos SET done = 1 WHERE video_id = ?", [(v,) for v in video_ids])
+
+def next_poll(channel_ids=None, path=None):
+    clause, params = of_channels(channel_ids)
+    with closing(connect(path)) as conn:
+        return conn.execute(f"SELECT MIN(next_poll) FROM watched_videos WHERE done = 0{clause}", params).fetchone()[0]
+
+def published_after(hours=WATCH_HOURS):
+    # Cut-off in the API's timestamp format, which sorts as text
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - hours * 3600))
+
+def changes_since(seq=0, channel_id=None, hours=WATCH_HOURS, path=None):
+    # Velocity rows written after `seq`, oldest first, for videos uploaded in the last `hours`
+    if not os.path.exists(path or WATCH_PATH):
+        return pd.DataFrame(columns=list(VELOCITY_COLUMNS.values()))
+    columns = ", ".join(f"{source} AS '{target}'" for source, target in VELOCITY_COLUMNS.items())
+    sql = (f"SELECT {columns} FROM velocity v JOIN watched_videos w ON w.video_id = v.video_id "
+           f"WHERE v.seq > ? AND w.published_at >= ?")
+    params = [seq, published_after(hours)]
+    if channel_id is not None:
+        sql += " AND v.channel_id = ?"
+        params.append(channel_id)
+    with closing(connect(path)) as conn:
+        return pd.read_sql_query(sql + " ORDER BY v.seq", conn, params=params)
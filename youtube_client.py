@@ -0,0 +1,149 @@
+# youtube_client.py
+# Shared YouTube Data API client: one pooled keep-alive session, gzip and fields= projection.
+# Responses go through the on-disk response cache (see response_cache.py) unless it is off.
+
+import os
+import threading
+from collections import Counter
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from response_cache import get_response_cache
+import metrics
+
+load_dotenv()
+
+API_BASE_URL = os.getenv("YOUTUBE_API_BASE_URL", "https://www.googleapis.com/youtube/v3")
+POOL_SIZE = int(os.getenv("YOUTUBE_POOL_SIZE", 10))
+
+# Google only serves gzip to clients whose User-Agent contains "gzip"
+DEFAULT_HEADERS = {
+    "Accept-Encoding": "gzip",
+    "User-Agent": "yt-performance-tracker (gzip)",
+}
+
+# Partial-response projections: only the keys the pipeline actually reads
+DEFAULT_FIELDS = {
+    "channels": "items(id,snippet/title,statistics(subscriberCount,viewCount,videoCount),contentDetails/relatedPlaylists/uploads)",
+    "videos": "items(id,snippet(title,tags),statistics(viewCount,likeCount,commentCount))",
+    "search": "nextPageToken,items(id(kind,videoId),snippet(title,publishedAt))",
+    "playlistItems": "nextPageToken,items(snippet/title,contentDetails(videoId,videoPublishedAt))",
+    "commentThreads": "nextPageToken,items(id,snippet/topLevelComment/snippet(textDisplay,publishedAt))",
+    "comments": "nextPageToken,items(id,snippet(textDisplay,publishedAt,parentId))",
+}
+
+# commentThreads with part=snippet,replies: the reply count and the inlined replies as well
+THREAD_REPLY_FIELDS = ("nextPageToken,items(id,snippet(totalReplyCount,topLevelComment/snippet(textDisplay,publishedAt)),"
+                       "replies/comments(id,snippet(textDisplay,publishedAt,parentId)))")
+
+
+class ClientStats:
+    # Request and byte counters, per endpoint
+    def __init__(self):
+        self.requests = Counter()
+        self.wire_bytes = Counter()
+        self.decoded_bytes = Counter()
+        # Served from the response cache without a request / answered 304 Not Modified
+        self.cache_hits = Counter()
+        self.not_modified = Counter()
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, wire_bytes, decoded_bytes):
+        with self.lock:
+            self.requests[endpoint] += 1
+            self.wire_bytes[endpoint] += wire_bytes
+            self.decoded_bytes[endpoint] += decoded_bytes
+        metrics.inc("api_requests_total", endpoint=endpoint)
+        metrics.inc("api_wire_bytes_total", wire_bytes, endpoint=endpoint)
+        metrics.inc("api_decoded_bytes_total", decoded_bytes, endpoint=endpoint)
+
+    def record_cache_hit(self, endpoint):
+        with self.lock:
+            self.cache_hits[endpoint] += 1
+        metrics.inc("api_cache_hits_total", endpoint=endpoint)
+
+    def record_not_modified(self, endpoint):
+        with self.lock:
+            self.not_modified[endpoint] += 1
+        metrics.inc("api_not_modified_total", endpoint=endpoint)
+
+    def reset(self):
+        with self.lock:
+            self.requests.clear()
+            self.wire_bytes.clear()
+            self.decoded_bytes.clear()
+            self.cache_hits.clear()
+            self.not_modified.clear()
+
+    def summary(self):
+        return {
+            "requests": sum(self.requests.values()),
+            "wire_bytes": sum(self.wire_bytes.values()),
+            "decoded_bytes": sum(self.decoded_bytes.values()),
+            "cache_hits": sum(self.cache_hits.values()),
+            "not_modified": sum(self.not_modified.values()),
+            "by_endpoint": {endpoint: {
+                "requests": self.requests[endpoint],
+                "wire_bytes": self.wire_bytes[endpoint],
+                "decoded_bytes": self.decoded_bytes[endpoint],
+                "cache_hits": self.cache_hits[endpoint],
+                "not_modified": self.not_modified[endpoint],
+            } for endpoint in self.requests.keys() | self.cache_hits.keys()},
+        }
+
+
+class YouTubeClient:
+    def __init__(self, api_key=None, base_url=API_BASE_URL, pool_size=POOL_SIZE, project_fields=True, cache=None):
+        self.api_key = api_key if api_key is not None else os.getenv("YOUTUBE_API_KEY")
+        self.base_url = base_url
+        self.project_fields = project_fields
+        # None uses the configured response cache, False disables caching for this client
+        self.cache = get_response_cache() if cache is None else cache or None
+        self.stats = ClientStats()
+
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, endpoint, fields=None, **params):
+        params["key"] = self.api_key
+        fields = fields or (DEFAULT_FIELDS.get(endpoint) if self.project_fields else None)
+        if fields:
+            params["fields"] = fields
+
+        cached = self.cache.lookup(self.base_url, endpoint, params) if self.cache else None
+        if cached is not None and cached.fresh:
+            self.stats.record_cache_hit(endpoint)
+            return cached.json()
+
+        headers = {"If-None-Match": cached.etag} if cached is not None and cached.etag else None
+        with metrics.timed("api_request", endpoint=endpoint):
+            response = self.session.get(f"{self.base_url}/{endpoint}", params=params, headers=headers, timeout=30)
+            content = response.content
+        # raw.tell() counts the (possibly compressed) bytes read off the socket
+        self.stats.record(endpoint, response.raw.tell() or len(content), len(content))
+        if response.status_code == 304 and cached is not None:
+            self.stats.record_not_modified(endpoint)
+            self.cache.revalidated(cached)
+            return cached.json()
+        if self.cache and response.status_code == 200:
+            self.cache.store(self.base_url, endpoint, params, content, response.headers.get("ETag"))
+        # Error bodies are returned as-is; callers check for "items"
+        return response.json()
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    # Process-wide client so every module shares one connection pool
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = YouTubeClient()
+        return _client
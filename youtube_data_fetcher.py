@@ -1,165 +1,220 @@
 import os
+import sys
+import argparse
+import subprocess
 import pandas as pd
-import requests
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-from nltk import download
-from datetime import datetime
 from dotenv import load_dotenv
-
-# Download VADER lexicon
-download('vader_lexicon')
+from async_ingestion import chunk_ids, parse_channel_item, parse_playlist_item, parse_video_item, run_ingestion
+from youtube_client import get_client
+from sentiment_scoring import score_text
+from storage import get_storage
+from subscriber_store import append_snapshot
+from warehouse import upsert_channels, upsert_videos, upsert_subscriber_snapshots
+from channel_registry import CHANNELS_FILE, ChannelRegistry, load_channels
+import metrics
 
 # Set your YouTube API key here
 load_dotenv()
 api_key = os.getenv("YOUTUBE_API_KEY")
 
+# Tracked channels, with refresh priorities and intervals, are listed in channels.txt
+# (see channel_registry.py)
 
-# Channel IDs (replace/add as needed)
-channel_ids = [
-    "UCJZ7f6NQzGKZnFXzFW9y9UQ",  # Shaytards
-    "UCYO_jab_esuFRV4b17AJtAw",  # 3Blue1Brown
-    "UC8butISFwT-Wl7EV0hUK0BQ"   # freeCodeCamp
-]
-
+@metrics.timed("channel_stats")
 def get_channel_stats(channel_id):
-    url = f"https://www.googleapis.com/youtube/v3/channels?part=snippet,statistics&id={channel_id}&key={api_key}"
-    response = requests.get(url).json()
+    response = get_client().get("channels", part="snippet,statistics,contentDetails", id=channel_id)
 
     if "items" not in response or not response["items"]:
         return {}
 
-    data = response["items"][0]
-    return {
-        "Channel ID": channel_id,
-        "Channel Name": data["snippet"]["title"],
-        "Subscribers": int(data["statistics"].get("subscriberCount", 0)),
-        "Total Views": int(data["statistics"].get("viewCount", 0)),
-        "Total Videos": int(data["statistics"].get("videoCount", 0))
-    }
-
-
-subs_log_file = "subs_timeseries.csv"
-
-for channel in channel_ids:
-    stats = get_channel_stats(channel)
-    today = datetime.date.today().isoformat()
-
-    new_row = {
-        "date": today,
-        "channel_name": stats["Channel Name"],
-        "subscribers": int(stats.get("subscriberCount", 0))
-    }
-
-    # Append to CSV
-    if os.path.exists(subs_log_file):
-        df_old = pd.read_csv(subs_log_file)
-        df_new = pd.DataFrame([new_row])
-        df = pd.concat([df_old, df_new], ignore_index=True)
-        df.to_csv(subs_log_file, index=False)
-    else:
-        pd.DataFrame([new_row]).to_csv(subs_log_file, index=False)
+    return parse_channel_item(response["items"][0])
 
-def get_recent_videos(channel_id, max_results=5):
-    url = f"https://www.googleapis.com/youtube/v3/search?key={api_key}&channelId={channel_id}&part=snippet,id&order=date&maxResults={max_results}"
-    response = requests.get(url).json()
+@metrics.timed("channel_stats_batch")
+def get_channel_stats_batch(channel_ids):
+    # One channels?id= call per 50 channels, keyed by channel ID
+    results = {}
+    for batch in chunk_ids(channel_ids):
+        response = get_client().get("channels", part="snippet,statistics,contentDetails", id=",".join(batch))
+        for item in response.get("items", []):
+            results[item["id"]] = parse_channel_item(item)
+    return results
 
-    videos = []
-    for item in response.get("items", []):
-        if item["id"]["kind"] == "youtube#video":
-            video = {
-                "Video ID": item["id"]["videoId"],
-                "Video Title": item["snippet"]["title"],
-                "Upload Date": item["snippet"]["publishedAt"][:10],
-            }
-            videos.append(video)
-    return videos
+@metrics.timed("recent_videos")
+def get_recent_videos(channel_id, max_results=5):
+    # Newest uploads from the channel's uploads playlist (1 quota unit; search costs 100)
+    response = get_client().get("playlistItems", part="snippet,contentDetails", playlistId="UU" + channel_id[2:],
+                                maxResults=max_results)
+    videos = [parse_playlist_item(item) for item in response.get("items", [])]
+    return [video for video in videos if video is not None]
 
+@metrics.timed("video_details")
 def get_video_details(video_id):
-    url = f"https://www.googleapis.com/youtube/v3/videos?part=statistics&id={video_id}&key={api_key}"
-    response = requests.get(url).json()
+    response = get_client().get("videos", part="statistics", id=video_id,
+                                fields="items(id,statistics(viewCount,likeCount,commentCount))")
     if "items" not in response or not response["items"]:
         return {}
-    
-    stats = response["items"][0]["statistics"]
-    return {
-        "Views": int(stats.get("viewCount", 0)),
-        "Likes": int(stats.get("likeCount", 0)) if "likeCount" in stats else 0,
-        "Comments": int(stats.get("commentCount", 0)) if "commentCount" in stats else 0
-    }
 
+    details = parse_video_item(response["items"][0])
+    del details["Video Title"]
+    return details
+
+@metrics.timed("video_details_batch")
+def get_video_details_batch(video_ids):
+    # One videos?id= call per 50 videos (snippet + statistics merged), keyed by video ID
+    results = {}
+    for batch in chunk_ids(video_ids):
+        response = get_client().get("videos", part="snippet,statistics", id=",".join(batch))
+        for item in response.get("items", []):
+            results[item["id"]] = parse_video_item(item)
+    return results
+
+@metrics.timed("video_comments")
 def get_video_comments(video_id):
     comments = []
-    url = f"https://www.googleapis.com/youtube/v3/commentThreads?part=snippet&videoId={video_id}&key={api_key}&maxResults=100"
-    response = requests.get(url).json()
+    response = get_client().get("commentThreads", part="snippet", videoId=video_id, maxResults=100)
     for item in response.get("items", []):
         comment = item["snippet"]["topLevelComment"]["snippet"]["textDisplay"]
         comments.append(comment)
     return comments
 
 def analyze_video_comments(comments):
-    analyzer = SentimentIntensityAnalyzer()
     all_text = " ".join(comments)
     if not all_text.strip():
         return {"compound": 0.0, "pos": 0.0, "neg": 0.0, "neu": 1.0, "total_comments": 0}
-    scores = analyzer.polarity_scores(all_text)
+    scores = score_text(all_text)
     scores["total_comments"] = len(comments)
     return scores
 
-# Store channel and video stats
-channel_stats_list = []
-video_sentiment_list = []
-
-print("Fetching data for", len(channel_ids), "channels...")
-
-for channel_id in channel_ids:
-    print("Processing Channel:", channel_id)
-    channel_stats = get_channel_stats(channel_id)
-    if not channel_stats:
-        print("   Skipping channel (data not found)")
-        continue
-
-    channel_stats_list.append(channel_stats)
 
-    recent_videos = get_recent_videos(channel_id, max_results=5)
-    for video in recent_videos:
+def video_rows(channel_stats, videos, video_details_by_id, comments_by_video):
+    # One video_sentiments row per video of a channel
+    rows = []
+    for video in videos:
         print("  Analyzing:", video["Video Title"])
         video_id = video["Video ID"]
 
-        # Fetch views
-        video_details = get_video_details(video_id)
-        video["Views"] = video_details.get("Views", 0)
-
-        # Fetch & analyze comments
-        comments = get_video_comments(video_id)
-        sentiment = analyze_video_comments(comments)
-
- 
-# Inside your loop, where you're building the video_sentiment_list.append({...}):
-upload_datetime = pd.to_datetime(video["Upload Date"])  # make sure Upload Date is in ISO format
-
-video_sentiment_list.append({
-    "Channel ID": channel_id,
-    "Channel Name": channel_stats["Channel Name"],
-    "Video Title": video["Video Title"],
-    "Video ID": video["Video ID"],
-    "Upload Date": video["Upload Date"],
-    "Publish Time": upload_datetime.strftime("%H:%M"),
-    "Publish Day": upload_datetime.day_name(),
-    "Title Length": len(video["Video Title"]),
-    "Views": video["Views"],
-    "Sentiment Score": sentiment["compound"],
-    "% Positive": round(sentiment["pos"] * 100, 2),
-    "% Negative": round(sentiment["neg"] * 100, 2),
-    "% Neutral": round(sentiment["neu"] * 100, 2),
-    "Total Comments": sentiment["total_comments"],
-    "Subscribers": int(channel_stats.get("subscriberCount", 0))  # Use get() to avoid KeyError
-})
-
-# Save results to CSV
-channel_df = pd.DataFrame(channel_stats_list)
-video_df = pd.DataFrame(video_sentiment_list)
-
-channel_df.to_csv("channel_stats.csv", index=False)
-video_df.to_csv("video_sentiments.csv", index=False)
-
-print("\n Data saved to channel_stats.csv and video_sentiments.csv")
+        details = video_details_by_id.get(video_id, {})
+        video["Views"] = details.get("Views", 0)
+        sentiment = analyze_video_comments(comments_by_video.get(video_id, []))
+
+        upload_datetime = pd.to_datetime(video["Published At"])  # ISO timestamp from the API
+
+        rows.append({
+            "Channel ID": channel_stats["Channel ID"],
+            "Channel Name": channel_stats["Channel Name"],
+            "Video Title": video["Video Title"],
+            "Video ID": video["Video ID"],
+            "Tags": details.get("Tags"),
+            "Upload Date": video["Upload Date"],
+            "Published At": video["Published At"],
+            "Publish Time": upload_datetime.strftime("%H:%M"),
+            "Publish Day": upload_datetime.day_name(),
+            "Title Length": len(video["Video Title"]),
+            "Views": video["Views"],
+            "Sentiment Score": sentiment["compound"],
+            "% Positive": round(sentiment["pos"] * 100, 2),
+            "% Negative": round(sentiment["neg"] * 100, 2),
+            "% Neutral": round(sentiment["neu"] * 100, 2),
+            "Total Comments": sentiment["total_comments"],
+            "Subscribers": channel_stats.get("Subscribers", 0)
+        })
+    return rows
+
+@metrics.timed("fetch_channels")
+def fetch_channels(channel_ids, videos_per_channel=5, max_comments=100):
+    # {channel_id: (channel stats, video rows)} for every channel the API returned
+    print("Fetching data for", len(channel_ids), "channels...")
+
+    # Channels, recent videos, video stats and comment pages are pulled concurrently
+    channel_stats_by_id, videos_by_channel, video_details_by_id, comments_by_video = run_ingestion(
+        channel_ids, videos_per_channel=videos_per_channel, max_comments=max_comments, api_key=api_key
+    )
+
+    results = {}
+    for channel_id in channel_ids:
+        print("Processing Channel:", channel_id)
+        channel_stats = channel_stats_by_id.get(channel_id)
+        if not channel_stats:
+            print("   Skipping channel (data not found)")
+            continue
+        results[channel_id] = (channel_stats, video_rows(
+            channel_stats, videos_by_channel.get(channel_id, []), video_details_by_id, comments_by_video
+        ))
+    return results
+
+def save_results(results):
+    # Replaces these channels' rows in channel_stats/video_sentiments (other channels, e.g.
+    # another worker's shard, are left alone) and appends today's snapshot
+    if not results:
+        return
+    channel_stats_by_id = {channel_id: stats for channel_id, (stats, _) in results.items()}
+    snapshot = append_snapshot(channel_stats_by_id)
+    upsert_subscriber_snapshots(snapshot)
+
+    channel_df = pd.DataFrame(list(channel_stats_by_id.values()))
+    video_df = pd.DataFrame([row for _, rows in results.values() for row in rows])
+
+    storage = get_storage()
+    storage.write("channel_stats", channel_df, mode="replace")
+    storage.write("video_sentiments", video_df, mode="replace")
+    upsert_channels(channel_df)
+    upsert_videos(video_df)
+
+    print("\n Data saved to channel_stats and video_sentiments")
+
+def run_workers(workers, argv):
+    # One process per shard, each claiming its own channels and exporting its own metrics;
+    # returns the worst exit status
+    processes = [subprocess.Popen([sys.executable, os.path.abspath(__file__), *argv,
+                                   "--shard", str(shard), "--shards", str(workers)],
+                                  env={**os.environ, "METRICS_INSTANCE": f"shard{shard}"})
+                 for shard in range(workers)]
+    return max(process.wait() for process in processes)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch stats and recent videos for the registry's due channels.")
+    parser.add_argument("--channels-file", default=CHANNELS_FILE)
+    parser.add_argument("--shard", type=int, default=0, help="this worker's shard, 0 to shards-1")
+    parser.add_argument("--shards", type=int, default=1, help="workers the channels are split across")
+    parser.add_argument("--workers", type=int, help="start this many worker processes (one per shard) and wait")
+    parser.add_argument("--all", action="store_true", help="refresh every channel, due or not")
+    parser.add_argument("--limit", type=int, help="refresh at most this many channels per worker")
+    parser.add_argument("--videos-per-channel", type=int, default=5)
+    parser.add_argument("--max-comments", type=int, default=100)
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and follow fresh uploads of these channels (see video_watcher.py)")
+    args = parser.parse_args(argv)
+
+    if args.workers:
+        worker_argv = ["--channels-file", args.channels_file, "--videos-per-channel", str(args.videos_per_channel),
+                       "--max-comments", str(args.max_comments)]
+        worker_argv += ["--all"] if args.all else []
+        worker_argv += ["--limit", str(args.limit)] if args.limit else []
+        worker_argv += ["--watch"] if args.watch else []
+        raise SystemExit(run_workers(args.workers, worker_argv))
+
+    if args.watch:
+        # Imported here: only watch mode needs the scheduler
+        import video_watcher
+        video_watcher.main(["--channels-file", args.channels_file, "--shard", str(args.shard),
+                            "--shards", str(args.shards)])
+        return
+
+    registry = ChannelRegistry()
+    claimed = registry.claim(load_channels(args.channels_file), args.shard, args.shards,
+                             force=args.all, limit=args.limit)
+    if not claimed:
+        print(f"Shard {args.shard}/{args.shards}: no channels due")
+        return
+    try:
+        with registry.holding(claimed):
+            results = fetch_channels(claimed, args.videos_per_channel, args.max_comments)
+            save_results(results)
+        registry.mark_refreshed(list(results))
+    finally:
+        # Channels that failed are released to be retried by the next run
+        registry.release(claimed)
+
+
+if __name__ == "__main__":
+    main()